@@ -0,0 +1,140 @@
+"""Synthetic articles and a deterministic stand-in encoder for offline runs."""
+
+import hashlib
+import random
+import time
+
+import numpy as np
+
+from src.data_models import Article
+
+CATEGORIES = [
+    "vsd_people",
+    "vsd_tv",
+    "vsd_company",
+    "vsd_culture",
+    "vsd_leisure",
+    "public_news",
+    "public_people",
+    "public_tv",
+    "public_fashion",
+    "public_royalty",
+]
+
+_SUBJECTS = [
+    "le prince",
+    "la princesse",
+    "l'animatrice",
+    "le chanteur",
+    "l'actrice",
+    "le footballeur",
+    "la candidate de télé-réalité",
+    "le couple royal",
+    "la styliste",
+    "l'humoriste",
+]
+_VERBS = [
+    "annonce",
+    "dévoile",
+    "confirme",
+    "dément",
+    "célèbre",
+    "prépare",
+    "révèle",
+    "quitte",
+]
+_OBJECTS = [
+    "son mariage",
+    "une rupture",
+    "un nouveau projet",
+    "sa grossesse",
+    "un divorce",
+    "une tournée",
+    "une tenue remarquée",
+    "son retour à la télévision",
+    "un scandale",
+    "des vacances",
+]
+_DETAILS = [
+    "lors d'une soirée à Paris",
+    "sur les réseaux sociaux",
+    "dans une interview exclusive",
+    "au festival de Cannes",
+    "devant les caméras",
+    "à Monaco",
+    "pendant le tournage",
+]
+
+
+def make_articles(n, seed=0):
+    """Return `n` deterministic synthetic articles spread over all categories."""
+    rng = random.Random(seed)
+    articles = []
+    for i in range(n):
+        title = f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)}"
+        summary = " ".join(
+            f"{rng.choice(_SUBJECTS).capitalize()} {rng.choice(_VERBS)} "
+            f"{rng.choice(_OBJECTS)} {rng.choice(_DETAILS)}."
+            for _ in range(rng.randint(2, 5))
+        )
+        category = CATEGORIES[i % len(CATEGORIES)]
+        articles.append(
+            Article(
+                title=title.capitalize(),
+                link=f"https://bench.invalid/{category}/{i}",
+                published=f"2025-01-{1 + i % 28:02d}",
+                summary=summary,
+                category=category,
+            )
+        )
+    return articles
+
+
+def make_queries(n, seed=1):
+    """Return `n` deterministic gossip-style queries."""
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(_SUBJECTS)} {rng.choice(_OBJECTS)} {rng.choice(_DETAILS)}"
+        for _ in range(n)
+    ]
+
+
+class StubEncoder:
+    """Deterministic bag-of-words hashing encoder with the MiniLM interface.
+
+    Each token maps to a fixed pseudo-random unit vector, so texts sharing
+    words get similar embeddings. `call_ms` / `item_ms` add a simulated
+    cost per call and per text so batching effects stay visible.
+    """
+
+    def __init__(self, dim=384, call_ms=0.0, item_ms=0.0):
+        self.dim = dim
+        self.call_ms = call_ms
+        self.item_ms = item_ms
+        self._token_vectors = {}
+        self.calls = 0
+
+    def _token_vector(self, token):
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(token.encode()).digest()[:8], "big")
+            vector = np.random.default_rng(seed).standard_normal(self.dim)
+            vector = self._token_vectors[token] = vector.astype(np.float32)
+        return vector
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in text.casefold().split():
+            vector += self._token_vector(token)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        cost_s = (self.call_ms + self.item_ms * len(batch)) / 1000
+        if cost_s:
+            time.sleep(cost_s)
+        rows = np.stack([self._embed(text) for text in batch])
+        return rows[0] if single else rows
@@ -0,0 +1,334 @@
+"""Offline benchmarks for search and ingestion.
+
+Runs entirely in-process against a synthetic corpus, the deterministic
+`StubEncoder` and the local NumPy vector store; no network or model
+download is needed.
+
+    uv run python -m benchmarks.run --out bench.json
+    uv run python -m benchmarks.run --baseline bench.json   # exit 1 on regression
+    uv run python -m benchmarks.run --input new.json --baseline bench.json
+
+Metric names ending in `_ms` are lower-is-better; names ending in
+`_per_s` are higher-is-better.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def percentile(values, pct):
+    """Return the `pct` percentile of `values` with linear interpolation."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def configure_environment(data_dir, vector_backend):
+    """Point the app at a scratch DATA_DIR and an in-process vector store.
+
+    Must run before `src.backend` is imported: it reads its settings at
+    import time.
+    """
+    os.environ.update(
+        {
+            "DATA_DIR": str(data_dir),
+            "VECTOR_BACKEND": vector_backend,
+            "QUERY_CACHE_DISK": "0",
+            "INDEX_STATS_REFRESH_S": "3600",
+        }
+    )
+
+
+def build_index(be, encoder, articles):
+    """Embed `articles` with `encoder` into the backend's in-process index."""
+    from src.load_articles import article_metadata, chunked
+    from src.vector_store import create_vector_store
+
+    store = create_vector_store(be.VECTOR_BACKEND, be.DATA_DIR, be.INDEX_NAME, None)
+    for batch in chunked(articles, 512):
+        vectors = encoder.encode([a.title + " " + a.summary for a in batch]).tolist()
+        store.upsert(
+            (a.link, vector, article_metadata(a)) for a, vector in zip(batch, vectors)
+        )
+
+
+def reset_backend(be, cache_size, model=True):
+    """Drop per-process state so the next request starts from scratch."""
+    be.QUERY_CACHE_SIZE = cache_size
+    be.RESPONSE_CACHE_SIZE = cache_size
+    be._query_cache = None
+    be._response_cache = None
+    be._index = None
+    if model:
+        be._model = None
+
+
+async def _drive(app, queries, concurrency, top_k):
+    """Send one /search per query with at most `concurrency` in flight."""
+    import httpx
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+
+        async def one(query):
+            async with semaphore:
+                started_at = time.perf_counter()
+                response = await c.post(
+                    "/search", json={"query": query, "top_k": top_k}
+                )
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - started_at) * 1000)
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(one(query) for query in queries))
+        wall_s = time.perf_counter() - started_at
+    return latencies, wall_s
+
+
+def drive(app, queries, concurrency, top_k=10):
+    return asyncio.run(_drive(app, queries, concurrency, top_k))
+
+
+def summarize(prefix, latencies, wall_s):
+    return {
+        f"{prefix}.p50_ms": percentile(latencies, 50),
+        f"{prefix}.p95_ms": percentile(latencies, 95),
+        f"{prefix}.p99_ms": percentile(latencies, 99),
+        f"{prefix}.throughput_per_s": len(latencies) / wall_s if wall_s else 0.0,
+    }
+
+
+def bench_import():
+    """Time `import src.backend` in a fresh interpreter."""
+    code = (
+        "import time; t = time.perf_counter(); import src.backend; "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {"startup.import_backend_ms": float(out.stdout.strip().splitlines()[-1])}
+
+
+def bench_search(be, encoder, queries, concurrency_levels, requests):
+    from benchmarks.corpus import make_queries
+
+    metrics = {}
+    # The backend imports sentence_transformers lazily; serve the stub instead
+    stub_module = SimpleNamespace(SentenceTransformer=lambda name: encoder)
+    with mock.patch.dict(sys.modules, {"sentence_transformers": stub_module}):
+        # Cold: nothing loaded, empty caches
+        reset_backend(be, cache_size=1024)
+        latencies, _ = drive(be.app, queries[:1], 1)
+        metrics["startup.cold_first_request_ms"] = latencies[0]
+        # Warm: first request after the startup warm-up
+        reset_backend(be, cache_size=1024)
+        started_at = time.perf_counter()
+        asyncio.run(be.warm_up())
+        metrics["startup.warm_up_ms"] = (time.perf_counter() - started_at) * 1000
+        latencies, _ = drive(be.app, queries[1:2], 1)
+        metrics["startup.warm_first_request_ms"] = latencies[0]
+
+        # Full path: caches disabled so every request encodes and queries
+        for concurrency in concurrency_levels:
+            reset_backend(be, cache_size=0, model=False)
+            drive(be.app, queries[:concurrency], concurrency)  # warm-up
+            latencies, wall_s = drive(be.app, queries[:requests], concurrency)
+            metrics.update(
+                summarize(f"search.uncached.c{concurrency}", latencies, wall_s)
+            )
+
+        # Hot set: a few popular queries repeated, caches enabled
+        popular = make_queries(20, seed=7)
+        repeated = [popular[i % len(popular)] for i in range(requests)]
+        for concurrency in concurrency_levels:
+            reset_backend(be, cache_size=1024, model=False)
+            drive(be.app, popular, concurrency)  # fill caches
+            latencies, wall_s = drive(be.app, repeated, concurrency)
+            metrics.update(
+                summarize(f"search.cached.c{concurrency}", latencies, wall_s)
+            )
+    return metrics
+
+
+def bench_ingest(encoder, articles, data_dir):
+    """Run `process_feeds_with_cache` over synthetic feeds into a local index."""
+    from src import load_articles as la
+    from src.data_models import FeedFetchResult
+    from src.vector_store import LocalVectorStore
+
+    by_category = {}
+    for article in articles:
+        by_category.setdefault(article.category, []).append(article)
+    feeds = {c: f"https://bench.invalid/{c}/feed" for c in by_category}
+
+    def fetch_feed(category, url, etag=None, modified=None, session=None):
+        served = [a.model_copy() for a in by_category[category]]
+        return FeedFetchResult(category=category, url=url, articles=served)
+
+    store = LocalVectorStore(Path(data_dir) / "ingest", "bench")
+    seen_db = str(Path(data_dir) / "ingest_seen.sqlite3")
+    metrics = {}
+    with mock.patch.object(la, "fetch_feed", fetch_feed):
+        for label in ("full", "noop"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                started_at = time.perf_counter()
+                upserted = la.process_feeds_with_cache(feeds, encoder, store, seen_db)
+                elapsed_s = time.perf_counter() - started_at
+            metrics[f"ingest.{label}_run_ms"] = elapsed_s * 1000
+            if label == "full":
+                metrics["ingest.articles_per_s"] = upserted / elapsed_s
+    return metrics
+
+
+def run_benchmarks(args):
+    from benchmarks.corpus import StubEncoder, make_articles, make_queries
+
+    with tempfile.TemporaryDirectory(prefix="gossip-bench-") as tmp:
+        data_dir = Path(tmp)
+        configure_environment(data_dir, args.vector_backend)
+        from src import backend as be
+
+        encoder = StubEncoder(call_ms=args.encode_call_ms, item_ms=args.encode_item_ms)
+        articles = make_articles(args.corpus_size)
+        build_index(be, encoder, articles)
+        queries = make_queries(args.requests)
+
+        metrics = {}
+        metrics.update(bench_import())
+        metrics.update(
+            bench_search(be, encoder, queries, args.concurrency, args.requests)
+        )
+        metrics.update(bench_ingest(encoder, make_articles(args.ingest_size), data_dir))
+        if be._stats_cache is not None:
+            be._stats_cache.stop()
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "params": {
+                "vector_backend": args.vector_backend,
+                "corpus_size": args.corpus_size,
+                "ingest_size": args.ingest_size,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "encode_call_ms": args.encode_call_ms,
+                "encode_item_ms": args.encode_item_ms,
+            },
+        },
+        "metrics": metrics,
+    }
+
+
+def compare(current, baseline, tolerance, min_ms):
+    """Return `(rows, regressions)` comparing metric dicts.
+
+    A metric regresses when it is worse than the baseline by more than
+    `tolerance` (relative); `_ms` metrics also need to be worse by at
+    least `min_ms` so sub-millisecond noise is ignored.
+    """
+    rows, regressions = [], []
+    for name in sorted(set(current) & set(baseline)):
+        new, old = current[name], baseline[name]
+        change = (new - old) / old if old else 0.0
+        if name.endswith("_per_s"):
+            regressed = change < -tolerance
+        else:
+            regressed = change > tolerance and (new - old) >= min_ms
+        rows.append((name, old, new, change, regressed))
+        if regressed:
+            regressions.append(name)
+    return rows, regressions
+
+
+def print_metrics(metrics):
+    width = max(len(name) for name in metrics)
+    for name in sorted(metrics):
+        print(f"{name:<{width}}  {metrics[name]:>12.3f}")
+
+
+def print_comparison(rows):
+    width = max(len(row[0]) for row in rows)
+    print(f"{'metric':<{width}}  {'baseline':>12}  {'current':>12}  {'change':>8}")
+    for name, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<{width}}  {old:>12.3f}  {new:>12.3f}  {change:>+7.1%}{flag}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", type=Path, help="write results JSON here")
+    parser.add_argument("--baseline", type=Path, help="compare against this JSON")
+    parser.add_argument(
+        "--input", type=Path, help="load results from JSON instead of running"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--min-ms", type=float, default=0.5)
+    parser.add_argument("--vector-backend", choices=("local", "ivf"), default="local")
+    parser.add_argument("--corpus-size", type=int, default=5000)
+    parser.add_argument("--ingest-size", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument(
+        "--concurrency",
+        type=lambda value: [int(c) for c in value.split(",")],
+        default=[1, 8, 32],
+        help="comma-separated concurrency levels",
+    )
+    parser.add_argument("--encode-call-ms", type=float, default=0.0)
+    parser.add_argument("--encode-item-ms", type=float, default=0.0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.input:
+        results = json.loads(args.input.read_text())
+    else:
+        results = run_benchmarks(args)
+    print_metrics(results["metrics"])
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2))
+        print(f"Wrote {args.out}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        rows, regressions = compare(
+            results["metrics"], baseline["metrics"], args.tolerance, args.min_ms
+        )
+        print()
+        print_comparison(rows)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,100 +1,1035 @@
+import asyncio
+import functools
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Literal, NamedTuple
 
-import pinecone
-from fastapi import FastAPI
-from sentence_transformers import SentenceTransformer
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
-from src.data_models import SearchRequest, SearchResponse, SearchResult, SearchMetrics
+from src.batching import MicroBatcher
+from src.cache import CursorStore, QueryEmbeddingCache, TTLCache, normalize_query
+from src.encoder import encoder_id, load_encoder
+from src.index_state import IndexStatsCache, read_index_generation
+from src.lexical_index import (
+    LEXICAL_INDEX_DIR,
+    LexicalIndex,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+from src.metrics import INGEST_METRICS_FILE, Registry, read_textfile
+from src.serialization import dumps
+from src.vector_store import create_vector_store
+from src.data_models import (
+    SearchBatchMetrics,
+    SearchBatchRequest,
+    SearchBatchResponse,
+    SearchMetrics,
+    SearchRequest,
+    SearchResponse,
+    SearchResult,
+)
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI()
+MODEL_NAME = "all-MiniLM-L6-v2"
+INDEX_NAME = "gossip-semantic-search"
+# Vector store backend: "pinecone" (default), "local" (exact, in-process NumPy)
+# or "ivf" (approximate, int8-quantized inverted lists)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+DATA_DIR = Path(os.getenv("DATA_DIR", Path(__file__).resolve().parents[1] / "data"))
+# Query-embedding cache: entries, TTL in seconds (0 = no expiry), optional disk tier
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL_S = float(os.getenv("QUERY_CACHE_TTL_S", "86400"))
+QUERY_CACHE_DISK = os.getenv("QUERY_CACHE_DISK", "0") == "1"
+# Thread pools keeping blocking work off the event loop: CPU-bound encodes are
+# sized to the cores, index calls are network-bound and can fan out wider.
+ENCODE_WORKERS = int(os.getenv("ENCODE_WORKERS", str(os.cpu_count() or 1)))
+INDEX_WORKERS = int(os.getenv("INDEX_WORKERS", "16"))
+# Micro-batching of concurrent query encodes: collection window and batch cap
+ENCODE_BATCH_WINDOW_MS = float(os.getenv("ENCODE_BATCH_WINDOW_MS", "3"))
+ENCODE_MAX_BATCH = int(os.getenv("ENCODE_MAX_BATCH", "32"))
+# Maximum number of queries accepted by /search/batch
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "64"))
+# Index stats are refreshed in the background instead of on every request
+INDEX_STATS_REFRESH_S = float(os.getenv("INDEX_STATS_REFRESH_S", "30"))
+# Full-response cache: entries and TTL in seconds (size 0 disables it)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", "300"))
+# Retrieval mode for requests that do not set one: "vector", "lexical",
+# "auto" (lexical when confident, else vector) or "hybrid"
+SEARCH_MODE = os.getenv("SEARCH_MODE", "vector")
+# "auto" only answers lexically while the lexical index holds at least this
+# share of the vector index's documents (it is only filled by ingestion)
+LEXICAL_MIN_COVERAGE = float(os.getenv("LEXICAL_MIN_COVERAGE", "0.9"))
+# Candidates taken from each retriever before hybrid rank fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+# Cursor pagination: candidates fetched by the first page, how long later
+# pages stay available (seconds), and results held across all cursors
+PAGINATION_CANDIDATES = int(os.getenv("PAGINATION_CANDIDATES", "200"))
+CURSOR_TTL_S = float(os.getenv("CURSOR_TTL_S", "300"))
+CURSOR_MAX_RESULTS = int(os.getenv("CURSOR_MAX_RESULTS", "50000"))
+# Load the model and index at startup rather than on the first request
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+WARMUP_QUERY = "warm-up"
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Warm up in the background on startup; stop background work on shutdown.
+
+    The server accepts connections (and `/healthz` answers) while the
+    model loads; `/readyz` only reports ready once `warm_up` has finished.
+    """
+    global _ready
+    task = None
+    if WARMUP_ON_STARTUP:
+        task = asyncio.create_task(warm_up())
+    else:
+        _ready = True
+    yield
+    if task is not None:
+        task.cancel()
+    if _stats_cache is not None:
+        _stats_cache.stop()
+    if _query_cache is not None:
+        _query_cache.flush()
+
+
+app = FastAPI(lifespan=lifespan)
+
+METRICS = Registry()
+HTTP_REQUESTS = METRICS.counter(
+    "gossip_http_requests_total",
+    "HTTP requests by route, method and status code.",
+    ("route", "method", "status"),
+)
+HTTP_DURATION = METRICS.histogram(
+    "gossip_http_request_duration_seconds",
+    "Wall time per HTTP request, including response serialization.",
+    ("route",),
+)
+HTTP_IN_FLIGHT = METRICS.gauge(
+    "gossip_http_requests_in_flight", "HTTP requests currently being served."
+)
+SEARCH_STAGE_DURATION = METRICS.histogram(
+    "gossip_search_stage_duration_seconds",
+    "Time spent per search stage (encode, query, stats, build, serialize).",
+    ("stage",),
+)
+SEARCH_RESPONSE_BYTES = METRICS.histogram(
+    "gossip_search_response_bytes",
+    "Size of search response bodies.",
+    ("route",),
+    buckets=(512, 2048, 8192, 32768, 131072, 524288, 2097152),
+)
+SEARCH_SERVED = METRICS.counter(
+    "gossip_search_served_total",
+    "Searches by the path that answered them (vector, lexical, hybrid, cache, cursor).",
+    ("path",),
+)
+STARTUP_PHASE_DURATION = METRICS.gauge(
+    "gossip_startup_phase_seconds",
+    "Duration of each warm-up phase (model, index, encode, total).",
+    ("phase",),
+)
 
 _model = None
 _index = None
+_lexical_index = None
+_query_cache = None
+_encode_executor = None
+_index_executor = None
+_encode_batcher = None
+_stats_cache = None
+_response_cache = None
+_cursor_store = None
+_model_lock = threading.Lock()
+# Warm-up state reported by /healthz and /readyz
+_ready = False
+_startup_error = None
+_startup_phases = {}
+
+
+class QueryEmbedding(NamedTuple):
+    """A query vector and how it was produced."""
+
+    vector: List[float]
+    cache_hit: bool
+    batch_size: int = 0
+    queue_wait_ms: float = 0.0
+    encode_ms: float = 0.0
+
+
+# Stand-in for requests answered without encoding the query
+NO_EMBEDDING = QueryEmbedding([], cache_hit=False)
 
 
 def get_model():
-    """Return a cached `SentenceTransformer` model, initializing on first use."""
+    """Return the cached encoder (see `ENCODER_BACKEND`), loading it on first use.
+
+    The model is loaded here rather than at import because it pulls in
+    torch or ONNX Runtime. The lock keeps warm-up and an early request
+    from loading the model twice.
+    """
     global _model
-    if _model is None:
-        _model = SentenceTransformer("all-MiniLM-L6-v2")
+    with _model_lock:
+        if _model is None:
+            _model = load_encoder(MODEL_NAME)
     return _model
 
 
+def get_query_cache():
+    """Return the process-wide `QueryEmbeddingCache`, initializing on first use."""
+    global _query_cache
+    if _query_cache is None:
+        disk_path = DATA_DIR / "query_embeddings.sqlite3" if QUERY_CACHE_DISK else None
+        _query_cache = QueryEmbeddingCache(
+            encoder_id(MODEL_NAME),
+            maxsize=QUERY_CACHE_SIZE,
+            ttl=QUERY_CACHE_TTL_S,
+            disk_path=disk_path,
+        )
+    return _query_cache
+
+
+def get_encode_executor():
+    """Return the thread pool used for model encodes, creating it on first use."""
+    global _encode_executor
+    if _encode_executor is None:
+        _encode_executor = ThreadPoolExecutor(
+            max_workers=max(1, ENCODE_WORKERS), thread_name_prefix="encode"
+        )
+    return _encode_executor
+
+
+def get_index_executor():
+    """Return the thread pool used for vector index calls, creating it on first use."""
+    global _index_executor
+    if _index_executor is None:
+        _index_executor = ThreadPoolExecutor(
+            max_workers=max(1, INDEX_WORKERS), thread_name_prefix="index"
+        )
+    return _index_executor
+
+
+def elapsed_ms_since(started_at):
+    """Return milliseconds elapsed since the `time.perf_counter()` reading."""
+    return (time.perf_counter() - started_at) * 1000
+
+
+async def run_blocking(executor, fn, *args, **kwargs):
+    """Run blocking `fn(*args, **kwargs)` on `executor` without stalling the loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+def encode_texts(texts):
+    """Encode a list of texts in one model call and return a list of vectors."""
+    return get_model().encode(texts, convert_to_tensor=True).tolist()
+
+
+def get_encode_batcher():
+    """Return the `MicroBatcher` coalescing concurrent query encodes."""
+    global _encode_batcher
+    if _encode_batcher is None:
+        _encode_batcher = MicroBatcher(
+            encode_texts,
+            max_batch_size=ENCODE_MAX_BATCH,
+            window_ms=ENCODE_BATCH_WINDOW_MS,
+            executor=get_encode_executor(),
+        )
+    return _encode_batcher
+
+
+async def cached_embeddings(texts):
+    """Return the cached embedding of each text (None when not cached).
+
+    The memory tier is read on the loop. Memory misses fall back to the
+    SQLite disk tier, when enabled, on the index executor.
+    """
+    cache = get_query_cache()
+    vectors = [cache.get_from_memory(text) for text in texts]
+    misses = [i for i, vector in enumerate(vectors) if vector is None]
+    if misses:
+        miss_texts = [texts[i] for i in misses]
+        if cache.has_disk_tier:
+            found = await run_blocking(get_index_executor(), cache.get_many, miss_texts)
+        else:
+            found = cache.get_many(miss_texts)
+        for i, vector in zip(misses, found):
+            vectors[i] = vector
+    return vectors
+
+
+async def embed_query(text):
+    """Return a `QueryEmbedding` for `text`, skipping the model on a cache hit."""
+    started_at = time.perf_counter()
+    cache = get_query_cache()
+    [embedding] = await cached_embeddings([text])
+    if embedding is not None:
+        return QueryEmbedding(
+            embedding, cache_hit=True, encode_ms=elapsed_ms_since(started_at)
+        )
+    batched = await asyncio.wrap_future(get_encode_batcher().submit(text))
+    cache.put(text, batched.value)
+    return QueryEmbedding(
+        batched.value,
+        cache_hit=False,
+        batch_size=batched.batch_size,
+        queue_wait_ms=batched.queue_wait_ms,
+        encode_ms=elapsed_ms_since(started_at),
+    )
+
+
+async def embed_queries(texts):
+    """Return a `QueryEmbedding` per text, encoding all cache misses in one call.
+
+    Texts that normalize to the same cache key are encoded once; every
+    result reports the time of the whole call as its `encode_ms`.
+    """
+    started_at = time.perf_counter()
+    cache = get_query_cache()
+    vectors = await cached_embeddings(texts)
+    misses = {}
+    for text, vector in zip(texts, vectors):
+        if vector is None:
+            misses.setdefault(normalize_query(text), text)
+    encoded = {}
+    if misses:
+        miss_texts = list(misses.values())
+        miss_vectors = await run_blocking(
+            get_encode_executor(), encode_texts, miss_texts
+        )
+        for key, text, vector in zip(misses, miss_texts, miss_vectors):
+            cache.put(text, vector)
+            encoded[key] = vector
+    encode_ms = elapsed_ms_since(started_at)
+    return [
+        QueryEmbedding(vector, cache_hit=True, encode_ms=encode_ms)
+        if vector is not None
+        else QueryEmbedding(
+            encoded[normalize_query(text)],
+            cache_hit=False,
+            batch_size=len(misses),
+            encode_ms=encode_ms,
+        )
+        for text, vector in zip(texts, vectors)
+    ]
+
+
+def connect_pinecone():
+    """Return a Pinecone `Index` handle for the search index."""
+    import pinecone
+
+    pc = pinecone.Pinecone(api_key=os.getenv("PINECONE_KEY"))
+    return pc.Index(INDEX_NAME)
+
+
 def get_index():
-    """Return a cached Pinecone `Index`, initializing on first use."""
+    """Return the cached `VectorStore` selected by `VECTOR_BACKEND`."""
     global _index
     if _index is None:
-        pc = pinecone.Pinecone(api_key=os.getenv("PINECONE_KEY"))
-        _index = pc.Index("gossip-semantic-search")
+        _index = create_vector_store(
+            VECTOR_BACKEND, DATA_DIR, INDEX_NAME, connect_pinecone
+        )
     return _index
 
 
+def get_lexical_index():
+    """Return the `LexicalIndex` ingestion maintains under `DATA_DIR`."""
+    global _lexical_index
+    if _lexical_index is None:
+        _lexical_index = LexicalIndex(DATA_DIR / LEXICAL_INDEX_DIR, INDEX_NAME)
+    return _lexical_index
+
+
+def query_index(vector, top_k, pinecone_filter, nprobe=None):
+    """Run a blocking top-k query against the index."""
+    return get_index().query(
+        vector=vector,
+        top_k=top_k,
+        include_metadata=True,
+        filter=pinecone_filter,
+        nprobe=nprobe,
+    )
+
+
+def get_stats_cache():
+    """Return the started `IndexStatsCache`, initializing on first use.
+
+    The refresh thread also watches the index generation that ingestion
+    bumps, so new vectors show up without waiting for the next interval.
+    """
+    global _stats_cache
+    if _stats_cache is None:
+        _stats_cache = IndexStatsCache(
+            lambda: get_index().describe_index_stats(),
+            interval_s=INDEX_STATS_REFRESH_S,
+            generation_fn=lambda: read_index_generation(DATA_DIR),
+        ).start()
+    return _stats_cache
+
+
+def warm_index():
+    """Open the indexes and make one stats call to set up the connection."""
+    get_index().describe_index_stats()
+    get_lexical_index()
+    get_stats_cache()
+
+
+async def warm_up():
+    """Load the model and index, run a dummy encode, then mark the app ready.
+
+    Each phase's duration is logged, exported as a metric and reported by
+    `/readyz`. A failure is recorded rather than raised: the app stays
+    unready and `/healthz` fails so the process gets restarted.
+    """
+    global _ready, _startup_error
+    phases = {
+        "model": (get_encode_executor(), get_model),
+        "index": (get_index_executor(), warm_index),
+        "encode": (get_encode_executor(), lambda: encode_texts([WARMUP_QUERY])),
+    }
+    started_at = time.perf_counter()
+    for phase, (executor, fn) in phases.items():
+        phase_at = time.perf_counter()
+        try:
+            await run_blocking(executor, fn)
+        except Exception as exc:
+            _startup_error = f"{phase}: {exc}"
+            print(f"Warm-up failed during {phase} phase: {exc}")
+            return
+        _startup_phases[phase] = round(elapsed_ms_since(phase_at), 1)
+    _startup_phases["total"] = round(elapsed_ms_since(started_at), 1)
+    for phase, ms in _startup_phases.items():
+        STARTUP_PHASE_DURATION.set(ms / 1000, phase=phase)
+    _ready = True
+    print(
+        "Warm-up finished: "
+        + ", ".join(f"{phase} {ms} ms" for phase, ms in _startup_phases.items())
+    )
+
+
+def category_filter(categories):
+    """Return the metadata filter for `categories`, or None when unfiltered."""
+    if not categories:
+        return None
+    if len(categories) == 1:
+        return {"category": {"$eq": categories[0]}}
+    return {"category": {"$in": categories}}
+
+
+def match_to_result(match):
+    """Convert one index match into a `SearchResult` (built once, unvalidated)."""
+    metadata = match["metadata"]
+    return SearchResult.model_construct(
+        title=metadata.get("title", "Untitled"),
+        url=match["id"],
+        summary=metadata.get("summary", ""),
+        category=metadata.get("category", "unknown"),
+        published=metadata.get("published", ""),
+        score=match.get("score"),
+    )
+
+
+def project_result(result, fields=None, summary_chars=None):
+    """Return a result as a dict of `fields` (default all), summary truncated."""
+    data = result.__dict__
+    data = {field: data[field] for field in fields} if fields else dict(data)
+    summary = data.get("summary")
+    if summary_chars is not None and summary and len(summary) > summary_chars:
+        data["summary"] = summary[:summary_chars].rstrip() + "…"
+    return data
+
+
+def response_payload(response, fields=None, summary_chars=None):
+    """Return a `SearchResponse` as plain data, its results projected."""
+    return {
+        "results": [
+            project_result(result, fields, summary_chars) for result in response.results
+        ],
+        "metrics": response.metrics.model_dump(),
+        "next_cursor": response.next_cursor,
+    }
+
+
+def json_response(route, response, fields=None, summary_chars=None, headers=None):
+    """Serialize a `SearchResponse` with the fast JSON encoder.
+
+    Results are projected straight from the models built for the response
+    and encoded once, skipping FastAPI's re-validation and encoder; the
+    encoding time and body size are recorded as metrics.
+    """
+    stage_at = time.perf_counter()
+    body = dumps(response_payload(response, fields, summary_chars))
+    SEARCH_STAGE_DURATION.observe(elapsed_ms_since(stage_at) / 1000, stage="serialize")
+    SEARCH_RESPONSE_BYTES.observe(len(body), route=route)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def search_mode(query):
+    """Return the retrieval mode of a request (its own, else `SEARCH_MODE`)."""
+    return query.mode or SEARCH_MODE
+
+
+def vector_path(query):
+    """Name of the path serving a request that needs the query vector."""
+    return "hybrid" if search_mode(query) == "hybrid" else "vector"
+
+
+def lexical_search(query, top_k):
+    """Run a blocking BM25 search for a request."""
+    return get_lexical_index().search(
+        query.query, top_k, category_filter(query.categories)
+    )
+
+
+def lexical_may_answer(query):
+    """Return True if an "auto" request could be answered lexically.
+
+    The query must be short enough to be confident, and the lexical index
+    must cover about as many documents as the last known vector count.
+    """
+    index = get_lexical_index()
+    if len(set(tokenize(query.query))) > index.max_terms:
+        return False
+    stats = get_stats_cache()
+    if stats.refreshed_at is None:
+        return False
+    return len(index) >= LEXICAL_MIN_COVERAGE * stats.total_vectors
+
+
+def lexical_hits(query):
+    """Run a request's BM25 search, or return None if an "auto" request may not.
+
+    Blocking: the checks and the search may reload the lexical index file.
+    """
+    if search_mode(query) == "auto" and not lexical_may_answer(query):
+        return None
+    return lexical_search(query, query.top_k)
+
+
+async def lexical_matches(query):
+    """Return (matches, query_ms) if the lexical index answers alone, else None.
+
+    "lexical" requests always are; "auto" requests only when the lexical
+    hits are confident (a few rare terms, all found in one document), so
+    exact names and titles skip the encoder entirely. Queries with too
+    many terms to be confident skip the BM25 pass, and so does every
+    "auto" request while the lexical index misses part of the archive.
+    """
+    mode = search_mode(query)
+    if mode not in ("lexical", "auto"):
+        return None
+    stage_at = time.perf_counter()
+    hits = await run_blocking(get_index_executor(), lexical_hits, query)
+    if hits is None:
+        return None
+    if mode == "lexical" or hits.confident:
+        return hits.matches, elapsed_ms_since(stage_at)
+    return None
+
+
+async def query_matches(query, embedded):
+    """Query the index for an embedded request; returns (matches, query_ms).
+
+    In hybrid mode the vector and lexical candidates are fetched
+    concurrently and merged by reciprocal-rank fusion.
+    """
+    stage_at = time.perf_counter()
+    top_k = query.top_k
+    if search_mode(query) == "hybrid":
+        top_k = max(top_k, HYBRID_CANDIDATES)
+    vector_query = run_blocking(
+        get_index_executor(),
+        query_index,
+        embedded.vector,
+        top_k,
+        category_filter(query.categories),
+        query.nprobe,
+    )
+    if search_mode(query) != "hybrid":
+        pc_response = await vector_query
+        return pc_response.get("matches", []), elapsed_ms_since(stage_at)
+    pc_response, hits = await asyncio.gather(
+        vector_query,
+        run_blocking(get_index_executor(), lexical_search, query, top_k),
+    )
+    matches = reciprocal_rank_fusion(
+        [pc_response.get("matches", []), hits.matches], query.top_k
+    )
+    return matches, elapsed_ms_since(stage_at)
+
+
+async def retrieve(query):
+    """Find the matches for a request; returns (embedded, matches, query_ms, path).
+
+    The query is only encoded when the lexical index does not answer it.
+    """
+    lexical = await lexical_matches(query)
+    if lexical is not None:
+        return (NO_EMBEDDING, *lexical, "lexical")
+    embedded = await embed_query(query.query)
+    matches, query_ms = await query_matches(query, embedded)
+    return embedded, matches, query_ms, vector_path(query)
+
+
+def index_total_vectors():
+    """Return (cached index vector count, stats_ms); never waits on the stats call."""
+    stage_at = time.perf_counter()
+    total_vectors = get_stats_cache().total_vectors
+    return total_vectors, elapsed_ms_since(stage_at)
+
+
+def search_metrics(query, embedded, started_at, total_vectors, timings, served_by):
+    """Record per-stage `timings` (ms) and return the request's `SearchMetrics`.
+
+    `timings` maps each stage (encode, query, stats, build) to milliseconds;
+    they are also recorded in the `gossip_search_stage_duration_seconds`
+    histogram. `served_by` names the retrieval path (vector, lexical, hybrid).
+    """
+    for stage, ms in timings.items():
+        SEARCH_STAGE_DURATION.observe(ms / 1000, stage=stage)
+    SEARCH_SERVED.inc(path=served_by)
+    return SearchMetrics(
+        served_by=served_by,
+        elapsed_ms=int(elapsed_ms_since(started_at)),
+        top_k=query.top_k,
+        total_vectors=total_vectors,
+        filtered=category_filter(query.categories) is not None,
+        embedding_cache_hit=embedded.cache_hit,
+        embedding_cache_hits=get_query_cache().hits,
+        embedding_cache_misses=get_query_cache().misses,
+        encode_batch_size=embedded.batch_size,
+        encode_queue_wait_ms=round(embedded.queue_wait_ms, 3),
+        **{f"{stage}_ms": round(ms, 3) for stage, ms in timings.items()},
+    )
+
+
+def build_response(query, embedded, matches, query_ms, served_by, started_at):
+    """Build the `SearchResponse` for a request's matches."""
+    total_vectors, stats_ms = index_total_vectors()
+
+    stage_at = time.perf_counter()
+    results = [match_to_result(match) for match in matches]
+    build_ms = elapsed_ms_since(stage_at)
+
+    timings = {
+        "encode": embedded.encode_ms,
+        "query": query_ms,
+        "stats": stats_ms,
+        "build": build_ms,
+    }
+    return SearchResponse(
+        results=results,
+        metrics=search_metrics(
+            query, embedded, started_at, total_vectors, timings, served_by
+        ),
+    )
+
+
+async def run_search(query, embedded, started_at):
+    """Query the index for an already-embedded request and build the response."""
+    matches, query_ms = await query_matches(query, embedded)
+    return build_response(
+        query, embedded, matches, query_ms, vector_path(query), started_at
+    )
+
+
+def get_response_cache():
+    """Return the process-wide response `TTLCache`, initializing on first use."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = TTLCache(
+            maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_S
+        )
+    return _response_cache
+
+
+def get_cursor_store():
+    """Return the process-wide `CursorStore`, initializing on first use."""
+    global _cursor_store
+    if _cursor_store is None:
+        _cursor_store = CursorStore(max_items=CURSOR_MAX_RESULTS, ttl=CURSOR_TTL_S)
+    return _cursor_store
+
+
+async def first_page(query, started_at):
+    """Fetch the candidates of a paginated search once and return page one.
+
+    `PAGINATION_CANDIDATES` results (at least one page) are retrieved and
+    kept in the cursor store; `next_cursor` pages through them without
+    encoding or querying again.
+    """
+    candidates = query.model_copy(
+        update={"top_k": max(query.page_size, PAGINATION_CANDIDATES)}
+    )
+    full = build_response(candidates, *await retrieve(candidates), started_at)
+    page, next_cursor = get_cursor_store().create(
+        full.results,
+        query.page_size,
+        (full.metrics, query.fields, query.summary_chars),
+    )
+    metrics = full.metrics.model_copy(update={"top_k": len(page)})
+    return SearchResponse(results=page, metrics=metrics, next_cursor=next_cursor)
+
+
+def response_cache_key(query, generation):
+    """Key a request on its normalized fields and the current index generation.
+
+    Ingestion bumps the generation after upserting, so entries computed
+    against an older index are never served again.
+    """
+    categories = tuple(sorted(set(query.categories or ())))
+    return (
+        generation,
+        normalize_query(query.query),
+        query.top_k,
+        categories,
+        query.nprobe,
+        search_mode(query),
+    )
+
+
+def cached_response(key, started_at):
+    """Return a cached `SearchResponse` for `key` marked as a hit, or None."""
+    cached = get_response_cache().get(key)
+    if cached is None:
+        return None
+    SEARCH_SERVED.inc(path="cache")
+    # None of the search stages ran for a cached response
+    metrics = cached.metrics.model_copy(
+        update={
+            "elapsed_ms": int(elapsed_ms_since(started_at)),
+            "response_cache_hit": True,
+            "encode_ms": 0.0,
+            "query_ms": 0.0,
+            "stats_ms": 0.0,
+            "build_ms": 0.0,
+        }
+    )
+    return cached.model_copy(update={"metrics": metrics})
+
+
 @app.post("/search")
 async def search(query: SearchRequest) -> SearchResponse:
-    """Search the Pinecone index for results similar to the input query.
+    """Search the vector index for results similar to the input query.
 
-    Returns a list of result items and request/engine metrics.
+    Depending on the request's `mode`, keyword queries may be answered by
+    the lexical index alone, or both indexes are fused (`served_by` in the
+    metrics tells which). Returns a list of result items and request/engine
+    metrics. Identical requests are answered from the response cache until
+    the TTL expires or ingestion bumps the index generation; `X-Cache` tells
+    which happened. With `page_size`, the first page is returned with a
+    `next_cursor` for `GET /search/page`; paginated searches bypass the
+    response cache. `fields` and `summary_chars` trim each result as it is
+    serialized.
     """
-    # Generate query embedding
     started_at = time.perf_counter()
-    query_embedding = get_model().encode(query.query, convert_to_tensor=True).tolist()
+    projection = (query.fields, query.summary_chars)
+    if query.page_size is not None:
+        page = await first_page(query, started_at)
+        return json_response("/search", page, *projection)
+    key = response_cache_key(query, read_index_generation(DATA_DIR))
+    cached = cached_response(key, started_at)
+    if cached is not None:
+        return json_response("/search", cached, *projection, {"X-Cache": "HIT"})
 
-    # Optional metadata filter
-    pinecone_filter = None
-    if query.categories:
-        if len(query.categories) == 1:
-            pinecone_filter = {"category": {"$eq": query.categories[0]}}
-        else:
-            pinecone_filter = {"category": {"$in": query.categories}}
+    result = build_response(query, *await retrieve(query), started_at)
+    get_response_cache().set(key, result)
+    return json_response("/search", result, *projection, {"X-Cache": "MISS"})
 
-    # Query Pinecone index
-    pc_response = get_index().query(
-        vector=query_embedding,
-        top_k=query.top_k,
-        include_metadata=True,
-        filter=pinecone_filter,
+
+@app.get("/search/page")
+async def search_page(cursor: str) -> SearchResponse:
+    """Return the next page of a paginated search.
+
+    Pages are sliced from the candidates the first request retrieved, so
+    nothing is encoded or queried. A cursor expires `CURSOR_TTL_S` after
+    the first request (or earlier under memory pressure); 410 then asks
+    the client to search again.
+    """
+    started_at = time.perf_counter()
+    found = get_cursor_store().page(cursor)
+    if found is None:
+        raise HTTPException(
+            status_code=410, detail="Cursor expired or unknown; search again"
+        )
+    results, next_cursor, (first_metrics, fields, summary_chars) = found
+    SEARCH_SERVED.inc(path="cursor")
+    metrics = first_metrics.model_copy(
+        update={
+            "served_by": "cursor",
+            "elapsed_ms": int(elapsed_ms_since(started_at)),
+            "top_k": len(results),
+            "total_vectors": get_stats_cache().total_vectors,
+            "embedding_cache_hit": False,
+            "encode_batch_size": 0,
+            "encode_queue_wait_ms": 0.0,
+            "encode_ms": 0.0,
+            "query_ms": 0.0,
+            "stats_ms": 0.0,
+            "build_ms": 0.0,
+        }
     )
-    elapsed_ms = int((time.perf_counter() - started_at) * 1000)
+    page = SearchResponse(results=results, metrics=metrics, next_cursor=next_cursor)
+    return json_response("/search/page", page, fields, summary_chars)
+
 
-    # Index stats
-    try:
-        stats = get_index().describe_index_stats()
-        total_vectors = stats.get("total_vector_count") or 0
-    except Exception:
-        total_vectors = 0
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
 
-    results = [
+
+def stream_record(kind, data, fmt):
+    """Encode one stream record as an NDJSON line or a server-sent event."""
+    payload = dumps(data)
+    if fmt == "sse":
+        return b"event: " + kind.encode() + b"\ndata: " + payload + b"\n\n"
+    return b'{"type":"' + kind.encode() + b'","data":' + payload + b"}\n"
+
+
+async def stream_matches(
+    query, embedded, matches, query_ms, served_by, started_at, fmt
+):
+    """Yield each match as a result record as it is converted, then metrics.
+
+    `build_ms` covers converting, encoding and sending the results; no
+    result list is materialized.
+    """
+    stage_at = time.perf_counter()
+    size = 0
+    for match in matches:
+        result = project_result(
+            match_to_result(match), query.fields, query.summary_chars
+        )
+        record = stream_record("result", result, fmt)
+        size += len(record)
+        yield record
+    build_ms = elapsed_ms_since(stage_at)
+
+    total_vectors, stats_ms = index_total_vectors()
+    timings = {
+        "encode": embedded.encode_ms,
+        "query": query_ms,
+        "stats": stats_ms,
+        "build": build_ms,
+    }
+    metrics = search_metrics(
+        query, embedded, started_at, total_vectors, timings, served_by
+    )
+    record = stream_record("metrics", metrics.model_dump(), fmt)
+    SEARCH_RESPONSE_BYTES.observe(size + len(record), route="/search/stream")
+    yield record
+
+
+async def stream_cached(query, cached, fmt):
+    """Replay a cached `SearchResponse` as stream records."""
+    size = 0
+    for result in cached.results:
+        data = project_result(result, query.fields, query.summary_chars)
+        record = stream_record("result", data, fmt)
+        size += len(record)
+        yield record
+    record = stream_record("metrics", cached.metrics.model_dump(), fmt)
+    SEARCH_RESPONSE_BYTES.observe(size + len(record), route="/search/stream")
+    yield record
+
+
+@app.post("/search/stream")
+async def search_stream(
+    query: SearchRequest,
+    fmt: Literal["ndjson", "sse"] = Query("ndjson", alias="format"),
+) -> StreamingResponse:
+    """Stream search results as they are serialized, metrics last.
+
+    `?format=ndjson` (default) sends one `{"type": "result"|"metrics",
+    "data": ...}` object per line; `?format=sse` sends the same records as
+    server-sent events named `result` and `metrics`. Cached responses are
+    replayed, but streamed results are not added to the response cache.
+    """
+    started_at = time.perf_counter()
+    key = response_cache_key(query, read_index_generation(DATA_DIR))
+    cached = cached_response(key, started_at)
+    if cached is not None:
+        records = stream_cached(query, cached, fmt)
+    else:
+        # Encode and query before streaming so failures still return an error
+        records = stream_matches(query, *await retrieve(query), started_at, fmt)
+    return StreamingResponse(
+        records,
+        media_type=STREAM_MEDIA_TYPES[fmt],
+        headers={"X-Cache": "HIT" if cached is not None else "MISS"},
+    )
+
+
+@app.post("/search/batch")
+async def search_batch(batch: SearchBatchRequest) -> SearchBatchResponse:
+    """Run several searches with one model call and concurrent index queries.
+
+    Returns one `SearchResponse` per query, in order; each item's
+    `elapsed_ms` is measured from the start of the batch, and its results
+    are trimmed to that item's `fields` / `summary_chars`. Items cannot
+    be paginated (422 on `page_size`).
+    """
+    if len(batch.queries) > SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {SEARCH_BATCH_MAX_QUERIES} queries per batch",
+        )
+    if any(query.page_size is not None for query in batch.queries):
+        raise HTTPException(
+            status_code=422,
+            detail="page_size is not supported in batch; paginate with /search",
+        )
+    started_at = time.perf_counter()
+    generation = read_index_generation(DATA_DIR)
+    keys = [response_cache_key(query, generation) for query in batch.queries]
+    responses = [cached_response(key, started_at) for key in keys]
+    misses = [i for i, cached in enumerate(responses) if cached is None]
+
+    # Queries the lexical index answers alone are never encoded
+    lexical = await asyncio.gather(*(lexical_matches(batch.queries[i]) for i in misses))
+    for i, found in zip(misses, lexical):
+        if found is not None:
+            query = batch.queries[i]
+            responses[i] = build_response(
+                query, NO_EMBEDDING, *found, "lexical", started_at
+            )
+    to_encode = [i for i, found in zip(misses, lexical) if found is None]
+    embedded = await embed_queries([batch.queries[i].query for i in to_encode])
+    encode_ms = int(elapsed_ms_since(started_at))
+    computed = await asyncio.gather(
+        *(
+            run_search(batch.queries[i], item, started_at)
+            for i, item in zip(to_encode, embedded)
+        )
+    )
+    for i, result in zip(to_encode, computed):
+        responses[i] = result
+    for i in misses:
+        get_response_cache().set(keys[i], responses[i])
+    metrics = SearchBatchMetrics(
+        elapsed_ms=int(elapsed_ms_since(started_at)),
+        encode_ms=encode_ms,
+        count=len(responses),
+        encoded=max((item.batch_size for item in embedded), default=0),
+    )
+    stage_at = time.perf_counter()
+    body = dumps(
         {
-            "title": match["metadata"].get("title", "Untitled"),
-            "url": match["id"],
-            "summary": match["metadata"].get("summary", ""),
-            "category": match["metadata"].get("category", "unknown"),
-            "published": match["metadata"].get("published", ""),
-            "score": match.get("score"),
+            "responses": [
+                response_payload(response, query.fields, query.summary_chars)
+                for query, response in zip(batch.queries, responses)
+            ],
+            "metrics": metrics.model_dump(),
         }
-        for match in pc_response.get("matches", [])
-    ]
+    )
+    SEARCH_STAGE_DURATION.observe(elapsed_ms_since(stage_at) / 1000, stage="serialize")
+    SEARCH_RESPONSE_BYTES.observe(len(body), route="/search/batch")
+    return Response(body, media_type="application/json")
 
-    return SearchResponse(
-        results=[
-            SearchResult(
-                title=item["title"],
-                url=item["url"],
-                summary=item["summary"],
-                category=item["category"],
-                published=item["published"],
-                score=item.get("score"),
-            )
-            for item in results
-        ],
-        metrics=SearchMetrics(
-            elapsed_ms=elapsed_ms,
-            top_k=query.top_k,
-            total_vectors=total_vectors,
-            filtered=bool(pinecone_filter is not None),
-        ),
+
+def _cache_requests(cache):
+    """Hit/miss samples for a cache that may not have been created yet."""
+    if cache is None:
+        return {}
+    return {("hit",): cache.hits, ("miss",): cache.misses}
+
+
+METRICS.callback(
+    "gossip_embedding_cache_requests_total",
+    "Query-embedding cache lookups by result.",
+    "counter",
+    lambda: _cache_requests(_query_cache),
+    ("result",),
+)
+METRICS.callback(
+    "gossip_response_cache_requests_total",
+    "Response cache lookups by result.",
+    "counter",
+    lambda: _cache_requests(_response_cache),
+    ("result",),
+)
+METRICS.callback(
+    "gossip_cursor_results",
+    "Search results held for pagination cursors.",
+    "gauge",
+    lambda: {(): _cursor_store.items} if _cursor_store is not None else {},
+)
+METRICS.callback(
+    "gossip_index_vectors",
+    "Vectors in the index as of the last stats refresh.",
+    "gauge",
+    lambda: {(): _stats_cache.total_vectors} if _stats_cache is not None else {},
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency and in-flight requests.
+
+    Requests are labelled by route template rather than raw path so label
+    cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        try:
+            with HTTP_IN_FLIGHT.track_inprogress():
+                await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            HTTP_DURATION.observe(time.perf_counter() - started_at, route=path)
+            HTTP_REQUESTS.inc(route=path, method=scope["method"], status=status)
+
+
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe: OK while the process serves, unless warm-up failed."""
+    if _startup_error is not None:
+        return JSONResponse(
+            {"status": "error", "error": _startup_error}, status_code=503
+        )
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: 200 once warm-up has finished, 503 until then."""
+    body = {"ready": _ready, "phases_ms": _startup_phases, "error": _startup_error}
+    return JSONResponse(body, status_code=200 if _ready else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Expose metrics in the Prometheus text format.
+
+    Includes the counters last published by ingestion
+    (`DATA_DIR/ingest_metrics.prom`).
+    """
+    return PlainTextResponse(
+        METRICS.render() + read_textfile(DATA_DIR / INGEST_METRICS_FILE),
+        media_type="text/plain; version=0.0.4",
     )
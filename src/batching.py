@@ -0,0 +1,117 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, NamedTuple, Optional
+
+_STOP = object()
+
+
+class BatchResult(NamedTuple):
+    """Output for one submitted item plus how it was batched."""
+
+    value: Any
+    batch_size: int
+    queue_wait_ms: float
+
+
+class _Pending(NamedTuple):
+    item: Any
+    future: Future
+    enqueued_at: float
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into one batched call.
+
+    Items submitted within `window_ms` of the first queued item (or until
+    `max_batch_size` items are queued) are passed together to `batch_fn`,
+    which must return one output per input in order. Batches run on
+    `executor` when given, so several batches can be in flight at once;
+    otherwise they run on the collector thread.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 32,
+        window_ms: float = 3.0,
+        executor=None,
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.window_s = max(0.0, window_ms) / 1000
+        self.executor = executor
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: Any) -> Future:
+        """Queue `item` and return a future resolving to a `BatchResult`."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put(_Pending(item, future, time.perf_counter()))
+        return future
+
+    def close(self) -> None:
+        """Stop the collector thread once queued items are dispatched."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._collect, name="micro-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = first.enqueued_at + self.window_s
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        pending = self._queue.get(timeout=remaining)
+                    else:
+                        pending = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is _STOP:
+                    stopping = True
+                    break
+                batch.append(pending)
+            if self.executor is not None:
+                self.executor.submit(self._run, batch)
+            else:
+                self._run(batch)
+
+    def _run(self, batch: List[_Pending]) -> None:
+        # Drop items whose caller gave up (e.g. a cancelled request); the
+        # rest are marked running so they can no longer be cancelled
+        batch = [p for p in batch if p.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started_at = time.perf_counter()
+        try:
+            outputs = self.batch_fn([pending.item for pending in batch])
+            if len(outputs) != len(batch):
+                raise ValueError(
+                    f"batch_fn returned {len(outputs)} outputs for {len(batch)} inputs"
+                )
+        except Exception as exc:
+            for pending in batch:
+                pending.future.set_exception(exc)
+            return
+        for pending, output in zip(batch, outputs):
+            wait_ms = (started_at - pending.enqueued_at) * 1000
+            pending.future.set_result(BatchResult(output, len(batch), wait_ms))
@@ -0,0 +1,284 @@
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable, List, Optional, Sequence, Tuple
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a query string for cache keys (NFKC, casefold, collapse spaces)."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class TTLCache:
+    """Thread-safe LRU cache with an optional time-to-live per entry.
+
+    `ttl` is in seconds; `None` or `0` disables expiry. Hits and misses are
+    counted so callers can surface them as metrics.
+    """
+
+    def __init__(
+        self, maxsize: int = 1024, ttl: Optional[float] = None, clock=time.monotonic
+    ):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = ttl or None
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for `key`, or `default` if absent or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Insert or refresh `key`, evicting the least recently used entries."""
+        if self.maxsize == 0:
+            return
+        expires_at = self._clock() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CursorStore:
+    """Result lists kept server-side behind opaque pagination cursors.
+
+    `create` returns the first page and a cursor to the next one; the rest
+    of the list is kept for `ttl` seconds from creation, however often it
+    is paged. Memory is bounded by `max_items`, the number of items held
+    across all lists: the oldest lists are evicted first.
+    """
+
+    def __init__(self, max_items: int = 50000, ttl: float = 300, clock=time.monotonic):
+        self.max_items = max(0, int(max_items))
+        self.ttl = ttl
+        self._clock = clock
+        # id -> (expires_at, page_size, items, context), oldest first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.items = 0
+
+    def _expire(self) -> None:
+        now = self._clock()
+        while self._entries:
+            entry_id, (expires_at, _, items, _) = next(iter(self._entries.items()))
+            if expires_at > now and self.items <= self.max_items:
+                return
+            del self._entries[entry_id]
+            self.items -= len(items)
+
+    def create(
+        self, items: Sequence[Any], page_size: int, context: Any = None
+    ) -> Tuple[List[Any], Optional[str]]:
+        """Return the first `page_size` items and a cursor to the rest, if any.
+
+        `context` is returned with every later page.
+        """
+        items = list(items[: self.max_items])
+        page = items[:page_size]
+        if len(items) <= page_size:
+            return page, None
+        entry_id = secrets.token_urlsafe(12)
+        with self._lock:
+            self._entries[entry_id] = (
+                self._clock() + self.ttl,
+                page_size,
+                items,
+                context,
+            )
+            self.items += len(items)
+            self._expire()
+        return page, f"{entry_id}.{page_size}"
+
+    def page(self, cursor: str) -> Optional[Tuple[List[Any], Optional[str], Any]]:
+        """Return (items, next cursor, context) for `cursor`, or None if it expired."""
+        entry_id, _, offset = cursor.rpartition(".")
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(entry_id)
+        if entry is None or not offset.isdigit():
+            return None
+        _, page_size, items, context = entry
+        start = int(offset)
+        end = start + page_size
+        next_cursor = f"{entry_id}.{end}" if end < len(items) else None
+        return items[start:end], next_cursor, context
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class QueryEmbeddingCache:
+    """Two-tier cache of query embeddings keyed on the normalized query text.
+
+    The memory tier is a `TTLCache`; the optional disk tier is a small SQLite
+    table so hot queries survive restarts. Keys include the model name so a
+    model change never serves vectors from another embedding space. Disk
+    writes are queued to a background thread, so `put` never waits on
+    SQLite; only `get` reads the disk, on a memory miss (`get_from_memory`
+    never does).
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        disk_path: Optional[Path] = None,
+    ):
+        self.model_name = model_name
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl or None
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._writes: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+        if disk_path is not None:
+            disk_path = Path(disk_path)
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(disk_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            if self.ttl:
+                self._db.execute(
+                    "DELETE FROM query_embeddings WHERE created_at < ?",
+                    (time.time() - self.ttl,),
+                )
+            self._db.commit()
+            self._writer = threading.Thread(
+                target=self._write_behind, name="query-cache-writer", daemon=True
+            )
+            self._writer.start()
+
+    @property
+    def has_disk_tier(self) -> bool:
+        return self._db is not None
+
+    def _key(self, query: str) -> str:
+        return f"{self.model_name}\x00{normalize_query(query)}"
+
+    def _load(self, key: str) -> Optional[List[float]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT vector, created_at FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (self.ttl and row[1] < time.time() - self.ttl):
+            return None
+        return array("f", row[0]).tolist()
+
+    def _count(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_from_memory(self, query: str) -> Optional[List[float]]:
+        """Return the embedding for `query` if the memory tier has it.
+
+        A hit is counted; a miss is not, since the caller is expected to
+        fall back to `get`.
+        """
+        embedding = self.memory.get(self._key(query))
+        if embedding is not None:
+            self._count(True)
+        return embedding
+
+    def get(self, query: str) -> Optional[List[float]]:
+        """Return the cached embedding for `query`, consulting disk on a memory miss."""
+        key = self._key(query)
+        embedding = self.memory.get(key)
+        if embedding is None and self._db is not None:
+            embedding = self._load(key)
+            if embedding is not None:
+                self.memory.set(key, embedding)
+        self._count(embedding is not None)
+        return embedding
+
+    def get_many(self, queries: Sequence[str]) -> List[Optional[List[float]]]:
+        """Return `get(query)` for each query."""
+        return [self.get(query) for query in queries]
+
+    def put(self, query: str, embedding: List[float]) -> None:
+        """Store `embedding` for `query` in memory and queue it for the disk tier."""
+        key = self._key(query)
+        self.memory.set(key, embedding)
+        if self._db is None:
+            return
+        self._writes.put((key, array("f", embedding).tobytes(), time.time()))
+
+    def _write_behind(self) -> None:
+        """Write queued entries to SQLite, one transaction per burst."""
+        while True:
+            rows = [self._writes.get()]
+            while True:
+                try:
+                    rows.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in rows
+            rows = [row for row in rows if row is not None]
+            try:
+                if rows:
+                    with self._db_lock:
+                        self._db.executemany(
+                            "INSERT OR REPLACE INTO query_embeddings "
+                            "(key, vector, created_at) VALUES (?, ?, ?)",
+                            rows,
+                        )
+                        self._db.commit()
+            except sqlite3.Error as exc:
+                # The memory tier still has the entries; only persistence is lost
+                print(f"Query cache write failed: {exc}")
+            finally:
+                for _ in range(len(rows) + stop):
+                    self._writes.task_done()
+            if stop:
+                return
+
+    def flush(self) -> None:
+        """Wait until every queued disk write has been committed."""
+        if self._writer is not None:
+            self._writes.join()
+
+    def close(self) -> None:
+        """Write pending entries, then close the disk tier, if any."""
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
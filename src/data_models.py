@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class Article(BaseModel):
@@ -12,10 +12,41 @@ class Article(BaseModel):
     category: Optional[str] = None
 
 
+class FeedFetchResult(BaseModel):
+    """Outcome of one (conditional) feed download."""
+
+    category: str
+    url: str
+    articles: List[Article] = []
+    etag: Optional[str] = None
+    modified: Optional[str] = None
+    unchanged: bool = False
+    bytes_downloaded: int = 0
+    elapsed_ms: int = 0
+    error: Optional[str] = None
+    # Ingestion outcome of the feed's articles, by content fingerprint
+    new_articles: int = 0
+    changed_articles: int = 0
+    unchanged_articles: int = 0
+
+
 class SearchRequest(BaseModel):
     query: str
     top_k: int = 5
     categories: Optional[List[str]] = None
+    # Inverted lists probed by the IVF backend (None = index default)
+    nprobe: Optional[int] = Field(default=None, ge=1)
+    # "vector", "lexical" (BM25 only), "auto" (lexical when confident, else
+    # vector) or "hybrid" (both, fused); None = the server's SEARCH_MODE
+    mode: Optional[Literal["vector", "lexical", "auto", "hybrid"]] = None
+    # Paginate /search: results per page; later pages come from
+    # GET /search/page with the response's `next_cursor`
+    page_size: Optional[int] = Field(default=None, ge=1)
+    # Result fields to return (None = all) and maximum summary length
+    fields: Optional[
+        List[Literal["title", "url", "summary", "category", "published", "score"]]
+    ] = None
+    summary_chars: Optional[int] = Field(default=None, ge=0)
 
 
 class SearchResult(BaseModel):
@@ -32,11 +63,43 @@ class SearchMetrics(BaseModel):
     top_k: int
     total_vectors: int
     filtered: bool
+    embedding_cache_hit: bool = False
+    embedding_cache_hits: int = 0
+    embedding_cache_misses: int = 0
+    encode_batch_size: int = 0
+    encode_queue_wait_ms: float = 0.0
+    response_cache_hit: bool = False
+    # Retrieval path that produced the results: vector, lexical, hybrid, or
+    # cursor for a later page of a paginated search
+    served_by: str = "vector"
+    # Per-stage timings; `elapsed_ms` spans all of them
+    encode_ms: float = 0.0
+    query_ms: float = 0.0
+    stats_ms: float = 0.0
+    build_ms: float = 0.0
 
 
 class SearchResponse(BaseModel):
     results: List[SearchResult]
     metrics: SearchMetrics
+    # Cursor to the next page of a paginated search (None = last page)
+    next_cursor: Optional[str] = None
+
+
+class SearchBatchRequest(BaseModel):
+    queries: List[SearchRequest]
+
+
+class SearchBatchMetrics(BaseModel):
+    elapsed_ms: int
+    encode_ms: int
+    count: int
+    encoded: int
+
+
+class SearchBatchResponse(BaseModel):
+    responses: List[SearchResponse]
+    metrics: SearchBatchMetrics
 
 
 class Query(BaseModel):
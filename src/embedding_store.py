@@ -0,0 +1,200 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .url_store import SQLITE_IN_CHUNK
+
+# Directory under DATA_DIR holding the ingestion embedding store
+EMBEDDING_STORE_DIR = "embeddings"
+
+
+def content_key(model_name: str, text: str) -> bytes:
+    """Return the store key of `text` embedded by `model_name`."""
+    payload = f"{model_name}\0{text}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+class EmbeddingStore:
+    """Content-addressed, append-only store of computed embeddings.
+
+    Vectors are float32 rows appended to `vectors.f32` and read back
+    through a memory map; `index.sqlite3` maps each content key (a hash
+    of model name and embedded text) to its row, so an embedding is
+    computed once no matter how often the text is seen. It also records,
+    per article link, the content key and metadata of its latest version,
+    which is all a vector index needs to be rebuilt without the model.
+
+    Rows are appended before their keys are committed; rows past the
+    committed count (a crash mid-write) are truncated on the next write.
+    Use a single writer process.
+    """
+
+    def __init__(self, directory, model_name: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.vectors_path = self.directory / "vectors.f32"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            str(self.directory / "index.sqlite3"), check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "content_key BLOB PRIMARY KEY, row INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "model TEXT NOT NULL, link TEXT NOT NULL, content_key BLOB NOT NULL, "
+            "metadata TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "PRIMARY KEY (model, link)) WITHOUT ROWID"
+        )
+        self._db.commit()
+        row = self._db.execute("SELECT value FROM settings WHERE name = 'dim'")
+        found = row.fetchone()
+        self.dim: Optional[int] = int(found[0]) if found else None
+        self._vectors: Optional[np.ndarray] = None
+
+    def __enter__(self) -> "EmbeddingStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def key(self, text: str) -> bytes:
+        return content_key(self.model_name, text)
+
+    def _rows(self, keys: Sequence[bytes]) -> Dict[bytes, int]:
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), SQLITE_IN_CHUNK):
+            chunk = unique[start : start + SQLITE_IN_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(
+                self._db.execute(
+                    "SELECT content_key, row FROM embeddings "
+                    f"WHERE content_key IN ({placeholders})",
+                    chunk,
+                )
+            )
+        return found
+
+    def _read(self, rows: Sequence[int]) -> np.ndarray:
+        """Return the float32 vectors stored at `rows`."""
+        needed = max(rows) + 1
+        if self._vectors is None or len(self._vectors) < needed:
+            count = len(self)
+            self._vectors = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim)
+            )
+        return np.asarray(self._vectors[np.asarray(rows)])
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Return the stored embedding of each text, or None where missing."""
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            rows = self._rows(keys)
+            if not rows:
+                return [None] * len(keys)
+            hits = [key for key in keys if key in rows]
+            vectors = dict(zip(hits, self._read([rows[key] for key in hits]).tolist()))
+        return [vectors.get(key) for key in keys]
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Append embeddings for `texts` that are not stored yet."""
+        values = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+        with self._lock:
+            if self.dim is None:
+                self.dim = values.shape[1]
+                self._db.execute(
+                    "INSERT INTO settings (name, value) VALUES ('dim', ?)",
+                    (str(self.dim),),
+                )
+            elif values.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {values.shape[1]} does not match "
+                    f"the store's dimension {self.dim}"
+                )
+            stored = self._rows([self.key(text) for text in texts])
+            new = {}
+            for text, vector in zip(texts, values):
+                key = self.key(text)
+                if key not in stored:
+                    new.setdefault(key, vector)
+            if not new:
+                self._db.commit()
+                return
+            count = len(self)
+            with open(self.vectors_path, "ab") as f:
+                # Drop rows written after the last commit (interrupted write)
+                f.truncate(count * self.dim * 4)
+                f.write(np.asarray(list(new.values()), dtype=np.float32).tobytes())
+            self._db.executemany(
+                "INSERT INTO embeddings (content_key, row) VALUES (?, ?)",
+                ((key, count + i) for i, key in enumerate(new)),
+            )
+            self._db.commit()
+
+    def record_documents(
+        self, documents: Iterable[Tuple[str, str, Dict[str, Any]]]
+    ) -> None:
+        """Record `(link, text, metadata)` as the latest version of each link."""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO documents "
+                "(model, link, content_key, metadata, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    (self.model_name, link, self.key(text), json.dumps(meta), now)
+                    for link, text, meta in documents
+                ),
+            )
+            self._db.commit()
+
+    def document_count(self) -> int:
+        return self._db.execute(
+            "SELECT COUNT(*) FROM documents WHERE model = ?", (self.model_name,)
+        ).fetchone()[0]
+
+    def iter_documents(
+        self, batch_size: int = 1000
+    ) -> Iterator[List[Tuple[str, List[float], Dict[str, Any]]]]:
+        """Yield `(link, vector, metadata)` records in batches, ready to upsert.
+
+        Documents are read in link order, one batch at a time, so memory
+        stays bounded however large the store is.
+        """
+        after = ""
+        while True:
+            with self._lock:
+                batch = self._db.execute(
+                    "SELECT d.link, d.metadata, e.row FROM documents d "
+                    "JOIN embeddings e ON e.content_key = d.content_key "
+                    "WHERE d.model = ? AND d.link > ? ORDER BY d.link LIMIT ?",
+                    (self.model_name, after, max(1, batch_size)),
+                ).fetchall()
+                if not batch:
+                    return
+                vectors = self._read([row for _, _, row in batch]).tolist()
+            yield [
+                (link, vector, json.loads(meta))
+                for (link, meta, _), vector in zip(batch, vectors)
+            ]
+            after = batch[-1][0]
+
+    def close(self) -> None:
+        self._vectors = None
+        self._db.close()
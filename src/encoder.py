@@ -0,0 +1,192 @@
+"""Sentence encoder backends for CPU inference, shared by search and ingestion.
+
+`ENCODER_BACKEND` selects how the model runs:
+
+- `torch`: the reference full-precision PyTorch model.
+- `torch-int8`: PyTorch with int8 dynamic quantization of the linear layers.
+- `onnx` / `onnx-int8`: ONNX Runtime, full precision or with the model's
+  int8-quantized export (needs `sentence-transformers[onnx]`).
+
+Optimized backends are close to, not equal to, the reference. Check their
+cosine agreement (and latency) on sample texts before switching:
+
+    uv run python -m src.encoder --backend onnx-int8
+"""
+
+import argparse
+import os
+import statistics
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ENCODER_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch")
+# Threads of one encode (intra-op) and across independent ops (inter-op);
+# 0 keeps the runtime default. Under the backend, ENCODE_WORKERS encodes
+# run at once, so intra-op threads x ENCODE_WORKERS should not exceed the cores.
+ENCODER_INTRA_OP_THREADS = int(os.getenv("ENCODER_INTRA_OP_THREADS", "0"))
+ENCODER_INTER_OP_THREADS = int(os.getenv("ENCODER_INTER_OP_THREADS", "0"))
+# Quantized ONNX export used by `onnx-int8`, relative to the model repository
+ENCODER_ONNX_INT8_FILE = os.getenv(
+    "ENCODER_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx"
+)
+# Lowest per-text cosine to the reference accepted by the agreement check
+ENCODER_MIN_AGREEMENT = float(os.getenv("ENCODER_MIN_AGREEMENT", "0.99"))
+
+# Texts the agreement check encodes when not given a file
+SAMPLE_TEXTS = [
+    "Kylian Mbappé signe au Real Madrid après des mois de rumeurs",
+    "Le mariage surprise d'une star de la télé-réalité à Saint-Tropez",
+    "La famille royale britannique réunie pour le couronnement",
+    "Festival de Cannes : les plus belles robes de la montée des marches",
+    "Divorce : le chanteur brise le silence dans une interview",
+    "Une actrice annonce sa grossesse sur Instagram",
+    "Le prince et la princesse en visite officielle au Japon",
+    "Concert annulé : les fans déçus réclament un remboursement",
+    "Who will host the next season of the dating show?",
+    "Royal wedding guest list leaked ahead of the ceremony",
+]
+
+
+def encoder_id(model_name: str, backend: Optional[str] = None) -> str:
+    """Return the cache key of embeddings from `model_name` on `backend`.
+
+    Optimized backends give slightly different vectors, so caches and the
+    embedding store keep them apart from the reference model's.
+    """
+    backend = backend or ENCODER_BACKEND
+    return model_name if backend == "torch" else f"{model_name}:{backend}"
+
+
+def configure_torch_threads(intra_op: int, inter_op: int) -> None:
+    """Apply the PyTorch thread counts (0 keeps the default)."""
+    if not intra_op and not inter_op:
+        return
+    import torch
+
+    if intra_op:
+        torch.set_num_threads(intra_op)
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as exc:
+            # Only settable once, before any inter-op parallel work
+            print(f"Could not set inter-op threads: {exc}")
+
+
+def onnx_session_options(intra_op: int, inter_op: int):
+    """Return ONNX Runtime session options with the thread counts applied."""
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    if intra_op:
+        options.intra_op_num_threads = intra_op
+    if inter_op:
+        options.inter_op_num_threads = inter_op
+    return options
+
+
+def load_encoder(
+    model_name: str,
+    backend: Optional[str] = None,
+    intra_op_threads: Optional[int] = None,
+    inter_op_threads: Optional[int] = None,
+):
+    """Load `model_name` as a `SentenceTransformer` running on `backend`.
+
+    Every backend returns a model with the usual `encode`, so callers do
+    not depend on the choice. Imports are deferred because they pull in
+    torch or ONNX Runtime.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or ENCODER_BACKEND
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(
+            f"Unknown encoder backend {backend!r}; expected one of {ENCODER_BACKENDS}"
+        )
+    intra_op = (
+        ENCODER_INTRA_OP_THREADS if intra_op_threads is None else intra_op_threads
+    )
+    inter_op = (
+        ENCODER_INTER_OP_THREADS if inter_op_threads is None else inter_op_threads
+    )
+    if backend.startswith("onnx"):
+        model_kwargs = {"session_options": onnx_session_options(intra_op, inter_op)}
+        if backend == "onnx-int8":
+            model_kwargs["file_name"] = ENCODER_ONNX_INT8_FILE
+        return SentenceTransformer(
+            model_name, backend="onnx", model_kwargs=model_kwargs
+        )
+    configure_torch_threads(intra_op, inter_op)
+    model = SentenceTransformer(model_name)
+    if backend == "torch-int8":
+        import torch
+
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    return model
+
+
+def _unit_rows(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def cosine_agreement(candidate, reference, texts: List[str]) -> Dict[str, float]:
+    """Return the mean and minimum cosine between two models' embeddings of `texts`."""
+    a = _unit_rows(candidate.encode(texts, convert_to_numpy=True))
+    b = _unit_rows(reference.encode(texts, convert_to_numpy=True))
+    cosines = (a * b).sum(axis=1)
+    return {"mean": float(cosines.mean()), "min": float(cosines.min())}
+
+
+def single_query_ms(model, texts: List[str]) -> float:
+    """Return the median latency of encoding one text at a time, in ms."""
+    model.encode(texts[:1])  # warm-up
+    timings = []
+    for text in texts:
+        started_at = time.perf_counter()
+        model.encode([text])
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(timings)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backend", choices=ENCODER_BACKENDS, default=ENCODER_BACKEND)
+    parser.add_argument("--reference", choices=ENCODER_BACKENDS, default="torch")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--texts", help="file with one text per line")
+    parser.add_argument("--min-agreement", type=float, default=ENCODER_MIN_AGREEMENT)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Compare a backend with the reference; returns 1 below `--min-agreement`."""
+    args = parse_args(argv)
+    texts = SAMPLE_TEXTS
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    candidate = load_encoder(args.model, args.backend)
+    reference = load_encoder(args.model, args.reference)
+    agreement = cosine_agreement(candidate, reference, texts)
+    print(
+        f"{args.backend} vs {args.reference} on {len(texts)} texts: "
+        f"cosine mean {agreement['mean']:.4f}, min {agreement['min']:.4f}"
+    )
+    for name, model in ((args.backend, candidate), (args.reference, reference)):
+        print(f"  {name:<10} {single_query_ms(model, texts):.1f} ms per query")
+    if agreement["min"] < args.min_agreement:
+        print(f"Agreement below {args.min_agreement}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,15 @@
 import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
 import requests
 import streamlit as st
 from datetime import datetime
 import json
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 
 st.set_page_config(
     page_title="Gossip Semantic Search",
@@ -12,25 +18,97 @@ st.set_page_config(
 )
 
 DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
-DATA_DIR.mkdir(parents=True, exist_ok=True)
-HISTORY_PATH = DATA_DIR / "ui_search_history.json"
+# Per-session search history, one append-only JSON-lines file per session
+HISTORY_DIR = DATA_DIR / "ui_history"
+HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+HISTORY_LENGTH = 10
+# Backend base URL
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000").rstrip("/")
+# Keep-alive connections to the backend shared by all sessions
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+# Identical searches are served from memory for this long
+SEARCH_CACHE_TTL_S = int(os.getenv("SEARCH_CACHE_TTL_S", "60"))
+SEARCH_CACHE_SIZE = 256
 
 
-def load_history_from_disk():
-    try:
-        if HISTORY_PATH.exists():
-            return json.loads(HISTORY_PATH.read_text())
-    except Exception:
-        pass
-    return []
+@st.cache_resource
+def http_session():
+    """Return the keep-alive HTTP session shared by every Streamlit session."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class HistoryWriter:
+    """Append history records to per-session files on a background thread.
+
+    Rendering only enqueues a record; the thread appends one JSON line per
+    record, so a write never rewrites the file or blocks the page.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, name="history-writer", daemon=True).start()
+
+    def append(self, session_id, record):
+        self._queue.put((session_id, record))
+
+    def _run(self):
+        while True:
+            session_id, record = self._queue.get()
+            try:
+                with open(history_path(session_id), "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError:
+                pass
+
 
+@st.cache_resource
+def history_writer():
+    return HistoryWriter()
 
-def save_history_to_disk(history):
+
+def history_path(session_id):
+    return HISTORY_DIR / f"{session_id}.jsonl"
+
+
+def session_id():
+    """Return this browser session's id, kept in the URL across reloads."""
+    sid = st.query_params.get("sid", "")
+    if not (sid.isalnum() and len(sid) == 32):
+        sid = uuid.uuid4().hex
+        st.query_params["sid"] = sid
+    return sid
+
+
+def load_history_from_disk(sid):
+    """Return the session's latest searches, newest first.
+
+    A `{"cleared": true}` record drops everything appended before it.
+    """
+    history = []
     try:
-        HISTORY_PATH.write_text(json.dumps(history[:50], ensure_ascii=False, indent=2))
-    except Exception:
+        with open(history_path(sid), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line of an interrupted write
+                if record.get("cleared"):
+                    history.clear()
+                else:
+                    history.append(record)
+    except OSError:
         pass
+    return history[::-1][:HISTORY_LENGTH]
+
 
+# Search history state (load from disk on first run)
+if "history" not in st.session_state:
+    st.session_state.session_id = session_id()
+    st.session_state.history = load_history_from_disk(st.session_state.session_id)
 
 # Sidebar controls
 with st.sidebar:
@@ -56,7 +134,7 @@ with st.sidebar:
     st.markdown("---")
     if st.button("Clear recent searches", use_container_width=True):
         st.session_state.history = []
-        save_history_to_disk([])
+        history_writer().append(st.session_state.session_id, {"cleared": True})
         st.success("History cleared")
     st.caption("Tip: Try queries like 'royal wedding outfit' or 'TV host controversy'.")
 
@@ -78,10 +156,6 @@ with st.form("search_form"):
     with col_q2:
         search_clicked = st.form_submit_button("Search", use_container_width=True)
 
-# Search history state (load from disk on first run)
-if "history" not in st.session_state:
-    st.session_state.history = load_history_from_disk()
-
 
 def render_metrics(metrics):
     m1, m2, m3 = st.columns(3)
@@ -97,46 +171,110 @@ def render_result_card(item):
         st.write(item.get("summary", ""))
 
 
+def stream_search(payload):
+    """Yield `(type, data)` records from the backend's NDJSON search stream."""
+    with http_session().post(
+        f"{BACKEND_URL}/search/stream", json=payload, stream=True, timeout=60
+    ) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                record = json.loads(line)
+                yield record["type"], record["data"]
+
+
+class SearchCache:
+    """Records of completed searches, kept for a TTL and shared by all sessions."""
+
+    def __init__(self, ttl_s, max_entries):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, records = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return records
+
+    def put(self, key, records):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, records)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+@st.cache_resource
+def search_cache():
+    return SearchCache(SEARCH_CACHE_TTL_S, SEARCH_CACHE_SIZE)
+
+
+def search(query, top_k, categories):
+    """Yield the `(type, data)` records of a search.
+
+    A cache hit replays the stored records. A miss yields each record as
+    the backend streams it, so cards render as they arrive, and stores
+    the records once the stream has completed.
+    """
+    key = (query, top_k, categories)
+    records = search_cache().get(key)
+    if records is not None:
+        yield from records
+        return
+    payload = {"query": query, "top_k": top_k}
+    if categories:
+        payload["categories"] = list(categories)
+    records = []
+    for record in stream_search(payload):
+        records.append(record)
+        yield record
+    search_cache().put(key, records)
+
+
 if search_clicked and query:
     with st.spinner("Searching the index..."):
         try:
-            payload = {"query": query, "top_k": top_k}
-            if categories:
-                payload["categories"] = categories
-            response = requests.post(
-                "http://localhost:8000/search", json=payload, timeout=60
-            )
-            response.raise_for_status()
-            data = response.json()
+            # Metrics row is filled in from the stream's final record
+            metrics_slot = st.empty()
+            left, right = st.columns(2)
 
-            # Metrics row
-            render_metrics(data.get("metrics", {}))
+            # Results grid, rendered card by card as the stream arrives
+            count = 0
+            metrics = {}
+            for kind, data in search(query, top_k, tuple(categories)):
+                if kind == "result":
+                    column = left if count % 2 == 0 else right
+                    column.markdown(" ")
+                    with column:
+                        render_result_card(data)
+                    count += 1
+                elif kind == "metrics":
+                    metrics = data
 
-            # Results grid
-            results = data.get("results", [])
-            if not results:
+            with metrics_slot.container():
+                render_metrics(metrics)
+            if not count:
                 st.info(
                     "No results found. Try broadening your query or removing filters."
                 )
-            else:
-                left, right = st.columns(2)
-                for i, item in enumerate(results):
-                    (left if i % 2 == 0 else right).markdown(" ")
-                    with left if i % 2 == 0 else right:
-                        render_result_card(item)
 
             # Append to history
-            st.session_state.history.insert(
-                0,
-                {
-                    "query": query,
-                    "when": datetime.now().strftime("%H:%M:%S"),
-                    "count": len(results),
-                    "elapsed_ms": data.get("metrics", {}).get("elapsed_ms", 0),
-                },
-            )
-            st.session_state.history = st.session_state.history[:10]
-            save_history_to_disk(st.session_state.history)
+            entry = {
+                "query": query,
+                "when": datetime.now().strftime("%H:%M:%S"),
+                "count": count,
+                "elapsed_ms": metrics.get("elapsed_ms", 0),
+            }
+            st.session_state.history.insert(0, entry)
+            st.session_state.history = st.session_state.history[:HISTORY_LENGTH]
+            history_writer().append(st.session_state.session_id, entry)
         except requests.RequestException as e:
             st.error(f"Backend error: {e}")
 elif search_clicked and not query:
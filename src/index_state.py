@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+GENERATION_FILE = "index_generation"
+
+
+def read_index_generation(data_dir) -> int:
+    """Return the index generation recorded under `data_dir` (0 if never bumped)."""
+    try:
+        return int((Path(data_dir) / GENERATION_FILE).read_text().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def bump_index_generation(data_dir) -> int:
+    """Increment the index generation so readers drop anything derived from the index.
+
+    Ingestion calls this after upserting; the file is replaced atomically so
+    concurrent readers never see a partial write.
+    """
+    path = Path(data_dir) / GENERATION_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    generation = read_index_generation(data_dir) + 1
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(str(generation))
+    os.replace(tmp_path, path)
+    return generation
+
+
+class IndexStatsCache:
+    """Index stats kept fresh by a background thread.
+
+    Readers get the last known value immediately and never wait on the
+    stats call. The thread refreshes every `interval_s`, and sooner when
+    `invalidate()` is called or `generation_fn` reports a new generation.
+    """
+
+    def __init__(
+        self,
+        fetch_stats: Callable[[], dict],
+        interval_s: float = 30.0,
+        generation_fn: Optional[Callable[[], int]] = None,
+        poll_s: float = 1.0,
+    ):
+        self.fetch_stats = fetch_stats
+        self.interval_s = interval_s
+        self.generation_fn = generation_fn
+        self.poll_s = poll_s
+        self.total_vectors = 0
+        self.refreshed_at: Optional[float] = None
+        self.generation: Optional[int] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> "IndexStatsCache":
+        """Start the refresh thread if it is not already running."""
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="index-stats", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the refresh thread and wait for it to exit."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join()
+
+    def invalidate(self) -> None:
+        """Ask the refresh thread to reload stats now."""
+        self._wake.set()
+
+    def refresh(self) -> int:
+        """Fetch stats synchronously, keeping the previous value on failure."""
+        if self.generation_fn is not None:
+            self.generation = self.generation_fn()
+        try:
+            stats = self.fetch_stats()
+            self.total_vectors = stats.get("total_vector_count") or 0
+            self.refreshed_at = time.time()
+        except Exception:
+            pass
+        return self.total_vectors
+
+    def _generation_changed(self) -> bool:
+        return (
+            self.generation_fn is not None and self.generation_fn() != self.generation
+        )
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.refresh()
+            deadline = time.monotonic() + self.interval_s
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if self._wake.wait(min(self.poll_s, remaining)):
+                    self._wake.clear()
+                    break
+                if self._generation_changed():
+                    break
@@ -0,0 +1,281 @@
+"""Long-running ingestion: keep the model and index loaded, poll feeds adaptively.
+
+Each feed is polled on its own interval. The interval shortens for feeds
+that publish often and lengthens for quiet ones, following an exponentially
+weighted rate of new articles. A small HTTP server reports the last run,
+lag and throughput per feed:
+
+    uv run python -m src.ingest_daemon            # status on :8001/status
+"""
+
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from . import load_articles as la
+from .embedding_store import EMBEDDING_STORE_DIR, EmbeddingStore
+from .index_state import bump_index_generation
+from .lexical_index import LEXICAL_INDEX_DIR, LexicalIndex
+from .metrics import INGEST_METRICS_FILE, write_textfile
+
+# Polling interval bounds per feed, and the interval new feeds start with
+DAEMON_MIN_INTERVAL_S = float(os.getenv("DAEMON_MIN_INTERVAL_S", "120"))
+DAEMON_MAX_INTERVAL_S = float(os.getenv("DAEMON_MAX_INTERVAL_S", "3600"))
+DAEMON_INITIAL_INTERVAL_S = float(os.getenv("DAEMON_INITIAL_INTERVAL_S", "600"))
+# New articles a poll should find on average; the interval is sized so a
+# feed publishing at its observed rate yields about this many per poll
+DAEMON_TARGET_NEW = float(os.getenv("DAEMON_TARGET_NEW", "2"))
+# Weight of the latest poll in the per-feed new-article rate
+DAEMON_RATE_ALPHA = float(os.getenv("DAEMON_RATE_ALPHA", "0.3"))
+# Port of the status endpoint (0 disables it)
+DAEMON_STATUS_PORT = int(os.getenv("DAEMON_STATUS_PORT", "8001"))
+# Expire seen URLs (SEEN_URL_TTL_DAYS) this often
+_EXPIRE_EVERY_S = 86400
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds")
+
+
+class FeedSchedule:
+    """Polling state of one feed: its interval, due time and observed rate."""
+
+    def __init__(self, category: str, url: str, now: float):
+        self.category = category
+        self.url = url
+        self.interval_s = DAEMON_INITIAL_INTERVAL_S
+        self.due_at = now
+        self.rate_per_s: Optional[float] = None
+        self.last_run_at: Optional[float] = None
+        self.last_ok_at: Optional[float] = None
+        self.last_lag_s = 0.0
+        self.last_duration_s = 0.0
+        self.last_new = 0
+        self.last_error: Optional[str] = None
+        self.runs = 0
+        self.total_new = 0
+
+    def record(self, result, started_at: float, finished_at: float) -> None:
+        """Update the rate and next due time after a poll that began at `started_at`."""
+        self.last_lag_s = max(0.0, started_at - self.due_at)
+        self.last_duration_s = finished_at - started_at
+        self.last_error = result.error
+        self.last_run_at = started_at
+        self.runs += 1
+        if result.error:
+            # Back off from a failing feed without touching its rate
+            self.interval_s = min(DAEMON_MAX_INTERVAL_S, self.interval_s * 2)
+        else:
+            new = result.new_articles + result.changed_articles
+            if self.last_ok_at is None:
+                elapsed = self.interval_s
+            else:
+                elapsed = started_at - self.last_ok_at
+            observed = new / max(elapsed, 1.0)
+            if self.rate_per_s is None:
+                self.rate_per_s = observed
+            else:
+                self.rate_per_s += DAEMON_RATE_ALPHA * (observed - self.rate_per_s)
+            if self.rate_per_s > 0:
+                interval = DAEMON_TARGET_NEW / self.rate_per_s
+            else:
+                interval = self.interval_s * 2
+            self.interval_s = min(
+                DAEMON_MAX_INTERVAL_S, max(DAEMON_MIN_INTERVAL_S, interval)
+            )
+            self.last_new = new
+            self.total_new += new
+            self.last_ok_at = started_at
+        self.due_at = started_at + self.interval_s
+
+    def status(self, now: float) -> Dict[str, object]:
+        rate = self.rate_per_s or 0.0
+        return {
+            "url": self.url,
+            "last_run": _iso(self.last_run_at),
+            "last_success": _iso(self.last_ok_at),
+            "next_run": _iso(self.due_at),
+            "interval_s": round(self.interval_s, 1),
+            # How late the last poll started, and how overdue the feed is now
+            "last_lag_s": round(self.last_lag_s, 3),
+            "overdue_s": round(max(0.0, now - self.due_at), 3),
+            "last_duration_s": round(self.last_duration_s, 3),
+            "last_new_articles": self.last_new,
+            "new_articles_per_hour": round(rate * 3600, 2),
+            "total_new_articles": self.total_new,
+            "runs": self.runs,
+            "last_error": self.last_error,
+        }
+
+
+class IngestDaemon:
+    """Poll feeds on their own schedules with a resident model and index.
+
+    Every feed due at the same time is ingested in one pipeline run
+    (`load_articles.ingest_feeds`); the index generation is bumped after
+    each run that upserted anything, so the backend serves new articles
+    right away.
+    """
+
+    def __init__(
+        self,
+        feeds: Dict[str, str],
+        model,
+        index,
+        data_dir,
+        embedding_store=None,
+        lexical_index=None,
+        clock=time.time,
+    ):
+        self.model = model
+        self.index = index
+        self.data_dir = data_dir
+        self.log_file = str(data_dir / "seen_urls.sqlite3")
+        self.feed_state_file = str(data_dir / "feed_state.json")
+        self.embedding_store = embedding_store
+        self.lexical_index = lexical_index
+        self._clock = clock
+        self.started_at = clock()
+        self.expired_at = self.started_at
+        self.runs = 0
+        self.upserted = 0
+        self._lock = threading.Lock()
+        self.schedules = {
+            category: FeedSchedule(category, url, self.started_at)
+            for category, url in feeds.items()
+        }
+
+    def next_due(self) -> float:
+        return min(schedule.due_at for schedule in self.schedules.values())
+
+    def run_due(self) -> int:
+        """Ingest every feed that is due; returns the number of articles upserted."""
+        started_at = self._clock()
+        due = {
+            s.category: s.url for s in self.schedules.values() if s.due_at <= started_at
+        }
+        if not due:
+            return 0
+        if started_at - self.expired_at >= _EXPIRE_EVERY_S:
+            la.prepare_seen_urls(self.log_file, self.data_dir)
+            self.expired_at = started_at
+        fetched, upserted = la.ingest_feeds(
+            due,
+            self.model,
+            self.index,
+            self.log_file,
+            feed_state_file=self.feed_state_file,
+            embedding_store=self.embedding_store,
+            lexical_index=self.lexical_index,
+        )
+        finished_at = self._clock()
+        with self._lock:
+            for result in fetched:
+                self.schedules[result.category].record(result, started_at, finished_at)
+            self.runs += 1
+            self.upserted += upserted
+        if upserted:
+            bump_index_generation(self.data_dir)
+        write_textfile(la.INGEST_METRICS, self.data_dir / INGEST_METRICS_FILE)
+        return upserted
+
+    def run_forever(self, stop: threading.Event) -> None:
+        """Poll until `stop` is set, sleeping until the next feed is due."""
+        while not stop.is_set():
+            try:
+                self.run_due()
+            except Exception as exc:
+                # Keep the daemon alive; the feeds stay due and are retried
+                print(f"Ingestion run failed: {exc}")
+                stop.wait(DAEMON_MIN_INTERVAL_S)
+                continue
+            stop.wait(max(1.0, self.next_due() - self._clock()))
+
+    def status(self) -> Dict[str, object]:
+        now = self._clock()
+        with self._lock:
+            return {
+                "started_at": _iso(self.started_at),
+                "uptime_s": round(now - self.started_at, 1),
+                "runs": self.runs,
+                "upserted": self.upserted,
+                "next_run": _iso(self.next_due()),
+                "feeds": {c: s.status(now) for c, s in self.schedules.items()},
+            }
+
+
+def serve_status(daemon: IngestDaemon, port: int) -> ThreadingHTTPServer:
+    """Serve `GET /status` (JSON) and `GET /metrics` on a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/status":
+                body = json.dumps(daemon.status()).encode("utf-8")
+                content_type = "application/json"
+            elif self.path == "/metrics":
+                body = la.INGEST_METRICS.render().encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Polled by monitoring; keep the daemon's log readable
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=DAEMON_STATUS_PORT)
+    return parser.parse_args(argv)
+
+
+def main(argv=None, stop: Optional[threading.Event] = None):
+    """Run the daemon until SIGTERM / SIGINT (or `stop` is set)."""
+    args = parse_args(argv)
+    stop = stop or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stop.set())
+    data_dir = la.data_directory()
+    index = la.open_index(data_dir)
+    la.prepare_seen_urls(str(data_dir / "seen_urls.sqlite3"), data_dir)
+    model = la.load_encoder(la.MODEL_NAME)
+    store_dir = data_dir / EMBEDDING_STORE_DIR
+    with EmbeddingStore(store_dir, la.encoder_id(la.MODEL_NAME)) as store:
+        daemon = IngestDaemon(
+            la.FEEDS,
+            model,
+            index,
+            data_dir,
+            embedding_store=store,
+            lexical_index=LexicalIndex(data_dir / LEXICAL_INDEX_DIR, la.INDEX_NAME),
+        )
+        server = serve_status(daemon, args.port) if args.port else None
+        print(f"Ingestion daemon polling {len(la.FEEDS)} feeds.")
+        try:
+            daemon.run_forever(stop)
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+
+if __name__ == "__main__":
+    main()
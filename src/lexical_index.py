@@ -0,0 +1,291 @@
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from itertools import compress
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .vector_store import Snapshot, atomic_write, top_k_rows
+
+# Directory under DATA_DIR holding the lexical index
+LEXICAL_INDEX_DIR = "lexical"
+# Auto-mode confidence: a query is answered lexically when it has at most
+# this many terms and each appears in at most this fraction of documents
+LEXICAL_MAX_TERMS = int(os.getenv("LEXICAL_MAX_TERMS", "4"))
+LEXICAL_MAX_DF = float(os.getenv("LEXICAL_MAX_DF", "0.05"))
+# Reciprocal-rank fusion constant (hybrid mode)
+RRF_K = int(os.getenv("RRF_K", "60"))
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+# Function words of the (French) feeds and common English ones
+STOPWORDS = frozenset(
+    "au aux avec ce ces dans de des du elle en et eux il ils je la le les leur lui "
+    "ma mais me meme mes moi mon ne nos notre nous on ou par pas pour qu que qui sa "
+    "se ses son sur ta te tes toi ton tu un une vos votre vous est sont ete etre a "
+    "an and are as at be by for from in is it of on or the this to was with".split()
+)
+
+# (id, metadata) -- metadata must carry `title` and `summary`
+LexicalRecord = Tuple[str, Dict[str, Any]]
+
+
+def tokenize(text: str) -> List[str]:
+    """Split `text` into lowercased, accent-folded terms without stopwords."""
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return [t for t in _TOKEN.findall(folded) if len(t) > 1 and t not in STOPWORDS]
+
+
+def document_text(metadata: Dict[str, Any]) -> str:
+    """Return the indexed text of a document: title and summary."""
+    return f"{metadata.get('title', '')} {metadata.get('summary', '')}"
+
+
+class LexicalHits(NamedTuple):
+    """Lexical matches (`{"id", "score", "metadata"}`) and whether to trust them."""
+
+    matches: List[Dict[str, Any]]
+    confident: bool
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Dict[str, Any]]], top_k: int, k: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Merge ranked match lists by reciprocal-rank fusion.
+
+    Each match scores `sum(1 / (k + rank))` over the lists it appears in
+    (rank starting at 1); the fused score replaces the original one.
+    Matches only need item access and `get`, like Pinecone's `ScoredVector`.
+    """
+    k = RRF_K if k is None else k
+    fused: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, match in enumerate(ranking, start=1):
+            entry = fused.get(match["id"])
+            if entry is None:
+                entry = fused[match["id"]] = {
+                    "id": match["id"],
+                    "metadata": match.get("metadata"),
+                    "score": 0.0,
+                }
+            entry["score"] += 1.0 / (k + rank)
+    ordered = sorted(fused.values(), key=lambda m: m["score"], reverse=True)
+    return ordered[:top_k]
+
+
+class _Postings:
+    """BM25 statistics over a snapshot: sorted terms and their postings."""
+
+    def __init__(self, terms, offsets, postings, tfs, lengths):
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.tfs = tfs
+        self.lengths = lengths
+        self.avg_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    @classmethod
+    def build(cls, texts: Sequence[str]) -> "_Postings":
+        empty = np.zeros(0, dtype=np.int64)
+        return cls(
+            np.array([], dtype=str), np.zeros(1, dtype=np.int64), empty, empty, empty
+        ).updated(np.zeros(0, dtype=bool), texts)
+
+    def updated(self, keep: np.ndarray, texts: Sequence[str]) -> "_Postings":
+        """Return the postings of the documents where `keep` is set, then `texts`.
+
+        Only `texts` are tokenized; the kept documents' postings are
+        renumbered and merged with theirs in bulk.
+        """
+        counts = [Counter(tokenize(text)) for text in texts]
+        added = np.array(sorted(set().union(*counts)), dtype=str)
+        terms = np.union1d(self.terms, added).astype(str)
+        # Kept postings: old term and document ids mapped to the new ones
+        old_terms = np.repeat(np.arange(len(self.terms)), np.diff(self.offsets))
+        alive = keep[self.postings]
+        renumber = np.cumsum(keep) - 1
+        term_ids = dict(zip(added.tolist(), np.searchsorted(terms, added).tolist()))
+        base = int(keep.sum())
+        triples = [
+            (term_ids[term], base + doc, tf)
+            for doc, counter in enumerate(counts)
+            for term, tf in counter.items()
+        ]
+        new = np.array(triples, dtype=np.int64).reshape(-1, 3)
+        term_col = np.concatenate(
+            [np.searchsorted(terms, self.terms)[old_terms[alive]], new[:, 0]]
+        )
+        doc_col = np.concatenate([renumber[self.postings[alive]], new[:, 1]])
+        tf_col = np.concatenate([self.tfs[alive], new[:, 2]])
+        # Drop terms only the replaced documents had
+        per_term = np.bincount(term_col, minlength=len(terms))
+        used = per_term > 0
+        term_col = (np.cumsum(used) - 1)[term_col]
+        terms, per_term = terms[used], per_term[used]
+        # Kept postings come first in (term, doc) order and the new documents'
+        # in doc order, so a stable sort on the term keeps docs ascending
+        order = np.argsort(term_col, kind="stable")
+        return _Postings(
+            terms,
+            np.concatenate([[0], np.cumsum(per_term)]).astype(np.int64),
+            doc_col[order].astype(np.int32),
+            np.minimum(tf_col[order], np.iinfo(np.uint16).max).astype(np.uint16),
+            np.concatenate(
+                [self.lengths[keep], [sum(c.values()) for c in counts]]
+            ).astype(np.int32),
+        )
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "terms": self.terms,
+            "offsets": self.offsets,
+            "postings": self.postings,
+            "tfs": self.tfs,
+            "lengths": self.lengths,
+        }
+
+
+class LexicalIndex:
+    """BM25 inverted index over article titles and summaries.
+
+    Everything lives in one `<name>.npz` file -- sorted terms, CSR
+    postings (doc, term frequency), document lengths and the documents'
+    ids and metadata -- replaced atomically on each write. Readers in other
+    processes pick up a new file on their next search. A write tokenizes
+    only the records it adds or replaces and merges them into the stored
+    postings; use a single writer process.
+    """
+
+    def __init__(
+        self,
+        directory,
+        name: str = "index",
+        max_terms: Optional[int] = None,
+        max_df: Optional[float] = None,
+    ):
+        self.path = Path(directory) / f"{name}.npz"
+        self.max_terms = LEXICAL_MAX_TERMS if max_terms is None else max_terms
+        self.max_df = LEXICAL_MAX_DF if max_df is None else max_df
+        self._lock = threading.Lock()
+        self._loaded_version = None
+        self._snapshot = Snapshot(np.zeros((0, 0), dtype=np.float32), [], {})
+        self._postings = _Postings.build([])
+        self._reload_if_changed()
+
+    def __len__(self) -> int:
+        return len(self._reload_if_changed()[0].ids)
+
+    def _reload_if_changed(self) -> Tuple[Snapshot, _Postings]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return self._snapshot, self._postings
+        version = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if version != self._loaded_version:
+            with self._lock, np.load(self.path) as data:
+                documents = json.loads(data["documents"].tobytes())
+                ids = documents["ids"]
+                self._postings = _Postings(
+                    data["terms"],
+                    data["offsets"],
+                    data["postings"],
+                    data["tfs"],
+                    data["lengths"],
+                )
+                self._snapshot = Snapshot(
+                    np.zeros((len(ids), 0), dtype=np.float32),
+                    ids,
+                    documents["columns"],
+                )
+                self._loaded_version = version
+        return self._snapshot, self._postings
+
+    def upsert(self, records: Iterable[LexicalRecord]) -> None:
+        """Insert or overwrite `(id, metadata)` records and rewrite the index.
+
+        Only the new and changed documents are tokenized; the postings of
+        the others are carried over.
+        """
+        records = dict(records)
+        if not records:
+            return
+        snap, postings = self._reload_if_changed()
+        keep = np.ones(len(snap.ids), dtype=bool)
+        row_of = dict(zip(snap.ids, range(len(snap.ids))))
+        for id_ in records:
+            row = row_of.get(id_)
+            if row is not None:
+                keep[row] = False
+        ids = list(compress(snap.ids, keep)) + list(records)
+        keys = sorted(set(snap.columns).union(*records.values()))
+        columns = {}
+        for key in keys:
+            column = snap.columns.get(key)
+            kept = (
+                [None] * int(keep.sum()) if column is None else compress(column, keep)
+            )
+            columns[key] = list(kept) + [meta.get(key) for meta in records.values()]
+        texts = [document_text(meta) for meta in records.values()]
+        arrays = postings.updated(keep, texts).arrays()
+        payload = json.dumps({"ids": ids, "columns": columns}, ensure_ascii=False)
+        arrays["documents"] = np.frombuffer(payload.encode("utf-8"), dtype=np.uint8)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.path, lambda f: np.savez(f, **arrays))
+        self._reload_if_changed()
+
+    def search(
+        self, query: str, top_k: int, filter: Optional[dict] = None
+    ) -> LexicalHits:
+        """Return the `top_k` BM25 matches for `query`.
+
+        `filter` is a Pinecone-style metadata filter (`$eq` / `$in`). The
+        hits are `confident` when the query has at most `max_terms` terms,
+        each known and in at most `max_df` of the documents, and some
+        (filtered) document contains all of them.
+        """
+        snap, postings = self._reload_if_changed()
+        terms = list(dict.fromkeys(tokenize(query)))
+        count = len(snap.ids)
+        if not terms or not count:
+            return LexicalHits([], False)
+        scores = np.zeros(count, dtype=np.float32)
+        matched = np.zeros(count, dtype=np.int32)
+        selective = len(terms) <= self.max_terms
+        norm = BM25_K1 * (
+            1 - BM25_B + BM25_B * postings.lengths / max(postings.avg_length, 1e-9)
+        )
+        for term in terms:
+            position = int(np.searchsorted(postings.terms, term))
+            if position >= len(postings.terms) or postings.terms[position] != term:
+                selective = False
+                continue
+            start, end = postings.offsets[position], postings.offsets[position + 1]
+            docs, tfs = postings.postings[start:end], postings.tfs[start:end]
+            df = end - start
+            selective = selective and bool(df <= self.max_df * count)
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tfs * (BM25_K1 + 1) / (tfs + norm[docs])
+            matched[docs] += 1
+        candidates = np.flatnonzero(matched)
+        if filter:
+            candidates = candidates[snap.filter_mask(filter, candidates)]
+        top = candidates[top_k_rows(scores[candidates], top_k)]
+        matches = [
+            {
+                "id": snap.ids[row],
+                "score": float(scores[row]),
+                "metadata": snap.metadata(row),
+            }
+            for row in top
+        ]
+        confident = selective and bool((matched[candidates] == len(terms)).any())
+        return LexicalHits(matches, confident)
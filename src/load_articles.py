@@ -1,15 +1,93 @@
+import json
 import os
-import pickle
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
 
 import feedparser
+import requests
 from pinecone import Pinecone, ServerlessSpec
-from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 from pathlib import Path
-from .data_models import Article
+from .data_models import Article, FeedFetchResult
+from .embedding_store import EMBEDDING_STORE_DIR, EmbeddingStore
+from .encoder import encoder_id, load_encoder
+from .index_state import bump_index_generation
+from .lexical_index import LEXICAL_INDEX_DIR, LexicalIndex
+from .metrics import INGEST_METRICS_FILE, Registry, write_textfile
+from .pipeline import DONE, MonitoredQueue, StageStats, format_report
+from .url_store import SeenUrlStore, fingerprint
+from .vector_store import create_vector_store
 
 load_dotenv()
 
+# Embedding model and target index; the model name is part of the key of
+# every vector in the embedding store
+MODEL_NAME = "all-MiniLM-L6-v2"
+INDEX_NAME = "gossip-semantic-search"
+EMBEDDING_DIM = 384
+# Ingestion batching: texts per model call, vectors per upsert request,
+# parallel upsert requests, and retries per chunk
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+UPSERT_CHUNK_SIZE = int(os.getenv("UPSERT_CHUNK_SIZE", "100"))
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "4"))
+UPSERT_RETRIES = int(os.getenv("UPSERT_RETRIES", "3"))
+UPSERT_RETRY_BACKOFF_S = float(os.getenv("UPSERT_RETRY_BACKOFF_S", "0.5"))
+# Feed downloads: parallel fetches and per-request timeout
+FEED_FETCH_WORKERS = int(os.getenv("FEED_FETCH_WORKERS", "8"))
+FEED_FETCH_TIMEOUT_S = float(os.getenv("FEED_FETCH_TIMEOUT_S", "20"))
+# Pipeline: processes parsing feeds (0 = parse in the fetch threads), and
+# bounds of the embed queue (batches) and upsert queue (chunks)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0"))
+EMBED_QUEUE_SIZE = int(os.getenv("EMBED_QUEUE_SIZE", "8"))
+UPSERT_QUEUE_SIZE = int(os.getenv("UPSERT_QUEUE_SIZE", "8"))
+# Forget seen URLs after this many days (0 keeps them forever)
+SEEN_URL_TTL_DAYS = float(os.getenv("SEEN_URL_TTL_DAYS", "0"))
+# How often the ingesting thread checks for confirmed chunks while it waits
+_COLLECT_POLL_S = 0.05
+
+# Ingestion metrics, published to DATA_DIR for the backend's /metrics
+INGEST_METRICS = Registry()
+INGEST_ARTICLES = INGEST_METRICS.counter(
+    "gossip_ingest_articles_total",
+    "Articles by ingestion stage "
+    "(fetched, skipped, embedded, reused, upserted, failed).",
+    ("stage",),
+)
+INGEST_FEED_FETCHES = INGEST_METRICS.counter(
+    "gossip_ingest_feed_fetches_total",
+    "Feed downloads by category and outcome (ok, unchanged, error).",
+    ("category", "status"),
+)
+INGEST_FEED_ARTICLES = INGEST_METRICS.counter(
+    "gossip_ingest_feed_articles_total",
+    "Valid articles per feed by content status (new, changed, unchanged).",
+    ("category", "status"),
+)
+INGEST_FEED_DURATION = INGEST_METRICS.gauge(
+    "gossip_ingest_feed_duration_seconds",
+    "Duration of the last download of each feed.",
+    ("category",),
+)
+INGEST_STAGE_UTILIZATION = INGEST_METRICS.gauge(
+    "gossip_ingest_stage_utilization",
+    "Share of each pipeline stage's worker time spent busy in the last run.",
+    ("stage",),
+)
+INGEST_QUEUE_OCCUPANCY = INGEST_METRICS.gauge(
+    "gossip_ingest_queue_mean_occupancy",
+    "Mean number of items waiting in each pipeline queue in the last run.",
+    ("queue",),
+)
+INGEST_RUN_DURATION = INGEST_METRICS.gauge(
+    "gossip_ingest_last_run_duration_seconds", "Duration of the last ingestion run."
+)
+INGEST_RUN_TIMESTAMP = INGEST_METRICS.gauge(
+    "gossip_ingest_last_run_timestamp_seconds",
+    "Unix time at which the last ingestion run finished.",
+)
+
 
 def initialize_pinecone(api_key, environment, index_name, embedding_dim):
     """Create Pinecone index if missing and return an Index handle."""
@@ -35,10 +113,9 @@ def initialize_pinecone(api_key, environment, index_name, embedding_dim):
     return pc.Index(index_name)
 
 
-def fetch_articles(feed_url):
-    """Fetch and parse entries from the given RSS/Atom feed URL."""
+def parse_entries(feed):
+    """Convert the entries of a parsed feed into `Article`s."""
     results = []
-    feed = feedparser.parse(feed_url)
     for entry in feed.entries:
         results.append(
             Article(
@@ -52,104 +129,622 @@ def fetch_articles(feed_url):
     return results
 
 
-def load_cached_urls(log_file):
-    """Load a set of cached URLs from pickle at `log_file`. One-liner for small attr."""
-    path = Path(log_file)
+def fetch_articles(feed_url):
+    """Fetch and parse entries from the given RSS/Atom feed URL."""
+    return parse_entries(feedparser.parse(feed_url))
+
+
+def download_feed(category, url, etag=None, modified=None, session=None):
+    """Download one feed with a conditional GET, without parsing it.
+
+    Returns `(result, payload)`: `payload` is the `(content, headers)` to
+    hand to `parse_payload`, or None when the feed is unchanged or failed.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if modified:
+        headers["If-Modified-Since"] = modified
+    result = FeedFetchResult(category=category, url=url, etag=etag, modified=modified)
+    payload = None
+    started_at = time.perf_counter()
+    try:
+        response = (session or requests).get(
+            url, headers=headers, timeout=FEED_FETCH_TIMEOUT_S
+        )
+        result.bytes_downloaded = len(response.content)
+        if response.status_code == 304:
+            result.unchanged = True
+        else:
+            response.raise_for_status()
+            payload = (response.content, dict(response.headers))
+            result.etag = response.headers.get("ETag")
+            result.modified = response.headers.get("Last-Modified")
+    except requests.RequestException as exc:
+        result.error = str(exc)
+    result.elapsed_ms = int((time.perf_counter() - started_at) * 1000)
+    return result, payload
+
+
+def parse_payload(content, headers):
+    """Parse downloaded feed content into `Article`s (runs in a process pool)."""
+    return parse_entries(feedparser.parse(content, response_headers=headers))
+
+
+def fetch_feed(category, url, etag=None, modified=None, session=None):
+    """Download one feed with a conditional GET and parse it if it changed.
+
+    `etag` / `modified` come from the previous run; when the server answers
+    304 the feed is reported unchanged and nothing is parsed. Errors are
+    captured in the result so one bad feed does not sink the run.
+    """
+    started_at = time.perf_counter()
+    result, payload = download_feed(category, url, etag, modified, session)
+    if payload is not None:
+        result.articles = parse_payload(*payload)
+    result.elapsed_ms = int((time.perf_counter() - started_at) * 1000)
+    return result
+
+
+def load_feed_state(path):
+    """Load per-feed conditional-GET validators from JSON at `path`."""
+    path = Path(path)
     if path.exists():
-        with open(path, "rb") as f:
-            return pickle.load(f)
-    return set()
+        return json.loads(path.read_text())
+    return {}
 
 
-def save_cached_urls(cached_urls, log_file):
-    """Persist the set of cached URLs to pickle at `log_file`. One-liner for small attr."""
-    path = Path(log_file)
+def save_feed_state(feed_state, path):
+    """Persist per-feed conditional-GET validators to JSON at `path`."""
+    path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "wb") as f:
-        pickle.dump(cached_urls, f)
+    path.write_text(json.dumps(feed_state, indent=2))
+
+
+def report_fetch(result):
+    """Print one line of fetch stats for a feed."""
+    if result.error:
+        status = f"error ({result.error})"
+    elif result.unchanged:
+        status = "unchanged"
+    else:
+        status = f"{len(result.articles)} entries"
+    print(
+        f"Fetched {result.category}: {status}, "
+        f"{result.bytes_downloaded} bytes in {result.elapsed_ms} ms"
+    )
+
+
+def record_fetch(result):
+    """Count one feed download in the ingestion metrics."""
+    if result.error:
+        status = "error"
+    elif result.unchanged:
+        status = "unchanged"
+    else:
+        status = "ok"
+    INGEST_FEED_FETCHES.inc(category=result.category, status=status)
+    INGEST_FEED_DURATION.set(result.elapsed_ms / 1000, category=result.category)
+    INGEST_ARTICLES.inc(len(result.articles), stage="fetched")
+
+
+def report_changes(result):
+    """Print and count a feed's new / changed / unchanged articles."""
+    counts = {
+        "new": result.new_articles,
+        "changed": result.changed_articles,
+        "unchanged": result.unchanged_articles,
+    }
+    for status, count in counts.items():
+        INGEST_FEED_ARTICLES.inc(count, category=result.category, status=status)
+    print(f"{result.category}: " + ", ".join(f"{n} {s}" for s, n in counts.items()))
+
+
+def chunked(items, size):
+    """Yield successive lists of at most `size` items."""
+    for start in range(0, len(items), max(1, size)):
+        yield items[start : start + max(1, size)]
+
+
+def article_metadata(article):
+    """Return the index metadata stored alongside an article's vector."""
+    return {
+        "title": article.title,
+        "summary": article.summary,
+        "category": article.category,
+        "published": article.published,
+    }
+
+
+def article_fingerprint(article):
+    """Return the fingerprint of the fields an article is ingested from."""
+    return fingerprint(article.title, article.summary, article.published)
+
 
+def article_text(article):
+    """Return the text an article is embedded from."""
+    return article.title + " " + article.summary
 
-def process_feeds_with_cache(feeds, model, index, log_file):
-    """Iterate feeds, embed new articles, upsert to Pinecone, and update cache."""
+
+def embed_articles(model, articles, batch_size=None, store=None):
+    """Encode `title + summary` for each article in batches; returns vectors in order.
+
+    With an `EmbeddingStore`, texts embedded before (by this model) are
+    read back from it and only the rest are encoded; new embeddings are
+    added to the store.
+    """
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    vectors = []
+    for batch in chunked(articles, batch_size):
+        texts = [article_text(article) for article in batch]
+        stored = store.get_many(texts) if store is not None else [None] * len(texts)
+        missing = [text for text, vector in zip(texts, stored) if vector is None]
+        if missing:
+            encoded = model.encode(
+                missing, batch_size=batch_size, convert_to_tensor=True
+            ).tolist()
+            if store is not None:
+                store.put_many(missing, encoded)
+            if len(missing) == len(texts):
+                stored = encoded
+            else:
+                fill = iter(encoded)
+                stored = [next(fill) if v is None else v for v in stored]
+        INGEST_ARTICLES.inc(len(missing), stage="embedded")
+        INGEST_ARTICLES.inc(len(texts) - len(missing), stage="reused")
+        vectors.extend(stored)
+    return vectors
+
+
+def upsert_with_retry(index, records, retries=None, backoff_s=None):
+    """Upsert one chunk, retrying with exponential backoff before giving up."""
+    retries = UPSERT_RETRIES if retries is None else retries
+    backoff_s = UPSERT_RETRY_BACKOFF_S if backoff_s is None else backoff_s
+    attempt = 0
+    while True:
+        try:
+            index.upsert(records)
+            return
+        except Exception as exc:
+            if attempt >= retries:
+                raise
+            print(f"Upsert of {len(records)} vectors failed ({exc}); retrying...")
+            time.sleep(backoff_s * 2**attempt)
+            attempt += 1
+
+
+def process_feeds_with_cache(
+    feeds,
+    model,
+    index,
+    log_file,
+    feed_state_file=None,
+    embedding_store=None,
+    lexical_index=None,
+):
+    """Ingest `feeds` (see `ingest_feeds`); returns the number of articles upserted."""
+    return ingest_feeds(
+        feeds,
+        model,
+        index,
+        log_file,
+        feed_state_file=feed_state_file,
+        embedding_store=embedding_store,
+        lexical_index=lexical_index,
+    )[1]
+
+
+def ingest_feeds(
+    feeds,
+    model,
+    index,
+    log_file,
+    feed_state_file=None,
+    embedding_store=None,
+    lexical_index=None,
+):
+    """Iterate feeds, embed new or changed articles, upsert them, and update cache.
+
+    `log_file` is the `SeenUrlStore` database of already ingested URLs.
+    Ingestion runs as a pipeline of concurrent stages joined by bounded
+    queues (see `_ingest`), so downloads, encoding and upserts overlap.
+    With `feed_state_file`, each feed's ETag / Last-Modified is persisted
+    so an unchanged feed costs a 304; a feed's validators are only saved
+    once all its new articles are upserted, so failed articles are retried
+    next run. A URL is recorded as soon as its chunk is confirmed, while
+    the run goes on, so a run that fails or is killed midway keeps the
+    articles already upserted. With `embedding_store`, every embedding is
+    persisted there and texts embedded in earlier runs are not encoded
+    again. With `lexical_index`, the confirmed articles are also added to
+    that BM25 index, in one write at the end of the run (also when a stage
+    failed); after a killed run, `src.reindex` rebuilds it.
+    Returns (each feed's `FeedFetchResult`, number of articles upserted).
+    """
     if index is None:
         print("Error: Pinecone index is not initialized.")
-        return
+        return [], 0
 
-    cached_urls = load_cached_urls(log_file)
+    started_at = time.perf_counter()
+    feed_state = load_feed_state(feed_state_file) if feed_state_file else {}
+    with SeenUrlStore(log_file) as cached_urls:
+        fetched, upserted, failed_links = _ingest(
+            feeds,
+            feed_state,
+            model,
+            index,
+            cached_urls,
+            embedding_store,
+            lexical_index,
+        )
 
-    for category, url in feeds.items():
-        articles = fetch_articles(url)
-        for article in articles:
-            article.category = category
-            # Skip if the URL is already cached
-            if article.link in cached_urls:
-                print(f"Skipping cached URL: {article.link}")
+    if feed_state_file:
+        for result in fetched:
+            if result.error or any(a.link in failed_links for a in result.articles):
                 continue
-            # Generate embeddings
-            if article.title and article.summary:
-                embedding = model.encode(
-                    article.title + " " + article.summary, convert_to_tensor=True
-                ).tolist()
-                # Add to Pinecone
-                index.upsert(
-                    [
-                        (
-                            article.link,
-                            embedding,
-                            {
-                                "title": article.title,
-                                "summary": article.summary,
-                                "category": article.category,
-                                "published": article.published,
-                            },
+            feed_state[result.url] = {"etag": result.etag, "modified": result.modified}
+        save_feed_state(feed_state, feed_state_file)
+    INGEST_RUN_DURATION.set(time.perf_counter() - started_at)
+    INGEST_RUN_TIMESTAMP.set(time.time())
+    print("Processing completed.")
+    return fetched, upserted
+
+
+def _fetch_stage(category, url, state, session, parse_pool, stages):
+    """Download one feed and parse it, inline or on `parse_pool`."""
+    etag, modified = state.get("etag"), state.get("modified")
+    started_at = time.perf_counter()
+    if parse_pool is None:
+        result = fetch_feed(category, url, etag, modified, session)
+        stages["fetch"].record(1, time.perf_counter() - started_at)
+        return result
+    result, payload = download_feed(category, url, etag, modified, session)
+    stages["fetch"].record(1, time.perf_counter() - started_at)
+    if payload is not None:
+        started_at = time.perf_counter()
+        result.articles = parse_pool.submit(parse_payload, *payload).result()
+        stages["parse"].record(len(result.articles), time.perf_counter() - started_at)
+    return result
+
+
+def _classify(result, cached_urls, fingerprints):
+    """Return a fetched feed's new and changed articles, counting each outcome.
+
+    An article is changed when its fingerprint (title, summary, published)
+    differs from the one it was last ingested with. Changed articles are
+    upserted again; with an embedding store, one whose text is unchanged
+    (a metadata-only edit) reuses its stored vector instead of being
+    re-encoded. URLs recorded before fingerprints existed adopt their
+    current fingerprint without being re-ingested. `fingerprints` collects
+    the links queued so far in the run (the first occurrence wins).
+    """
+    known = cached_urls.fingerprints(a.link for a in result.articles)
+    pending = []
+    adopted = []
+    for article in result.articles:
+        article.category = result.category
+        if article.link in fingerprints:
+            print(f"Skipping duplicate URL: {article.link}")
+            INGEST_ARTICLES.inc(stage="skipped")
+            continue
+        if not (article.title and article.summary):
+            print(f"Skipping article with missing title or summary: {article}")
+            INGEST_ARTICLES.inc(stage="skipped")
+            continue
+        current = article_fingerprint(article)
+        if article.link not in known:
+            result.new_articles += 1
+        elif known[article.link] in (None, current):
+            if known[article.link] is None:
+                adopted.append((article.link, current))
+            print(f"Skipping unchanged URL: {article.link}")
+            INGEST_ARTICLES.inc(stage="skipped")
+            result.unchanged_articles += 1
+            continue
+        else:
+            print(f"Re-ingesting changed URL: {article.link}")
+            result.changed_articles += 1
+        pending.append(article)
+        fingerprints[article.link] = current
+    report_changes(result)
+    if adopted:
+        cached_urls.record(adopted)
+    return pending
+
+
+def _ingest(
+    feeds,
+    feed_state,
+    model,
+    index,
+    cached_urls,
+    embedding_store=None,
+    lexical_index=None,
+):
+    """Run the fetch -> parse -> embed -> upsert pipeline over `feeds`.
+
+    - fetch: `FEED_FETCH_WORKERS` threads download the feeds; parsing runs
+      in those threads, or on `PARSE_WORKERS` processes when set.
+    - classify: this thread takes the feeds in order as they arrive, sorts
+      their articles into new / changed / unchanged, and queues the new
+      and changed ones in batches of at most `EMBED_BATCH_SIZE`.
+    - embed: one worker encodes each batch, merged with any batches
+      already waiting, and cuts the vectors into `UPSERT_CHUNK_SIZE` chunks.
+    - upsert: `UPSERT_WORKERS` threads send the chunks with retries.
+
+    The embed and upsert queues hold at most `EMBED_QUEUE_SIZE` batches
+    and `UPSERT_QUEUE_SIZE` chunks, so a slow stage blocks the one before
+    it instead of letting memory grow. The upsert workers report each
+    finished chunk's links and metadata (not its vectors); this thread
+    records confirmed links in `cached_urls` as they arrive, including
+    while it waits on a download or a full queue. A per-stage throughput
+    and queue report is printed at the end. Returns (fetch results in feed
+    order, upserted count, failed links).
+    """
+    started_at = time.perf_counter()
+    upsert_workers = max(1, UPSERT_WORKERS)
+    stages = {
+        "fetch": StageStats("fetch", FEED_FETCH_WORKERS),
+        "parse": StageStats("parse", PARSE_WORKERS),
+        "classify": StageStats("classify"),
+        "embed": StageStats("embed"),
+        "upsert": StageStats("upsert", upsert_workers),
+    }
+    embed_queue = MonitoredQueue("embed", EMBED_QUEUE_SIZE)
+    upsert_queue = MonitoredQueue("upsert", UPSERT_QUEUE_SIZE)
+    done_queue = queue.Queue()
+    fingerprints = {}
+    errors = []
+
+    def embed_worker():
+        buffer = []
+        held = None
+        try:
+            while True:
+                batch = held if held is not None else embed_queue.get()
+                held = None
+                if batch is DONE:
+                    break
+                # Merge batches that are already waiting, up to a full batch
+                while len(batch) < EMBED_BATCH_SIZE:
+                    try:
+                        more = embed_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if more is DONE or len(batch) + len(more) > EMBED_BATCH_SIZE:
+                        held = more
+                        break
+                    batch = batch + more
+                if errors:
+                    continue  # Drain the queue so the producer never blocks
+                stage_at = time.perf_counter()
+                try:
+                    vectors = embed_articles(model, batch, store=embedding_store)
+                    if embedding_store is not None:
+                        embedding_store.record_documents(
+                            (a.link, article_text(a), article_metadata(a))
+                            for a in batch
                         )
-                    ]
+                except Exception as exc:
+                    errors.append(exc)
+                    continue
+                stages["embed"].record(len(batch), time.perf_counter() - stage_at)
+                buffer.extend(
+                    (article.link, vector, article_metadata(article))
+                    for article, vector in zip(batch, vectors)
                 )
-                # Cache the URL
-                cached_urls.add(article.link)
-                print(f"Upserted and cached URL: {article.link}")
-            else:
-                print(f"Skipping article with missing title or summary: {article}")
+                while len(buffer) >= UPSERT_CHUNK_SIZE:
+                    chunk = buffer[:UPSERT_CHUNK_SIZE]
+                    buffer = buffer[UPSERT_CHUNK_SIZE:]
+                    upsert_queue.put(chunk)
+            if buffer:
+                upsert_queue.put(buffer)
+        finally:
+            for _ in range(upsert_workers):
+                upsert_queue.put(DONE)
 
-    # Save updated cache
-    save_cached_urls(cached_urls, log_file)
-    print("Processing completed.")
+    def upsert_worker():
+        while True:
+            chunk = upsert_queue.get()
+            if chunk is DONE:
+                return
+            stage_at = time.perf_counter()
+            error = None
+            try:
+                upsert_with_retry(index, chunk)
+            except Exception as exc:
+                error = exc
+            # Only what recording needs, so finished chunks hold no vectors
+            done_queue.put(([(link, metadata) for link, _, metadata in chunk], error))
+            stages["upsert"].record(len(chunk), time.perf_counter() - stage_at)
+
+    upserted = 0
+    failed_links = set()
+    confirmed = []
+
+    def collect(timeout=0.0):
+        """Record the chunks the upsert workers finished so far.
+
+        With `timeout`, wait up to that long for the first one.
+        """
+        nonlocal upserted
+        while True:
+            try:
+                chunk, exc = (
+                    done_queue.get(timeout=timeout)
+                    if timeout
+                    else (done_queue.get_nowait())
+                )
+            except queue.Empty:
+                return
+            timeout = 0.0
+            if exc is not None:
+                print(f"Failed to upsert chunk of {len(chunk)} vectors: {exc}")
+                failed_links.update(link for link, _ in chunk)
+                INGEST_ARTICLES.inc(len(chunk), stage="failed")
+                continue
+            # Record the URLs only once their chunk is confirmed
+            cached_urls.record((link, fingerprints[link]) for link, _ in chunk)
+            for link, _ in chunk:
+                print(f"Upserted and cached URL: {link}")
+            upserted += len(chunk)
+            INGEST_ARTICLES.inc(len(chunk), stage="upserted")
+            confirmed.extend(chunk)
+
+    def wait_collecting(futures):
+        """Wait for `futures`, recording finished chunks meanwhile."""
+        while not all(future.done() for future in futures):
+            collect(_COLLECT_POLL_S)
+        collect()
+
+    def put_collecting(q, item):
+        """Put `item` on `q`, recording finished chunks while it is full."""
+        while True:
+            try:
+                q.put(item, timeout=_COLLECT_POLL_S)
+                return
+            except queue.Full:
+                collect()
+
+    fetched = []
+    with ExitStack() as stack:
+        session = stack.enter_context(requests.Session())
+        fetch_pool = stack.enter_context(
+            ThreadPoolExecutor(max_workers=max(1, FEED_FETCH_WORKERS))
+        )
+        parse_pool = None
+        if PARSE_WORKERS > 0:
+            parse_pool = stack.enter_context(
+                ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+            )
+        workers = stack.enter_context(ThreadPoolExecutor(upsert_workers + 1))
+        background = [workers.submit(embed_worker)]
+        background += [workers.submit(upsert_worker) for _ in range(upsert_workers)]
+        futures = [
+            fetch_pool.submit(
+                _fetch_stage,
+                category,
+                url,
+                feed_state.get(url, {}),
+                session,
+                parse_pool,
+                stages,
+            )
+            for category, url in feeds.items()
+        ]
+        try:
+            for future in futures:
+                wait_collecting([future])
+                result = future.result()
+                fetched.append(result)
+                report_fetch(result)
+                record_fetch(result)
+                stage_at = time.perf_counter()
+                pending = _classify(result, cached_urls, fingerprints)
+                stages["classify"].record(
+                    len(result.articles), time.perf_counter() - stage_at
+                )
+                for batch in chunked(pending, EMBED_BATCH_SIZE):
+                    put_collecting(embed_queue, batch)
+        finally:
+            put_collecting(embed_queue, DONE)
+            wait_collecting(background)
+            for future in background:
+                future.result()
+    if lexical_index is not None:
+        lexical_index.upsert(confirmed)
+
+    wall_s = time.perf_counter() - started_at
+    reported = [s for name, s in stages.items() if name != "parse" or parse_pool]
+    for stage in reported:
+        INGEST_STAGE_UTILIZATION.set(
+            stage.summary(wall_s)["utilization"], stage=stage.name
+        )
+    for q in (embed_queue, upsert_queue):
+        INGEST_QUEUE_OCCUPANCY.set(q.summary()["mean"], queue=q.name)
+    print(format_report(reported, [embed_queue, upsert_queue], wall_s))
+    if errors:
+        raise errors[0]
+    return fetched, upserted, failed_links
+
+
+FEEDS = {
+    "vsd_people": "https://vsd.fr/actu-people/feed/",
+    "vsd_tv": "https://vsd.fr/tele/feed/",
+    "vsd_company": "https://vsd.fr/societe/feed/",
+    "vsd_culture": "https://vsd.fr/culture/feed/",
+    "vsd_leisure": "https://vsd.fr/loisirs/feed/",
+    "public_news": "https://www.public.fr/feed",
+    "public_people": "https://www.public.fr/people/feed",
+    "public_tv": "https://www.public.fr/tele/feed",
+    "public_fashion": "https://www.public.fr/mode/feed",
+    "public_royalty": "https://www.public.fr/people/familles-royales/feed",
+}
+
+
+def data_directory():
+    """Return `DATA_DIR` (default `data/` in the repo), creating it if needed."""
+    data_dir = Path(os.getenv("DATA_DIR", Path(__file__).resolve().parents[1] / "data"))
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
+
+
+def open_index(data_dir, index_name=INDEX_NAME):
+    """Open the vector store selected by `VECTOR_BACKEND`.
+
+    Pinecone (default) creates the index if needed; with
+    `VECTOR_PARTITIONS`, every backend also keeps one partition per feed
+    category.
+    """
+    return create_vector_store(
+        os.getenv("VECTOR_BACKEND", "pinecone"),
+        data_dir,
+        index_name,
+        lambda: initialize_pinecone(
+            os.getenv("PINECONE_KEY"), None, index_name, EMBEDDING_DIM
+        ),
+    )
+
+
+def prepare_seen_urls(log_file, data_dir):
+    """Import the legacy pickle once and expire URLs past `SEEN_URL_TTL_DAYS`."""
+    with SeenUrlStore(log_file) as seen_urls:
+        migrated = seen_urls.migrate_from_pickle(data_dir / "cached_urls.pkl")
+        if migrated:
+            print(f"Migrated {migrated} URLs from cached_urls.pkl.")
+        if SEEN_URL_TTL_DAYS > 0:
+            seen_urls.expire(SEEN_URL_TTL_DAYS)
 
 
 # Main function
 def main():
     """Entry point for ingestion: ensure index, fetch feeds, and upsert."""
-    # Configurations
-    api_key = os.getenv("PINECONE_KEY")
-    environment = None  # Not used with current Pinecone client
-    index_name = "gossip-semantic-search"
-    embedding_dim = 384
-    data_dir = Path(os.getenv("DATA_DIR", Path(__file__).resolve().parents[1] / "data"))
-    data_dir.mkdir(parents=True, exist_ok=True)
-    log_file = str(data_dir / "cached_urls.pkl")
-
-    # Initialize Pinecone
-    index = initialize_pinecone(api_key, environment, index_name, embedding_dim)
-
-    # Define feeds
-    feeds = {
-        "vsd_people": "https://vsd.fr/actu-people/feed/",
-        "vsd_tv": "https://vsd.fr/tele/feed/",
-        "vsd_company": "https://vsd.fr/societe/feed/",
-        "vsd_culture": "https://vsd.fr/culture/feed/",
-        "vsd_leisure": "https://vsd.fr/loisirs/feed/",
-        "public_news": "https://www.public.fr/feed",
-        "public_people": "https://www.public.fr/people/feed",
-        "public_tv": "https://www.public.fr/tele/feed",
-        "public_fashion": "https://www.public.fr/mode/feed",
-        "public_royalty": "https://www.public.fr/people/familles-royales/feed",
-    }
+    data_dir = data_directory()
+    log_file = str(data_dir / "seen_urls.sqlite3")
+    feed_state_file = str(data_dir / "feed_state.json")
+
+    index = open_index(data_dir)
+    prepare_seen_urls(log_file, data_dir)
 
-    # Load the model
-    model = SentenceTransformer("all-MiniLM-L6-v2")
+    # Load the model on the configured encoder backend
+    model = load_encoder(MODEL_NAME)
+
+    # Process feeds with caching; embeddings are kept for `src.reindex`
+    store_dir = data_dir / EMBEDDING_STORE_DIR
+    with EmbeddingStore(store_dir, encoder_id(MODEL_NAME)) as store:
+        upserted = process_feeds_with_cache(
+            FEEDS,
+            model,
+            index,
+            log_file,
+            feed_state_file=feed_state_file,
+            embedding_store=store,
+            lexical_index=LexicalIndex(data_dir / LEXICAL_INDEX_DIR, INDEX_NAME),
+        )
 
-    # Process feeds with caching
-    process_feeds_with_cache(feeds, model, index, log_file)
+    # Let the backend know the index changed (drops cached stats)
+    if upserted:
+        bump_index_generation(data_dir)
+    write_textfile(INGEST_METRICS, data_dir / INGEST_METRICS_FILE)
 
 
 if __name__ == "__main__":
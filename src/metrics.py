@@ -0,0 +1,224 @@
+import bisect
+import math
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# File under DATA_DIR where ingestion publishes its metrics for the backend
+INGEST_METRICS_FILE = "ingest_metrics.prom"
+# Latency buckets in seconds, from sub-millisecond cache hits to slow encodes
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+LabelValues = Tuple[str, ...]
+# (name suffix, label values, extra label pairs, value)
+Sample = Tuple[str, LabelValues, Sequence[Tuple[str, str]], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """A named metric family with optional labels, rendered in text format."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [("", key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for suffix, key, extra, value in self.samples():
+            pairs = list(zip(self.labelnames, key)) + list(extra)
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+            labels = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """Count the enclosed block as in flight while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    """Distribution of observations over fixed cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            state[bisect.bisect_left(self.buckets, value)] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, hits in zip(self.buckets, state):
+                    cumulative += hits
+                    le = (("le", _format_value(bound)),)
+                    samples.append(("_bucket", key, le, cumulative))
+                samples.append(("_sum", key, (), state[-2]))
+                samples.append(("_count", key, (), state[-1]))
+        return samples
+
+
+class CallbackMetric(Metric):
+    """Metric whose samples are read from `fn` at scrape time.
+
+    `fn` returns `{label values tuple: value}`; use it to expose counters
+    that already live elsewhere (e.g. cache hit counts).
+    """
+
+    def __init__(self, name, help, type, fn, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.type = type
+        self.fn: Callable[[], Dict[LabelValues, float]] = fn
+
+    def samples(self):
+        return [("", key, (), value) for key, value in sorted(self.fn().items())]
+
+
+class Registry:
+    """Ordered collection of metrics rendered together for `/metrics`."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, type, fn, labelnames=()) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, type, fn, labelnames))
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        return "".join(metric.render() + "\n" for metric in self._metrics.values())
+
+
+def write_textfile(registry: Registry, path) -> None:
+    """Atomically write `registry` to `path` for another process to serve.
+
+    Short-lived jobs (ingestion) publish their metrics this way; the
+    backend appends the file to its own `/metrics` output.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(registry.render())
+    os.replace(tmp_path, path)
+
+
+def read_textfile(path) -> str:
+    """Return the metrics written by `write_textfile`, or "" if absent."""
+    try:
+        return Path(path).read_text()
+    except FileNotFoundError:
+        return ""
@@ -0,0 +1,98 @@
+import queue
+import threading
+import time
+from typing import Dict, List
+
+# End-of-stream marker passed down pipeline queues
+DONE = object()
+
+
+class StageStats:
+    """Items processed and busy time of one pipeline stage, across its workers."""
+
+    def __init__(self, name: str, workers: int = 1):
+        self.name = name
+        self.workers = max(1, workers)
+        self.items = 0
+        self.busy_s = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, busy_s: float) -> None:
+        with self._lock:
+            self.items += items
+            self.busy_s += busy_s
+
+    def summary(self, wall_s: float) -> Dict[str, float]:
+        """Return items, busy time, throughput and utilization over `wall_s`.
+
+        `per_worker_s` is the rate one busy worker sustains; `utilization`
+        is the share of the stage's worker time spent working, so the stage
+        closest to 1.0 is the bottleneck.
+        """
+        return {
+            "items": self.items,
+            "busy_s": self.busy_s,
+            "per_s": self.items / wall_s if wall_s else 0.0,
+            "per_worker_s": self.items / self.busy_s if self.busy_s else 0.0,
+            "utilization": self.busy_s / (wall_s * self.workers) if wall_s else 0.0,
+        }
+
+
+class MonitoredQueue(queue.Queue):
+    """Bounded queue that records its occupancy and how long producers block.
+
+    Occupancy is sampled after every `put`; `blocked_s` is the total time
+    producers waited for space, i.e. how hard backpressure pushed back.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        super().__init__(maxsize=max(1, maxsize))
+        self.name = name
+        self.puts = 0
+        self.occupancy_sum = 0
+        self.peak = 0
+        self.blocked_s = 0.0
+        self._stats_lock = threading.Lock()
+
+    def put(self, item, block=True, timeout=None):
+        started_at = time.perf_counter()
+        try:
+            super().put(item, block, timeout)
+        finally:
+            # A put that timed out on a full queue still blocked its producer
+            with self._stats_lock:
+                self.blocked_s += time.perf_counter() - started_at
+        size = self.qsize()
+        with self._stats_lock:
+            self.puts += 1
+            self.occupancy_sum += size
+            self.peak = max(self.peak, size)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "capacity": self.maxsize,
+            "mean": self.occupancy_sum / self.puts if self.puts else 0.0,
+            "peak": self.peak,
+            "blocked_s": self.blocked_s,
+        }
+
+
+def format_report(
+    stages: List[StageStats], queues: List[MonitoredQueue], wall_s: float
+) -> str:
+    """Render per-stage throughput and queue occupancy as a text table."""
+    lines = [f"Pipeline finished in {wall_s:.2f} s"]
+    for stage in stages:
+        s = stage.summary(wall_s)
+        lines.append(
+            f"  {stage.name:<8} {s['items']:>7} items  {s['busy_s']:>7.2f} s busy"
+            f"  {s['per_s']:>9.1f}/s  {s['per_worker_s']:>9.1f}/s per worker"
+            f"  {s['utilization']:>4.0%} of {stage.workers} worker(s)"
+        )
+    for q in queues:
+        s = q.summary()
+        lines.append(
+            f"  queue {q.name:<8} mean {s['mean']:.1f} / peak {s['peak']}"
+            f" of {s['capacity']}, producers blocked {s['blocked_s']:.2f} s"
+        )
+    return "\n".join(lines)
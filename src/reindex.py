@@ -0,0 +1,131 @@
+"""Rebuild a vector index from the embedding store without running the model.
+
+Ingestion keeps every embedding it computes, with each article's latest
+metadata, in `DATA_DIR/embeddings/`. This bulk-loads them into any
+vector backend, e.g. to switch backends or recover a lost index, and
+rebuilds the lexical index from the same metadata. With
+`VECTOR_PARTITIONS=1` it also backfills the per-category partitions:
+
+    uv run python -m src.reindex                  # VECTOR_BACKEND from env
+    uv run python -m src.reindex --backend ivf
+"""
+
+import argparse
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from . import load_articles as la
+from .embedding_store import EMBEDDING_STORE_DIR, EmbeddingStore
+from .index_state import bump_index_generation
+from .lexical_index import LEXICAL_INDEX_DIR, LexicalIndex
+from .vector_store import VECTOR_BACKENDS, PartitionedVectorStore, create_vector_store
+
+
+def reindex(store, index, chunk_size=None, workers=None, lexical_index=None):
+    """Upsert every document in `store` into `index`; returns (upserted, failed).
+
+    Chunks of `chunk_size` records are sent on `workers` threads with the
+    ingestion retry policy; the vectors of at most two chunks per worker
+    are held in memory at a time. With `lexical_index`, every document's
+    metadata is also collected and written to it once, at the end. A
+    partitioned `index` has its partitions marked as backfilled when every
+    chunk succeeded (see `mark_backfilled_partitions`).
+    """
+    chunk_size = chunk_size or la.UPSERT_CHUNK_SIZE
+    workers = max(1, workers or la.UPSERT_WORKERS)
+    upserted = failed = 0
+    lexical_records = []
+    categories = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def collect(futures):
+            nonlocal upserted, failed
+            for future in futures:
+                size = pending.pop(future)
+                try:
+                    future.result()
+                except Exception as exc:
+                    print(f"Failed to upsert chunk of {size} vectors: {exc}")
+                    failed += size
+                else:
+                    upserted += size
+
+        for chunk in store.iter_documents(chunk_size):
+            if len(pending) >= 2 * workers:
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+            pending[pool.submit(la.upsert_with_retry, index, chunk)] = len(chunk)
+            lexical_records.extend((link, metadata) for link, _, metadata in chunk)
+            if isinstance(index, PartitionedVectorStore):
+                categories.update(
+                    metadata.get(index.field) for _, _, metadata in chunk if metadata
+                )
+        collect(list(pending))
+    if lexical_index is not None:
+        lexical_index.upsert(lexical_records)
+    if isinstance(index, PartitionedVectorStore) and not failed:
+        mark_backfilled_partitions(index, categories, upserted)
+    return upserted, failed
+
+
+def mark_backfilled_partitions(index, names, reindexed):
+    """Mark `names` backfilled if the reindex covered the whole shared index.
+
+    The embedding store only holds articles ingested since it was added.
+    When the shared index has more vectors than were `reindexed`, the
+    partitions may miss some articles, so filtered searches keep using
+    the shared index. Returns True if the partitions were marked.
+    """
+    total = index.shared.describe_index_stats().get("total_vector_count") or 0
+    if total > reindexed:
+        print(
+            f"Partitions not marked as backfilled: the shared index holds "
+            f"{total} vectors but only {reindexed} were in the embedding store."
+        )
+        return False
+    index.mark_backfilled(name for name in names if isinstance(name, str))
+    return True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--backend",
+        choices=VECTOR_BACKENDS,
+        default=os.getenv("VECTOR_BACKEND", "pinecone"),
+    )
+    parser.add_argument("--index-name", default=la.INDEX_NAME)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Reindex from `DATA_DIR/embeddings`; returns 1 if any chunk failed.
+
+    Reads the embeddings of the configured `ENCODER_BACKEND`.
+    """
+    args = parse_args(argv)
+    data_dir = la.data_directory()
+    store_dir = data_dir / EMBEDDING_STORE_DIR
+    with EmbeddingStore(store_dir, la.encoder_id(la.MODEL_NAME)) as store:
+        index = create_vector_store(
+            args.backend,
+            data_dir,
+            args.index_name,
+            lambda: la.initialize_pinecone(
+                os.getenv("PINECONE_KEY"),
+                None,
+                args.index_name,
+                store.dim or la.EMBEDDING_DIM,
+            ),
+        )
+        print(f"Reindexing {store.document_count()} documents into {args.backend}...")
+        lexical_index = LexicalIndex(data_dir / LEXICAL_INDEX_DIR, args.index_name)
+        upserted, failed = reindex(store, index, lexical_index=lexical_index)
+    if upserted:
+        bump_index_generation(data_dir)
+    print(f"Reindexed {upserted} documents ({failed} failed).")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
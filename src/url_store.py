@@ -0,0 +1,123 @@
+import hashlib
+import pickle
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# SQLite caps bound parameters per statement; stay well below the limit
+SQLITE_IN_CHUNK = 500
+
+
+def url_hash(url: str) -> int:
+    """Return a signed 64-bit hash of `url` (fits an SQLite INTEGER key)."""
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def fingerprint(*fields: str) -> int:
+    """Return a signed 64-bit hash over `fields` (an article's content)."""
+    return url_hash("\0".join(fields))
+
+
+class SeenUrlStore:
+    """Incremental record of ingested article URLs backed by SQLite.
+
+    Each URL is stored as a 64-bit hash primary key plus the time it was
+    recorded and the content fingerprint it was ingested with, so lookups
+    hit the index and each batch is committed as it is confirmed: a crash
+    mid-run keeps everything recorded so far. URLs recorded without a
+    fingerprint (or before fingerprints existed) have a NULL one.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS seen_urls ("
+            "url_hash INTEGER PRIMARY KEY, added_at REAL NOT NULL, "
+            "fingerprint INTEGER) WITHOUT ROWID"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(seen_urls)")}
+        if "fingerprint" not in columns:
+            self._db.execute("ALTER TABLE seen_urls ADD COLUMN fingerprint INTEGER")
+        self._db.commit()
+
+    def __enter__(self) -> "SeenUrlStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __contains__(self, url: str) -> bool:
+        row = self._db.execute(
+            "SELECT 1 FROM seen_urls WHERE url_hash = ?", (url_hash(url),)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM seen_urls").fetchone()[0]
+
+    def seen(self, urls: Iterable[str]) -> Set[str]:
+        """Return the subset of `urls` already recorded (batched lookups)."""
+        return set(self.fingerprints(urls))
+
+    def fingerprints(self, urls: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Map each recorded URL in `urls` to its fingerprint (batched lookups)."""
+        by_hash = {url_hash(url): url for url in urls}
+        hashes = list(by_hash)
+        found = {}
+        for start in range(0, len(hashes), SQLITE_IN_CHUNK):
+            chunk = hashes[start : start + SQLITE_IN_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._db.execute(
+                "SELECT url_hash, fingerprint FROM seen_urls "
+                f"WHERE url_hash IN ({placeholders})",
+                chunk,
+            )
+            found.update((by_hash[h], fp) for h, fp in rows)
+        return found
+
+    def add_many(self, urls: Iterable[str], now: Optional[float] = None) -> None:
+        """Record `urls` without a fingerprint and commit immediately."""
+        self.record(((url, None) for url in urls), now)
+
+    def record(
+        self, items: Iterable[Tuple[str, Optional[int]]], now: Optional[float] = None
+    ) -> None:
+        """Record `(url, fingerprint)` pairs and commit immediately."""
+        now = time.time() if now is None else now
+        self._db.executemany(
+            "INSERT OR REPLACE INTO seen_urls (url_hash, added_at, fingerprint) "
+            "VALUES (?, ?, ?)",
+            ((url_hash(url), now, fp) for url, fp in items),
+        )
+        self._db.commit()
+
+    def expire(self, max_age_days: float, now: Optional[float] = None) -> int:
+        """Forget URLs recorded more than `max_age_days` ago; returns the count."""
+        now = time.time() if now is None else now
+        cursor = self._db.execute(
+            "DELETE FROM seen_urls WHERE added_at < ?", (now - max_age_days * 86400,)
+        )
+        self._db.commit()
+        return cursor.rowcount
+
+    def migrate_from_pickle(self, pickle_path) -> int:
+        """Import a legacy `cached_urls.pkl` set once, then rename it.
+
+        Returns the number of URLs imported (0 if there was nothing to do).
+        """
+        pickle_path = Path(pickle_path)
+        if not pickle_path.exists():
+            return 0
+        with open(pickle_path, "rb") as f:
+            urls = pickle.load(f)
+        self.add_many(urls)
+        pickle_path.rename(pickle_path.with_name(pickle_path.name + ".migrated"))
+        return len(urls)
+
+    def close(self) -> None:
+        self._db.close()
@@ -0,0 +1,967 @@
+import heapq
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+VECTOR_BACKENDS = ("pinecone", "local", "ivf")
+# IVF index: inverted lists (0 = about 4*sqrt(n)), lists probed per query,
+# candidates re-scored in float per requested result, rows needed before the
+# first training, and growth factor that triggers retraining
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+IVF_RESCORE = int(os.getenv("IVF_RESCORE", "4"))
+IVF_TRAIN_MIN_ROWS = int(os.getenv("IVF_TRAIN_MIN_ROWS", "1024"))
+IVF_RETRAIN_GROWTH = float(os.getenv("IVF_RETRAIN_GROWTH", "4"))
+# Also keep one partition per category (Pinecone namespace or local index),
+# and how many partitions a filtered query searches concurrently
+VECTOR_PARTITIONS = os.getenv("VECTOR_PARTITIONS", "0") == "1"
+PARTITION_QUERY_WORKERS = int(os.getenv("PARTITION_QUERY_WORKERS", "8"))
+# Category values usable as partition names
+_PARTITION_NAME = re.compile(r"[\w-]{1,64}")
+
+# (id, values, metadata) -- the tuple shape Pinecone's `upsert` accepts
+VectorRecord = Tuple[str, Sequence[float], Dict[str, Any]]
+
+
+class VectorStore(ABC):
+    """Vector index interface shared by search and ingestion.
+
+    Mirrors the subset of the Pinecone `Index` API the app relies on, so
+    a Pinecone index and the in-process backends are interchangeable.
+    `query` returns `{"matches": [{"id", "score", "metadata"}, ...]}`.
+    """
+
+    @abstractmethod
+    def upsert(self, vectors: Iterable[VectorRecord]) -> None:
+        """Insert or overwrite `(id, values, metadata)` records."""
+
+    @abstractmethod
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int,
+        include_metadata: bool = True,
+        filter: Optional[dict] = None,
+        nprobe: Optional[int] = None,
+    ) -> dict:
+        """Return the `top_k` records most similar to `vector`.
+
+        `nprobe` tunes approximate backends per query; exact backends
+        ignore it.
+        """
+
+    @abstractmethod
+    def describe_index_stats(self) -> dict:
+        """Return index statistics including `total_vector_count`."""
+
+    @abstractmethod
+    def delete(self, ids: Sequence[str]) -> None:
+        """Remove the records with the given ids."""
+
+
+class PineconeStore(VectorStore):
+    """`VectorStore` backed by a Pinecone `Index` handle.
+
+    With `namespace`, every call is scoped to that namespace and the stats
+    count only its vectors.
+    """
+
+    def __init__(self, index, namespace: Optional[str] = None):
+        self.index = index
+        self.namespace = namespace
+
+    def _scope(self) -> dict:
+        return {} if self.namespace is None else {"namespace": self.namespace}
+
+    def upsert(self, vectors):
+        return self.index.upsert(list(vectors), **self._scope())
+
+    def query(self, vector, top_k, include_metadata=True, filter=None, nprobe=None):
+        return self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=include_metadata,
+            filter=filter,
+            **self._scope(),
+        )
+
+    def describe_index_stats(self):
+        stats = self.index.describe_index_stats()
+        namespaces = stats.get("namespaces")
+        if self.namespace is None or not namespaces:
+            return stats
+        summary = namespaces.get(self.namespace) or {}
+        return {
+            "total_vector_count": summary.get("vector_count", 0),
+            "dimension": stats.get("dimension", 0),
+        }
+
+    def delete(self, ids):
+        return self.index.delete(ids=list(ids), **self._scope())
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+def atomic_write(path: Path, write: Callable[[Any], None], mode: str = "wb") -> None:
+    """Write `path` via `write(f)` on a temp file, then rename it into place."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, mode) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """Immutable view of a local index: vectors, ids and columnar metadata."""
+
+    def __init__(self, vectors: np.ndarray, ids: List[str], columns: Dict[str, list]):
+        self.vectors = vectors
+        self.ids = ids
+        self.columns = columns
+        self._codes: Dict[str, Tuple[Dict[Any, int], np.ndarray]] = {}
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        return {
+            key: col[row] for key, col in self.columns.items() if col[row] is not None
+        }
+
+    def column_codes(self, field: str) -> Tuple[Dict[Any, int], np.ndarray]:
+        """Return (value -> code, per-row codes) for `field`, built lazily."""
+        cached = self._codes.get(field)
+        if cached is None:
+            lookup: Dict[Any, int] = {}
+            column = self.columns.get(field, [None] * len(self.ids))
+            codes = np.fromiter(
+                (lookup.setdefault(value, len(lookup)) for value in column),
+                dtype=np.int32,
+                count=len(column),
+            )
+            cached = self._codes[field] = (lookup, codes)
+        return cached
+
+    def filter_mask(
+        self, filter: dict, rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Evaluate a Pinecone-style metadata filter (`$eq`/`$in`) to a row mask.
+
+        With `rows`, the mask covers only those rows, in that order.
+        """
+        mask = np.ones(len(self.ids) if rows is None else len(rows), dtype=bool)
+        for field, condition in filter.items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            lookup, codes = self.column_codes(field)
+            if rows is not None:
+                codes = codes[rows]
+            for op, operand in condition.items():
+                if op == "$eq":
+                    wanted = [operand]
+                elif op == "$in":
+                    wanted = list(operand)
+                else:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+                wanted_codes = [lookup[v] for v in wanted if v in lookup]
+                mask &= np.isin(codes, wanted_codes)
+        return mask
+
+
+def top_k_rows(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Return positions of the `top_k` highest scores, best first."""
+    k = min(top_k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def merge_top_k(rankings: Sequence[Sequence[dict]], top_k: int) -> List[dict]:
+    """Merge match lists sorted by descending score into the overall top k.
+
+    A heap holds the head of each list, so only about `top_k` matches are
+    visited; an id found in several lists keeps its best match.
+    """
+    merged = []
+    seen = set()
+    for match in heapq.merge(*rankings, key=lambda m: -m["score"]):
+        if len(merged) >= top_k:
+            break
+        if match["id"] not in seen:
+            seen.add(match["id"])
+            merged.append(match)
+    return merged
+
+
+class _RowLog:
+    """Ids and metadata of a store generation, parsed incrementally from its log.
+
+    Rows are numbered in log order. A later row for the same id replaces the
+    earlier one, and a delete record drops the id's current row.
+    """
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.offset = 0
+        self.ids: List[str] = []
+        self.columns: Dict[str, list] = {}
+        self.row_of: Dict[str, int] = {}
+
+    def read(self, path: Path) -> None:
+        """Parse records appended since the last read; a torn last line is skipped."""
+        with open(path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            self.apply(json.loads(line))
+        self.offset += end
+
+    def apply(self, record: dict) -> None:
+        if "delete" in record:
+            for id_ in record["delete"]:
+                self.row_of.pop(id_, None)
+            return
+        row = len(self.ids)
+        self.ids.append(record["id"])
+        for col in self.columns.values():
+            col.append(None)
+        for key, value in (record.get("metadata") or {}).items():
+            if key not in self.columns:
+                self.columns[key] = [None] * (row + 1)
+            self.columns[key][row] = value
+        self.row_of[record["id"]] = row
+
+
+class _LogSnapshot(Snapshot):
+    """Immutable view of the rows committed to a generation's log."""
+
+    def __init__(self, log: _RowLog, dimension: int):
+        super().__init__(
+            np.zeros((0, dimension), dtype=np.float32),
+            list(log.ids),
+            {key: list(col) for key, col in log.columns.items()},
+        )
+        self.dimension = dimension
+        self.alive = np.zeros(len(self.ids), dtype=bool)
+        self.alive[np.fromiter(log.row_of.values(), np.intp, len(log.row_of))] = True
+
+
+class _AppendOnlyStore(VectorStore):
+    """Vector store whose files are only ever appended to.
+
+    Files live in `<name><suffix>/<generation>/`: fixed-size row files
+    (`row_files`) plus `log.jsonl`, whose records commit the rows and carry
+    ids, metadata and deletes. Readers in other processes load only what
+    was appended, and never see rows beyond the log they read. Compaction
+    writes a new generation and switches `CURRENT` atomically. Writes are
+    serialized within a process; use a single writer process.
+    """
+
+    suffix = ""
+    row_files: Tuple[str, ...] = ()
+
+    def __init__(self, directory, name: str = "index"):
+        self.root = Path(directory) / f"{name}{self.suffix}"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.current_path = self.root / "CURRENT"
+        # Re-entrant: writers reload the snapshot while holding the lock
+        self._lock = threading.RLock()
+        self._log = _RowLog(-1)
+        self._loaded_version = None
+        self._info: Dict[str, Any] = {}
+        self._snapshot = self._load_snapshot(self._log, None, {"dim": 0})
+
+    @classmethod
+    def list_stores(cls, directory) -> List[str]:
+        """Return the names of the indexes written in `directory`."""
+        return [
+            p.parent.name[: -len(cls.suffix)]
+            for p in Path(directory).glob(f"*{cls.suffix}/CURRENT")
+        ]
+
+    @abstractmethod
+    def _load_snapshot(self, log: _RowLog, directory: Optional[Path], info: dict):
+        """Return the snapshot of the rows in `log` (`directory` None: no rows)."""
+
+    def _generation_dir(self, generation: int) -> Path:
+        return self.root / str(generation)
+
+    def _version(self):
+        try:
+            generation = int(self.current_path.read_text())
+            st = (self._generation_dir(generation) / "log.jsonl").stat()
+        except FileNotFoundError:
+            return None
+        return generation, st.st_ino, st.st_size
+
+    def _reload_if_changed(self):
+        version = self._version()
+        if version is None or version == self._loaded_version:
+            return self._snapshot
+        with self._lock:
+            generation = version[0]
+            directory = self._generation_dir(generation)
+            info, log = self._info, self._log
+            try:
+                if generation != log.generation:
+                    info = json.loads((directory / "info.json").read_text())
+                    log = _RowLog(generation)
+                log.read(directory / "log.jsonl")
+                snapshot = self._load_snapshot(log, directory, info)
+            except FileNotFoundError:
+                # Generation replaced by a compaction mid-load; retry next call
+                return self._snapshot
+            self._info, self._log, self._snapshot = info, log, snapshot
+            self._loaded_version = version
+        return self._snapshot
+
+    def _write_generation(self, generation: int, info: dict) -> Path:
+        directory = self._generation_dir(generation)
+        if directory.exists():
+            # Leftover of an interrupted compaction
+            shutil.rmtree(directory)
+        directory.mkdir()
+        for name in self.row_files + ("log.jsonl",):
+            (directory / name).touch()
+        (directory / "info.json").write_text(json.dumps(info))
+        return directory
+
+    def _switch_generation(self, generation: int) -> None:
+        previous = self._log.generation
+        atomic_write(self.current_path, lambda f: f.write(str(generation)), mode="w")
+        self._reload_if_changed()
+        if previous >= 0:
+            # Open memory maps keep the old files readable until released
+            shutil.rmtree(self._generation_dir(previous), ignore_errors=True)
+
+    def _append_rows(self, directory, count, log_offset, rows, arrays) -> int:
+        """Append `arrays` (file name -> rows) after `count` committed rows.
+
+        `rows` are the `(id, metadata)` pairs logged for them; returns the
+        new log size.
+        """
+        for name, array in arrays.items():
+            with open(directory / name, "ab") as f:
+                # Drop rows a crashed writer appended without logging them
+                f.truncate(count * (array.nbytes // len(array)))
+                f.write(array.tobytes())
+        # The log is written last: its records commit the rows
+        return self._append_log(
+            directory,
+            log_offset,
+            [{"id": id_, "metadata": metadata} for id_, metadata in rows],
+        )
+
+    def _append_log(self, directory, offset, records) -> int:
+        """Append `records` after `offset` valid bytes; returns the new size."""
+        with open(directory / "log.jsonl", "ab") as f:
+            # Drop a torn record left by a crashed writer
+            f.truncate(offset)
+            f.write(
+                "".join(
+                    json.dumps(record, ensure_ascii=False) + "\n" for record in records
+                ).encode("utf-8")
+            )
+            return f.tell()
+
+    def _current_dir(self, dim: int) -> Path:
+        """Return the directory of the current generation, creating the first one."""
+        if self._log.generation < 0:
+            self._write_generation(0, self._first_info(dim))
+            self._switch_generation(0)
+        if self._snapshot.dimension != dim:
+            raise ValueError(
+                f"dimension mismatch: index has {self._snapshot.dimension}, got {dim}"
+            )
+        return self._generation_dir(self._log.generation)
+
+    def _first_info(self, dim: int) -> dict:
+        return {"dim": dim}
+
+    def describe_index_stats(self):
+        snap = self._reload_if_changed()
+        return {
+            "total_vector_count": int(snap.alive.sum()),
+            "dimension": snap.dimension if len(snap.ids) else 0,
+        }
+
+    def delete(self, ids):
+        with self._lock:
+            self._reload_if_changed()
+            known = [id_ for id_ in ids if id_ in self._log.row_of]
+            if not known:
+                return
+            self._append_log(
+                self._generation_dir(self._log.generation),
+                self._log.offset,
+                [{"delete": known}],
+            )
+            self._reload_if_changed()
+
+
+class _LocalSnapshot(_LogSnapshot):
+    """Immutable view of a local index: float32 rows plus their live subset."""
+
+    def __init__(self, log: _RowLog, directory: Optional[Path], dimension: int):
+        super().__init__(log, dimension)
+        count = len(self.ids)
+        if directory is not None and count:
+            self.vectors = np.memmap(
+                directory / "vectors.f32", np.float32, "r", shape=(count, dimension)
+            )
+        self.live = np.flatnonzero(self.alive)
+
+
+class LocalVectorStore(_AppendOnlyStore):
+    """Exact cosine search over float32 embeddings in a memory-mapped file.
+
+    Vectors are L2-normalized float32 rows appended to `vectors.f32`; ids
+    and metadata are records in `log.jsonl` (see `_AppendOnlyStore`). A
+    query is one matmul plus `argpartition` over the live rows. An upsert
+    appends only its own rows, so bulk loads are linear in the index size;
+    overwritten and deleted rows are dropped by `compact()`, which runs
+    once they outnumber the live ones.
+    """
+
+    suffix = ".local"
+    row_files = ("vectors.f32",)
+
+    def __init__(self, directory, name: str = "index"):
+        super().__init__(directory, name)
+        legacy = Path(directory) / f"{name}.meta.json"
+        if self._version() is None and legacy.exists():
+            self._import_legacy(legacy, Path(directory) / f"{name}.npy")
+        self._reload_if_changed()
+
+    @classmethod
+    def list_stores(cls, directory) -> List[str]:
+        """Return the names of the indexes written in `directory`."""
+        legacy = [
+            p.name[: -len(".meta.json")] for p in Path(directory).glob("*.meta.json")
+        ]
+        return sorted(set(super().list_stores(directory)) | set(legacy))
+
+    def _load_snapshot(self, log, directory, info):
+        return _LocalSnapshot(log, directory, info["dim"])
+
+    def _import_legacy(self, meta_path: Path, vectors_path: Path) -> None:
+        """Move an index from the former `<name>.npy` + `<name>.meta.json` layout."""
+        with self._lock:
+            meta = json.loads(meta_path.read_text())
+            legacy = Snapshot(np.load(vectors_path), meta["ids"], meta["columns"])
+            if legacy.ids:
+                directory = self._current_dir(int(legacy.vectors.shape[1]))
+                rows = [
+                    (id_, legacy.metadata(row)) for row, id_ in enumerate(legacy.ids)
+                ]
+                self._append_rows(
+                    directory,
+                    0,
+                    0,
+                    rows,
+                    {"vectors.f32": np.asarray(legacy.vectors, dtype=np.float32)},
+                )
+            vectors_path.unlink()
+            meta_path.unlink()
+
+    def upsert(self, vectors):
+        # Last write wins for ids repeated within one call
+        records = list({record[0]: record for record in vectors}.values())
+        if not records:
+            return
+        values = _normalize_rows(np.asarray([r[1] for r in records], np.float32))
+        with self._lock:
+            snap = self._reload_if_changed()
+            directory = self._current_dir(values.shape[1])
+            # Like Pinecone, an upsert replaces the record's metadata
+            rows = [(id_, metadata or {}) for id_, _, metadata in records]
+            self._append_rows(
+                directory,
+                len(snap.ids),
+                self._log.offset,
+                rows,
+                {"vectors.f32": values},
+            )
+            snap = self._reload_if_changed()
+            if len(snap.ids) - len(snap.live) > len(snap.live):
+                self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the live rows into a new generation, dropping dead ones."""
+        with self._lock:
+            snap = self._reload_if_changed()
+            if self._log.generation < 0:
+                return
+            generation = self._log.generation + 1
+            directory = self._write_generation(generation, self._info)
+            log_offset = 0
+            for start in range(0, len(snap.live), 65536):
+                block = snap.live[start : start + 65536]
+                log_offset = self._append_rows(
+                    directory,
+                    start,
+                    log_offset,
+                    [(snap.ids[row], snap.metadata(row)) for row in block],
+                    {"vectors.f32": np.asarray(snap.vectors[block])},
+                )
+            self._switch_generation(generation)
+
+    def query(self, vector, top_k, include_metadata=True, filter=None, nprobe=None):
+        snap = self._reload_if_changed()
+        if not len(snap.live):
+            return {"matches": []}
+        q = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm:
+            q = q / norm
+        rows = snap.live
+        if filter:
+            rows = rows[snap.filter_mask(filter, rows)]
+        if len(rows) == len(snap.ids):
+            # Every row is live and selected: skip the gather
+            rows = None
+            scores = snap.vectors @ q
+        else:
+            scores = snap.vectors[rows] @ q
+        matches = []
+        for position in top_k_rows(scores, top_k):
+            row = int(rows[position]) if rows is not None else int(position)
+            match = {"id": snap.ids[row], "score": float(scores[position])}
+            if include_metadata:
+                match["metadata"] = snap.metadata(row)
+            matches.append(match)
+        return {"matches": matches}
+
+    def delete(self, ids):
+        with self._lock:
+            super().delete(ids)
+            snap = self._snapshot
+            if len(snap.ids) - len(snap.live) > len(snap.live):
+                self.compact()
+
+
+def quantize_rows(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Scalar-quantize rows to int8 with one scale per row.
+
+    Returns `(codes, scales)` such that `codes * scales[:, None]`
+    approximates `vectors`.
+    """
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 65536):
+    """Return the index of the most similar centroid for each row."""
+    lists = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk):
+        block = np.asarray(vectors[start : start + chunk], dtype=np.float32)
+        lists[start : start + chunk] = np.argmax(block @ centroids.T, axis=1)
+    return lists
+
+
+def train_centroids(
+    sample: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0
+) -> np.ndarray:
+    """Spherical k-means: `nlist` unit-norm centroids for normalized rows."""
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(sample))
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+    for _ in range(iterations):
+        lists = assign_lists(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, lists, sample)
+        # Re-seed empty lists from random rows
+        empty = np.flatnonzero(np.bincount(lists, minlength=nlist) == 0)
+        sums[empty] = sample[rng.choice(len(sample), len(empty))]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+def default_nlist(rows: int) -> int:
+    """About 4*sqrt(n) lists, keeping at least 39 training rows per list."""
+    return max(1, min(int(4 * math.sqrt(rows)), rows // 39))
+
+
+class _IVFSnapshot(_LogSnapshot):
+    """Immutable view of an IVF generation: quantized rows plus inverted lists."""
+
+    def __init__(self, log: _RowLog, directory: Optional[Path], dimension: int):
+        super().__init__(log, dimension)
+        count = len(self.ids)
+        self.centroids = None
+        self.lists = np.zeros(0, dtype=np.int32)
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.floats = np.zeros((0, dimension), dtype=np.float32)
+        self.vectors = np.zeros((0, dimension), dtype=np.int8)
+        if directory is not None and count:
+            shape = (count, dimension)
+            self.vectors = np.memmap(directory / "codes.i8", np.int8, "r", shape=shape)
+            self.scales = np.memmap(
+                directory / "scales.f32", np.float32, "r", shape=(count,)
+            )
+            self.floats = np.memmap(
+                directory / "vectors.f32", np.float32, "r", shape=shape
+            )
+            self.lists = np.fromfile(directory / "lists.i32", np.int32, count)
+            centroids_path = directory / "centroids.npy"
+            if centroids_path.exists():
+                self.centroids = np.load(centroids_path)
+        self._list_index = None
+
+    def list_rows(self, probe: np.ndarray) -> np.ndarray:
+        """Return the rows of the inverted lists in `probe`."""
+        if self._list_index is None:
+            order = np.argsort(self.lists, kind="stable")
+            bounds = np.searchsorted(
+                self.lists[order], np.arange(len(self.centroids) + 1)
+            )
+            self._list_index = (order, bounds)
+        order, bounds = self._list_index
+        return np.concatenate([order[bounds[i] : bounds[i + 1]] for i in probe])
+
+
+class IVFVectorStore(_AppendOnlyStore):
+    """Approximate cosine search over int8-quantized vectors in inverted lists.
+
+    Rows are clustered into `nlist` inverted lists by spherical k-means; a
+    query scans the int8 codes of the `nprobe` closest lists, then re-scores
+    the best `top_k * rescore` candidates against float32 vectors read from
+    a memory map, so only the codes (a quarter of the float size) need to
+    stay in memory. Until `train_min_rows` vectors exist, every row is
+    scanned.
+
+    Files live in `<name>.ivf/<generation>/` and are append-only (see
+    `_AppendOnlyStore`). Training, retraining (after the index grows
+    `retrain_growth`-fold) and `rebuild()` write a new compacted generation.
+    """
+
+    suffix = ".ivf"
+    row_files = ("codes.i8", "scales.f32", "vectors.f32", "lists.i32")
+
+    def __init__(
+        self,
+        directory,
+        name: str = "index",
+        nlist: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        rescore: Optional[int] = None,
+        train_min_rows: Optional[int] = None,
+        retrain_growth: Optional[float] = None,
+    ):
+        super().__init__(directory, name)
+        self.nlist = IVF_NLIST if nlist is None else nlist
+        self.nprobe = max(1, nprobe or IVF_NPROBE)
+        self.rescore = rescore or IVF_RESCORE
+        self.train_min_rows = (
+            IVF_TRAIN_MIN_ROWS if train_min_rows is None else train_min_rows
+        )
+        self.retrain_growth = retrain_growth or IVF_RETRAIN_GROWTH
+        self._reload_if_changed()
+
+    def _load_snapshot(self, log, directory, info):
+        return _IVFSnapshot(log, directory, info["dim"])
+
+    def _first_info(self, dim: int) -> dict:
+        return {"dim": dim, "trained_rows": 0}
+
+    def _append(self, directory, count, log_offset, rows, values):
+        """Append quantized rows after `count` committed rows and log them."""
+        codes, scales = quantize_rows(values)
+        centroids_path = directory / "centroids.npy"
+        if centroids_path.exists():
+            lists = assign_lists(values, np.load(centroids_path))
+        else:
+            lists = np.full(len(values), -1, dtype=np.int32)
+        arrays = {
+            "codes.i8": codes,
+            "scales.f32": scales,
+            "vectors.f32": values,
+            "lists.i32": lists,
+        }
+        return self._append_rows(directory, count, log_offset, rows, arrays)
+
+    def upsert(self, vectors):
+        # Last write wins for ids repeated within one call
+        records = list({record[0]: record for record in vectors}.values())
+        if not records:
+            return
+        values = _normalize_rows(np.asarray([r[1] for r in records], np.float32))
+        with self._lock:
+            snap = self._reload_if_changed()
+            directory = self._current_dir(values.shape[1])
+            rows = [(id_, metadata or {}) for id_, _, metadata in records]
+            self._append(directory, len(snap.ids), self._log.offset, rows, values)
+            snap = self._reload_if_changed()
+            alive = int(snap.alive.sum())
+            trained_rows = self._info["trained_rows"]
+            if (not trained_rows and alive >= self.train_min_rows) or (
+                trained_rows and alive >= trained_rows * self.retrain_growth
+            ):
+                self.rebuild()
+
+    def rebuild(self, nlist: Optional[int] = None) -> None:
+        """Retrain the inverted lists on the live rows and compact the index.
+
+        Deleted and overwritten rows are dropped. Readers switch to the new
+        generation on their next query.
+        """
+        with self._lock:
+            snap = self._reload_if_changed()
+            live = np.flatnonzero(snap.alive)
+            if not len(live):
+                return
+            nlist = nlist or self.nlist or default_nlist(len(live))
+            # k-means on a sample: ~256 rows per list is plenty
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(
+                rng.choice(live, min(len(live), 256 * nlist), replace=False)
+            )
+            centroids = train_centroids(
+                np.asarray(snap.floats[sample_rows], dtype=np.float32), nlist
+            )
+            generation = self._log.generation + 1
+            directory = self._write_generation(
+                generation, {"dim": snap.dimension, "trained_rows": len(live)}
+            )
+            np.save(directory / "centroids.npy", centroids)
+            log_offset = 0
+            for start in range(0, len(live), 65536):
+                block = live[start : start + 65536]
+                log_offset = self._append(
+                    directory,
+                    start,
+                    log_offset,
+                    [(snap.ids[row], snap.metadata(row)) for row in block],
+                    np.asarray(snap.floats[block], dtype=np.float32),
+                )
+            self._switch_generation(generation)
+
+    def query(self, vector, top_k, include_metadata=True, filter=None, nprobe=None):
+        snap = self._reload_if_changed()
+        if not snap.alive.any() or top_k <= 0:
+            return {"matches": []}
+        q = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm:
+            q = q / norm
+        if snap.centroids is not None:
+            probe = top_k_rows(snap.centroids @ q, nprobe or self.nprobe)
+            rows = snap.list_rows(probe)
+        else:
+            rows = np.arange(len(snap.ids))
+        rows = rows[snap.alive[rows]]
+        if filter:
+            rows = rows[snap.filter_mask(filter, rows)]
+        # Approximate scores from the int8 codes, then exact float re-scoring
+        approx = (snap.vectors[rows].astype(np.float32) @ q) * snap.scales[rows]
+        candidates = np.sort(rows[top_k_rows(approx, top_k * self.rescore)])
+        exact = snap.floats[candidates] @ q
+        matches = []
+        for position in top_k_rows(exact, top_k):
+            row = int(candidates[position])
+            match = {"id": snap.ids[row], "score": float(exact[position])}
+            if include_metadata:
+                match["metadata"] = snap.metadata(row)
+            matches.append(match)
+        return {"matches": matches}
+
+
+class PartitionedVectorStore(VectorStore):
+    """A shared index plus one partition per category.
+
+    Every record goes to `shared` and to the partition named after its
+    `field` metadata value (`open_partition(name)` returns that partition's
+    store). Partitions only receive records written after partitioning was
+    enabled, so a query is routed to them once a backfill has been recorded
+    in the JSON file at `backfill_path` (`mark_backfilled`): a query whose
+    filter only selects backfilled `field` values searches those partitions
+    concurrently and merges their top-k lists, so its cost does not grow
+    with the other categories. Every other query, unfiltered ones included,
+    is one call to `shared`. `list_partitions` names the partitions that
+    exist, so deletes reach partitions this process never opened.
+    """
+
+    def __init__(
+        self,
+        shared: VectorStore,
+        open_partition: Callable[[str], VectorStore],
+        list_partitions: Callable[[], Iterable[str]],
+        backfill_path: Optional[Path] = None,
+        field: str = "category",
+        workers: Optional[int] = None,
+    ):
+        self.shared = shared
+        self.field = field
+        self.backfill_path = backfill_path
+        self._open_partition = open_partition
+        self._list_partitions = list_partitions
+        self._partitions: Dict[str, VectorStore] = {}
+        self._backfilled: frozenset = frozenset()
+        self._backfill_stamp: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers or PARTITION_QUERY_WORKERS),
+            thread_name_prefix="partition",
+        )
+
+    def partition(self, name: str) -> VectorStore:
+        with self._lock:
+            if name not in self._partitions:
+                self._partitions[name] = self._open_partition(name)
+            return self._partitions[name]
+
+    def backfilled(self) -> frozenset:
+        """Return the partitions recorded as holding every record of their value.
+
+        The file is re-read only when it has been replaced.
+        """
+        if self.backfill_path is None:
+            return frozenset()
+        try:
+            stat = self.backfill_path.stat()
+        except FileNotFoundError:
+            return frozenset()
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if stamp != self._backfill_stamp:
+                with open(self.backfill_path, encoding="utf-8") as f:
+                    self._backfilled = frozenset(json.load(f))
+                self._backfill_stamp = stamp
+            return self._backfilled
+
+    def mark_backfilled(self, names: Iterable[str]) -> None:
+        """Record that the partitions `names` now hold all of their records."""
+        if self.backfill_path is None:
+            raise ValueError("This partitioned store has no backfill_path")
+        names = sorted(self.backfilled() | set(names))
+        self.backfill_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.backfill_path, lambda f: json.dump(names, f), mode="w")
+
+    def selected_partitions(self, filter: Optional[dict]) -> Optional[List[str]]:
+        """Return the partitions a filter selects, or None to query `shared`."""
+        if not filter or set(filter) != {self.field}:
+            return None
+        condition = filter[self.field]
+        if not isinstance(condition, dict):
+            names = [condition]
+        elif set(condition) == {"$eq"}:
+            names = [condition["$eq"]]
+        elif set(condition) == {"$in"}:
+            names = list(condition["$in"])
+        else:
+            return None
+        if not all(isinstance(n, str) and _PARTITION_NAME.fullmatch(n) for n in names):
+            return None
+        return list(dict.fromkeys(names))
+
+    def upsert(self, vectors):
+        records = list(vectors)
+        self.shared.upsert(records)
+        groups: Dict[str, List[VectorRecord]] = {}
+        for record in records:
+            name = (record[2] or {}).get(self.field)
+            if isinstance(name, str) and _PARTITION_NAME.fullmatch(name):
+                groups.setdefault(name, []).append(record)
+        for name, group in groups.items():
+            self.partition(name).upsert(group)
+
+    def query(self, vector, top_k, include_metadata=True, filter=None, nprobe=None):
+        names = self.selected_partitions(filter)
+        if names is None or not set(names) <= self.backfilled():
+            return self.shared.query(
+                vector=vector,
+                top_k=top_k,
+                include_metadata=include_metadata,
+                filter=filter,
+                nprobe=nprobe,
+            )
+        kwargs = {
+            "vector": vector,
+            "top_k": top_k,
+            "include_metadata": include_metadata,
+            "nprobe": nprobe,
+        }
+        stores = [self.partition(name) for name in names]
+        if len(stores) == 1:
+            return stores[0].query(**kwargs)
+        futures = [self._executor.submit(store.query, **kwargs) for store in stores]
+        rankings = [future.result().get("matches", []) for future in futures]
+        return {"matches": merge_top_k(rankings, top_k)}
+
+    def describe_index_stats(self):
+        return self.shared.describe_index_stats()
+
+    def delete(self, ids):
+        ids = list(ids)
+        self.shared.delete(ids)
+        names = set(self._partitions) | self.backfilled()
+        names.update(self._list_partitions())
+        for name in sorted(names):
+            self.partition(name).delete(ids)
+
+
+def create_vector_store(
+    backend: str,
+    data_dir,
+    index_name: str,
+    connect_pinecone: Callable[[], Any],
+    partitioned: Optional[bool] = None,
+) -> VectorStore:
+    """Build the `VectorStore` selected by `backend` (see `VECTOR_BACKENDS`).
+
+    `connect_pinecone` is only called for the Pinecone backend and must
+    return an `Index` handle. When `partitioned` (default
+    `VECTOR_PARTITIONS`), the store is a `PartitionedVectorStore`: Pinecone
+    keeps the shared index in the default namespace and one namespace per
+    category; local backends keep one index per category under
+    `vectors/<index_name>.partitions/`. Backfilled partitions are recorded
+    in `vectors/<index_name>.backfilled.json` under `data_dir` (with no
+    `data_dir`, filtered queries always use the shared index).
+    """
+    partitioned = VECTOR_PARTITIONS if partitioned is None else partitioned
+    directory = None if data_dir is None else Path(data_dir) / "vectors"
+    backfill_path = None
+    if directory is not None:
+        backfill_path = directory / f"{index_name}.backfilled.json"
+    if backend == "pinecone":
+        index = connect_pinecone()
+        if not partitioned:
+            return PineconeStore(index)
+        return PartitionedVectorStore(
+            PineconeStore(index, namespace=""),
+            lambda name: PineconeStore(index, namespace=name),
+            lambda: [
+                name
+                for name in index.describe_index_stats().get("namespaces") or {}
+                if name
+            ],
+            backfill_path,
+        )
+    if backend in ("local", "ivf"):
+        store_class = LocalVectorStore if backend == "local" else IVFVectorStore
+        shared = store_class(directory, index_name)
+        if not partitioned:
+            return shared
+        partitions = directory / f"{index_name}.partitions"
+        return PartitionedVectorStore(
+            shared,
+            lambda name: store_class(partitions, name),
+            lambda: store_class.list_stores(partitions),
+            backfill_path,
+        )
+    raise ValueError(
+        f"Unknown VECTOR_BACKEND {backend!r}; expected one of {VECTOR_BACKENDS}"
+    )
@@ -4,6 +4,11 @@ set -e
 : "${DATA_DIR:=/data}"
 mkdir -p "$DATA_DIR"
 
+# Keep ingesting in the background when asked to
+if [ "${INGEST_DAEMON:-0}" = "1" ]; then
+  python -m src.ingest_daemon &
+fi
+
 # Start FastAPI backend
 uvicorn src.backend:app --host 0.0.0.0 --port 8000 &
 
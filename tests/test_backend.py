@@ -1,7 +1,15 @@
+import asyncio
 import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
 import pytest
 from fastapi.testclient import TestClient
+from pinecone import ScoredVector
 from src import backend as be
+from src.batching import MicroBatcher
 
 
 @pytest.fixture(autouse=True)
@@ -9,11 +17,14 @@ def patch_backend_imports(mocker):
     # Mock heavy deps before importing app
     mock_model = mocker.MagicMock()
 
-    class _Vec:
+    class _Vecs:
+        def __init__(self, texts):
+            self.texts = texts
+
         def tolist(self):
-            return [0.1, 0.2, 0.3]
+            return [[0.1, 0.2, 0.3] for _ in self.texts]
 
-    mock_model.encode.return_value = _Vec()
+    mock_model.encode.side_effect = lambda texts, **kwargs: _Vecs(texts)
 
     mock_index = mocker.MagicMock()
     mock_index.query.return_value = {
@@ -45,8 +56,24 @@ def patch_backend_imports(mocker):
     mock_pc = mocker.MagicMock()
     mock_pc.Index.return_value = mock_index
 
-    mocker.patch("src.backend.SentenceTransformer", return_value=mock_model)
-    mocker.patch("src.backend.pinecone.Pinecone", return_value=mock_pc)
+    # Imported lazily by the backend, so patch the (conftest-mocked) modules
+    mocker.patch("sentence_transformers.SentenceTransformer", return_value=mock_model)
+    mocker.patch("pinecone.Pinecone", return_value=mock_pc)
+    # Fresh model, index, query-embedding cache and batcher per test
+    mocker.patch.object(be, "_model", None)
+    mocker.patch.object(be, "_index", None)
+    mocker.patch.object(be, "_query_cache", None)
+    mocker.patch.object(be, "_encode_batcher", None)
+    mocker.patch.object(be, "_stats_cache", None)
+    mocker.patch.object(be, "_response_cache", None)
+    mocker.patch.object(be, "_cursor_store", None)
+    mocker.patch.object(be, "_lexical_index", None)
+    mocker.patch.object(be, "_ready", False)
+    mocker.patch.object(be, "_startup_error", None)
+    mocker.patch.object(be, "_startup_phases", {})
+    yield
+    if be._stats_cache is not None:
+        be._stats_cache.stop()
 
 
 def get_client():
@@ -57,10 +84,12 @@ def get_client():
 
 def test_search_basic():
     client = get_client()
+    # Stats are refreshed in the background; load them before asserting
+    be.get_stats_cache().refresh()
     resp = client.post("/search", json={"query": "hello", "top_k": 2})
     assert resp.status_code == 200
     data = resp.json()
-    assert set(data.keys()) == {"results", "metrics"}
+    assert set(data.keys()) == {"results", "metrics", "next_cursor"}
     assert len(data["results"]) == 2
     assert data["metrics"]["top_k"] == 2
     assert data["metrics"]["total_vectors"] == 1234
@@ -116,3 +145,804 @@ def test_search_invalid_body():
     client = get_client()
     resp = client.post("/search", json={})
     assert resp.status_code == 422
+
+
+def test_search_repeated_query_hits_embedding_cache(mocker):
+    client = get_client()
+    model = mocker.MagicMock()
+    model.encode.return_value.tolist.return_value = [[0.1, 0.2, 0.3]]
+    mocker.patch.object(be, "get_model", return_value=model)
+
+    first = client.post("/search", json={"query": "Royal  Wedding"}).json()
+    # Different top_k: misses the response cache, hits the embedding cache
+    second = client.post("/search", json={"query": "royal wedding", "top_k": 3}).json()
+
+    assert model.encode.call_count == 1
+    assert first["metrics"]["embedding_cache_hit"] is False
+    assert second["metrics"]["embedding_cache_hit"] is True
+    assert second["metrics"]["embedding_cache_hits"] == 1
+    assert second["metrics"]["embedding_cache_misses"] == 1
+
+
+def test_get_query_cache_uses_disk_tier_when_enabled(tmp_path, mocker):
+    mocker.patch.object(be, "DATA_DIR", tmp_path)
+    mocker.patch.object(be, "QUERY_CACHE_DISK", True)
+
+    cache = be.get_query_cache()
+    cache.put("q", [1.0])
+
+    assert cache is be.get_query_cache()
+    assert (tmp_path / "query_embeddings.sqlite3").exists()
+    cache.close()
+
+
+def test_disk_tier_reads_run_off_the_event_loop(tmp_path, mocker):
+    import threading
+
+    mocker.patch.object(be, "DATA_DIR", tmp_path)
+    mocker.patch.object(be, "QUERY_CACHE_DISK", True)
+    client = get_client()
+    body = {"query": "royal", "mode": "vector"}
+
+    assert (
+        client.post("/search", json=body).json()["metrics"]["embedding_cache_hit"]
+        is False
+    )
+    cache = be.get_query_cache()
+    cache.flush()
+    cache.memory.clear()
+    be.get_response_cache().clear()
+    threads = []
+    get_many = cache.get_many
+    mocker.patch.object(
+        cache,
+        "get_many",
+        side_effect=lambda texts: (
+            threads.append(threading.current_thread().name) or get_many(texts)
+        ),
+    )
+
+    assert (
+        client.post("/search", json=body).json()["metrics"]["embedding_cache_hit"]
+        is True
+    )
+    assert be.get_model().encode.call_count == 1
+    assert threads and threads[0].startswith("index")
+    cache.close()
+
+
+def test_concurrent_searches_do_not_block_event_loop(mocker):
+    import asyncio
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    import httpx
+
+    # Both encodes must be in flight at once to pass the barrier; if encode ran
+    # on the event loop the first request would time out waiting for the second.
+    barrier = threading.Barrier(2, timeout=5)
+
+    def slow_encode(texts, **kwargs):
+        barrier.wait()
+        return mocker.MagicMock(tolist=lambda: [[0.1, 0.2, 0.3]])
+
+    model = mocker.MagicMock()
+    model.encode.side_effect = slow_encode
+    mocker.patch.object(be, "get_model", return_value=model)
+    # Batches of one so each request needs its own encode
+    batcher = MicroBatcher(
+        be.encode_texts, max_batch_size=1, executor=ThreadPoolExecutor(2)
+    )
+    mocker.patch.object(be, "_encode_batcher", batcher)
+
+    async def run():
+        transport = httpx.ASGITransport(app=be.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await asyncio.gather(
+                c.post("/search", json={"query": "one"}),
+                c.post("/search", json={"query": "two"}),
+            )
+
+    responses = asyncio.run(run())
+    assert [r.status_code for r in responses] == [200, 200]
+    assert model.encode.call_count == 2
+
+
+def test_executors_are_created_once_and_sized(mocker):
+    mocker.patch.object(be, "_encode_executor", None)
+    mocker.patch.object(be, "_index_executor", None)
+    mocker.patch.object(be, "ENCODE_WORKERS", 3)
+    mocker.patch.object(be, "INDEX_WORKERS", 0)
+
+    encode_pool = be.get_encode_executor()
+    index_pool = be.get_index_executor()
+
+    assert encode_pool is be.get_encode_executor()
+    assert index_pool is be.get_index_executor()
+    assert encode_pool._max_workers == 3
+    assert index_pool._max_workers == 1
+    encode_pool.shutdown()
+    index_pool.shutdown()
+
+
+def test_concurrent_queries_are_encoded_in_one_batch(mocker):
+    import asyncio
+
+    import httpx
+
+    model = mocker.MagicMock()
+    model.encode.side_effect = lambda texts, **kwargs: mocker.MagicMock(
+        tolist=lambda: [[float(i)] for i, _ in enumerate(texts)]
+    )
+    mocker.patch.object(be, "get_model", return_value=model)
+    mocker.patch.object(be, "ENCODE_BATCH_WINDOW_MS", 200)
+
+    async def run():
+        transport = httpx.ASGITransport(app=be.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await asyncio.gather(
+                *(c.post("/search", json={"query": f"q{i}"}) for i in range(3))
+            )
+
+    responses = asyncio.run(run())
+    metrics = [r.json()["metrics"] for r in responses]
+
+    assert model.encode.call_count == 1
+    assert sorted(model.encode.call_args.args[0]) == ["q0", "q1", "q2"]
+    assert [m["encode_batch_size"] for m in metrics] == [3, 3, 3]
+    assert all(m["encode_queue_wait_ms"] >= 0 for m in metrics)
+
+
+def test_search_does_not_wait_on_stats_call(mocker):
+    import threading
+
+    release = threading.Event()
+    idx = mocker.MagicMock()
+    idx.query.return_value = {"matches": []}
+    idx.describe_index_stats.side_effect = lambda: release.wait(5) and {}
+    mocker.patch.object(be, "get_index", return_value=idx)
+
+    client = get_client()
+    resp = client.post("/search", json={"query": "fast"})
+    release.set()
+
+    assert resp.status_code == 200
+    assert resp.json()["metrics"]["total_vectors"] == 0
+
+
+def test_stats_cache_is_created_once_and_tracks_generation(tmp_path, mocker):
+    from src.index_state import bump_index_generation
+
+    mocker.patch.object(be, "DATA_DIR", tmp_path)
+    cache = be.get_stats_cache()
+    assert cache is be.get_stats_cache()
+
+    bump_index_generation(tmp_path)
+    cache.refresh()
+    assert cache.generation == 1
+
+
+def test_search_with_local_vector_backend(tmp_path, mocker):
+    from src.vector_store import LocalVectorStore
+
+    mocker.patch.object(be, "_index", None)
+    mocker.patch.object(be, "VECTOR_BACKEND", "local")
+    mocker.patch.object(be, "DATA_DIR", tmp_path)
+    LocalVectorStore(tmp_path / "vectors", be.INDEX_NAME).upsert(
+        [
+            ("http://x/1", [0.1, 0.2, 0.3], {"title": "One", "category": "catA"}),
+            ("http://x/2", [0.3, 0.2, 0.1], {"title": "Two", "category": "catB"}),
+        ]
+    )
+
+    client = get_client()
+    resp = client.post(
+        "/search", json={"query": "local", "top_k": 5, "categories": ["catA"]}
+    )
+
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["url"] for r in results] == ["http://x/1"]
+    assert results[0]["summary"] == ""
+    assert results[0]["score"] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_search_with_ivf_backend_and_per_request_nprobe(tmp_path, mocker):
+    from src.vector_store import IVFVectorStore
+
+    mocker.patch.object(be, "VECTOR_BACKEND", "ivf")
+    mocker.patch.object(be, "DATA_DIR", tmp_path)
+    IVFVectorStore(tmp_path / "vectors", be.INDEX_NAME).upsert(
+        [
+            ("http://x/1", [0.1, 0.2, 0.3], {"title": "One"}),
+            ("http://x/2", [0.3, 0.2, 0.1], {"title": "Two"}),
+        ]
+    )
+    query_spy = mocker.spy(IVFVectorStore, "query")
+    client = get_client()
+
+    first = client.post("/search", json={"query": "ivf", "nprobe": 2})
+    second = client.post("/search", json={"query": "ivf", "nprobe": 3})
+
+    assert [r["title"] for r in first.json()["results"]] == ["One", "Two"]
+    # nprobe is part of the response-cache key
+    assert second.headers["X-Cache"] == "MISS"
+    assert [c.kwargs["nprobe"] for c in query_spy.call_args_list] == [2, 3]
+    bad = client.post("/search", json={"query": "ivf", "nprobe": 0})
+    assert bad.status_code == 422
+
+
+def test_search_batch_encodes_once_and_queries_each(mocker):
+    client = get_client()
+    model = mocker.MagicMock()
+    model.encode.side_effect = lambda texts, **kwargs: mocker.MagicMock(
+        tolist=lambda: [[float(i), 1.0] for i, _ in enumerate(texts)]
+    )
+    mocker.patch.object(be, "get_model", return_value=model)
+    # Warm the cache for one query so only the others reach the model
+    be.get_query_cache().put("cached", [9.0, 9.0])
+    idx = mocker.MagicMock()
+    idx.query.return_value = {"matches": []}
+    mocker.patch.object(be, "get_index", return_value=idx)
+
+    resp = client.post(
+        "/search/batch",
+        json={
+            "queries": [
+                {"query": "Royal wedding", "top_k": 3},
+                {"query": "cached", "categories": ["catA"]},
+                {"query": "royal  WEDDING"},
+                {"query": "tv host"},
+            ]
+        },
+    )
+
+    assert resp.status_code == 200
+    data = resp.json()
+    model.encode.assert_called_once()
+    assert model.encode.call_args.args[0] == ["Royal wedding", "tv host"]
+    assert idx.query.call_count == 4
+    vectors = [c.kwargs["vector"] for c in idx.query.call_args_list]
+    assert sorted(vectors) == [[0.0, 1.0], [0.0, 1.0], [1.0, 1.0], [9.0, 9.0]]
+    metrics = [r["metrics"] for r in data["responses"]]
+    assert [m["top_k"] for m in metrics] == [3, 5, 5, 5]
+    assert [m["filtered"] for m in metrics] == [False, True, False, False]
+    assert [m["embedding_cache_hit"] for m in metrics] == [False, True, False, False]
+    assert all(m["elapsed_ms"] <= data["metrics"]["elapsed_ms"] for m in metrics)
+    assert data["metrics"]["count"] == 4
+    assert data["metrics"]["encoded"] == 2
+
+
+def test_search_batch_all_cached_skips_model(mocker):
+    client = get_client()
+    model = mocker.MagicMock()
+    mocker.patch.object(be, "get_model", return_value=model)
+    be.get_query_cache().put("a", [0.1, 0.2, 0.3])
+
+    resp = client.post("/search/batch", json={"queries": [{"query": "a"}]})
+
+    assert resp.status_code == 200
+    assert resp.json()["metrics"]["encoded"] == 0
+    model.encode.assert_not_called()
+
+
+def test_search_batch_rejects_oversized_batches(mocker):
+    mocker.patch.object(be, "SEARCH_BATCH_MAX_QUERIES", 2)
+    client = get_client()
+    resp = client.post(
+        "/search/batch", json={"queries": [{"query": str(i)} for i in range(3)]}
+    )
+    assert resp.status_code == 422
+
+
+def test_search_batch_rejects_pagination(mocker):
+    client = get_client()
+    resp = client.post(
+        "/search/batch",
+        json={"queries": [{"query": "a"}, {"query": "b", "page_size": 1}]},
+    )
+    assert resp.status_code == 422
+    assert "page_size" in resp.json()["detail"]
+    be.get_model().encode.assert_not_called()
+
+
+def test_repeated_search_served_from_response_cache(mocker):
+    client = get_client()
+    idx = mocker.MagicMock()
+    idx.query.return_value = {"matches": []}
+    mocker.patch.object(be, "get_index", return_value=idx)
+    body = {"query": "Royal wedding", "categories": ["b", "a"]}
+
+    first = client.post("/search", json=body)
+    second = client.post(
+        "/search", json={"query": "royal  wedding", "categories": ["a", "b", "a"]}
+    )
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert first.json()["metrics"]["response_cache_hit"] is False
+    assert second.json()["metrics"]["response_cache_hit"] is True
+    assert second.json()["results"] == first.json()["results"]
+    assert idx.query.call_count == 1
+
+
+def test_response_cache_invalidated_by_index_generation(tmp_path, mocker):
+    from src.index_state import bump_index_generation
+
+    mocker.patch.object(be, "DATA_DIR", tmp_path)
+    client = get_client()
+
+    assert client.post("/search", json={"query": "q"}).headers["X-Cache"] == "MISS"
+    assert client.post("/search", json={"query": "q"}).headers["X-Cache"] == "HIT"
+    bump_index_generation(tmp_path)
+    assert client.post("/search", json={"query": "q"}).headers["X-Cache"] == "MISS"
+
+
+def test_search_batch_uses_response_cache(mocker):
+    client = get_client()
+    idx = mocker.MagicMock()
+    idx.query.return_value = {"matches": []}
+    mocker.patch.object(be, "get_index", return_value=idx)
+    client.post("/search", json={"query": "warm"})
+
+    resp = client.post(
+        "/search/batch", json={"queries": [{"query": "warm"}, {"query": "cold"}]}
+    )
+
+    hits = [r["metrics"]["response_cache_hit"] for r in resp.json()["responses"]]
+    assert hits == [True, False]
+    assert idx.query.call_count == 2
+    again = client.post("/search/batch", json={"queries": [{"query": "cold"}]})
+    assert again.json()["responses"][0]["metrics"]["response_cache_hit"] is True
+    assert idx.query.call_count == 2
+
+
+def test_search_reports_stage_timings(mocker):
+    client = get_client()
+    before = be.SEARCH_STAGE_DURATION.count(stage="query")
+
+    first = client.post("/search", json={"query": "stages"}).json()["metrics"]
+    second = client.post("/search", json={"query": "stages"}).json()["metrics"]
+
+    stages = ("encode_ms", "query_ms", "stats_ms", "build_ms")
+    assert all(first[stage] >= 0 for stage in stages)
+    assert first["elapsed_ms"] >= int(first["encode_ms"] + first["query_ms"])
+    # A response-cache hit runs none of the stages
+    assert second["response_cache_hit"] is True
+    assert [second[stage] for stage in stages] == [0.0, 0.0, 0.0, 0.0]
+    assert be.SEARCH_STAGE_DURATION.count(stage="query") == before + 1
+
+
+def test_metrics_endpoint_exposes_server_and_ingest_metrics(tmp_path, mocker):
+    mocker.patch.object(be, "DATA_DIR", tmp_path)
+    mocker.patch.object(be, "WARMUP_ON_STARTUP", False)
+    (tmp_path / "ingest_metrics.prom").write_text(
+        'gossip_ingest_articles_total{stage="upserted"} 3.0\n'
+    )
+    search_ok = {"route": "/search", "method": "POST", "status": "200"}
+    before = be.HTTP_REQUESTS.value(**search_ok)
+    with TestClient(be.app) as client:
+        # Nothing created yet: cache and index samples are simply absent
+        idle = client.get("/metrics").text
+        assert "gossip_embedding_cache_requests_total{" not in idle
+        assert "\ngossip_index_vectors " not in idle
+
+        client.post("/search", json={"query": "scrape me"})
+        client.post("/search", json={"query": "scrape me"})
+        be.get_stats_cache().refresh()
+        resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    text = resp.text
+    assert be.HTTP_REQUESTS.value(**search_ok) == before + 2
+    assert (
+        'gossip_http_requests_total{route="/search",method="POST",status="200"}' in text
+    )
+    assert 'gossip_http_request_duration_seconds_count{route="/metrics"}' in text
+    assert 'gossip_embedding_cache_requests_total{result="miss"} 1' in text
+    assert 'gossip_response_cache_requests_total{result="hit"} 1' in text
+    assert "gossip_index_vectors 1234.0" in text
+    assert "gossip_http_requests_in_flight 1.0" in text
+    assert 'gossip_search_stage_duration_seconds_count{stage="encode"}' in text
+    assert text.endswith('gossip_ingest_articles_total{stage="upserted"} 3.0\n')
+
+
+def test_search_stream_ndjson_sends_results_then_metrics():
+    client = get_client()
+    plain = client.post("/search", json={"query": "plain", "top_k": 2}).json()
+
+    resp = client.post("/search/stream", json={"query": "streamed", "top_k": 2})
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    assert resp.headers["X-Cache"] == "MISS"
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["type"] for r in records] == ["result", "result", "metrics"]
+    assert [r["data"] for r in records[:2]] == plain["results"]
+    trailer = records[-1]["data"]
+    assert trailer["top_k"] == 2
+    assert trailer["response_cache_hit"] is False
+    assert trailer["build_ms"] >= 0
+
+
+def test_search_stream_sse_format(mocker):
+    client = get_client()
+    idx = mocker.MagicMock()
+    idx.query.return_value = {"matches": []}
+    mocker.patch.object(be, "get_index", return_value=idx)
+
+    resp = client.post(
+        "/search/stream?format=sse", json={"query": "sse", "categories": ["a"]}
+    )
+
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    event, data, blank = resp.text.split("\n")[:3]
+    assert event == "event: metrics"
+    assert json.loads(data.removeprefix("data: "))["filtered"] is True
+    assert blank == ""
+
+
+def test_search_stream_replays_cached_response():
+    client = get_client()
+    first = client.post("/search", json={"query": "replay"}).json()
+
+    resp = client.post("/search/stream", json={"query": "replay"})
+
+    assert resp.headers["X-Cache"] == "HIT"
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["data"] for r in records[:-1]] == first["results"]
+    assert records[-1]["data"]["response_cache_hit"] is True
+
+
+def test_search_stream_rejects_unknown_format():
+    resp = get_client().post("/search/stream?format=xml", json={"query": "q"})
+    assert resp.status_code == 422
+
+
+def test_warm_up_loads_model_and_index_then_reports_ready(capsys):
+    client = get_client()
+    assert client.get("/readyz").status_code == 503
+
+    asyncio.run(be.warm_up())
+
+    resp = client.get("/readyz")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["ready"] is True
+    assert set(body["phases_ms"]) == {"model", "index", "encode", "total"}
+    be.get_model().encode.assert_called_with([be.WARMUP_QUERY], convert_to_tensor=True)
+    be.get_index().index.describe_index_stats.assert_called()
+    assert be.STARTUP_PHASE_DURATION.value(phase="total") >= 0
+    assert "Warm-up finished: model" in capsys.readouterr().out
+    assert client.get("/healthz").json() == {"status": "ok"}
+
+
+def test_warm_up_failure_keeps_app_unready_and_unhealthy(mocker):
+    mocker.patch.object(be, "get_index", side_effect=RuntimeError("no index"))
+    client = get_client()
+
+    asyncio.run(be.warm_up())
+
+    ready = client.get("/readyz")
+    assert ready.status_code == 503
+    assert ready.json()["error"] == "index: no index"
+    assert ready.json()["phases_ms"].keys() == {"model"}
+    health = client.get("/healthz")
+    assert health.status_code == 503
+    assert health.json()["error"] == "index: no index"
+
+
+def test_lifespan_warms_up_in_background_and_stops_stats_thread():
+    with TestClient(be.app) as client:
+        assert client.get("/healthz").status_code == 200
+        deadline = time.monotonic() + 5
+        while client.get("/readyz").status_code != 200:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        stats = be._stats_cache
+    assert stats._thread is None
+
+
+def test_lifespan_without_warm_up_is_ready_immediately(mocker):
+    mocker.patch.object(be, "WARMUP_ON_STARTUP", False)
+    with TestClient(be.app) as client:
+        assert client.get("/readyz").json()["phases_ms"] == {}
+    # Nothing was loaded eagerly
+    assert be._model is None and be._stats_cache is None
+
+
+def test_import_does_not_load_heavy_dependencies():
+    code = (
+        "import sys, src.backend; "
+        "print('sentence_transformers' in sys.modules, 'pinecone' in sys.modules)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.split() == ["False", "False"]
+
+
+@pytest.fixture
+def lexical_index(tmp_path, mocker):
+    """A small lexical index under a scratch DATA_DIR."""
+    from src.lexical_index import LexicalIndex
+
+    mocker.patch.object(be, "DATA_DIR", tmp_path)
+    index = LexicalIndex(tmp_path / "lexical", be.INDEX_NAME)
+    index.upsert(
+        [
+            (
+                f"http://example.com/{i}",
+                {
+                    "title": title,
+                    "summary": "Les dernières nouvelles",
+                    "category": "people" if i % 2 else "tv",
+                    "published": "2025-01-01",
+                },
+            )
+            for i, title in enumerate(
+                ["Kylian Mbappé signe", "Title B"]
+                + [f"Émission {n}" for n in range(30)]
+            )
+        ]
+    )
+    # The vector index holds the same 32 articles
+    mocker.patch.object(
+        be.get_index(), "describe_index_stats", return_value={"total_vector_count": 32}
+    )
+    be.get_stats_cache().refresh()
+    return index
+
+
+def test_auto_mode_answers_confident_keyword_queries_lexically(lexical_index, mocker):
+    mocker.patch.object(be, "SEARCH_MODE", "auto")
+    client = get_client()
+    served = {p: be.SEARCH_SERVED.value(path=p) for p in ("lexical", "vector")}
+
+    resp = client.post("/search", json={"query": "kylian mbappe", "top_k": 3})
+
+    data = resp.json()
+    assert data["results"][0]["url"] == "http://example.com/0"
+    assert data["results"][0]["title"] == "Kylian Mbappé signe"
+    assert data["metrics"]["served_by"] == "lexical"
+    assert data["metrics"]["encode_ms"] == 0
+    be.get_model().encode.assert_not_called()
+    be.get_index().index.query.assert_not_called()
+
+    # "emission" is in most documents: not confident, so the vector path runs
+    resp = client.post("/search", json={"query": "emission", "top_k": 3})
+    assert resp.json()["metrics"]["served_by"] == "vector"
+    assert be.get_index().index.query.called
+    assert be.SEARCH_SERVED.value(path="lexical") == served["lexical"] + 1
+    assert be.SEARCH_SERVED.value(path="vector") == served["vector"] + 1
+
+    # Replays are counted as served from the cache
+    cached = be.SEARCH_SERVED.value(path="cache")
+    resp = client.post("/search", json={"query": "kylian mbappe", "top_k": 3})
+    assert resp.json()["metrics"]["served_by"] == "lexical"
+    assert be.SEARCH_SERVED.value(path="cache") == cached + 1
+
+
+def test_auto_mode_skips_bm25_for_long_queries_and_partial_indexes(
+    lexical_index, mocker
+):
+    client = get_client()
+    search = mocker.spy(lexical_index, "search")
+    mocker.patch.object(be, "_lexical_index", lexical_index)
+
+    # Vector search unless a request asks for "auto"
+    resp = client.post("/search", json={"query": "kylian mbappe"})
+    assert resp.json()["metrics"]["served_by"] == "vector"
+    search.assert_not_called()
+
+    # More terms than a confident query may have: no BM25 pass at all
+    body = {"query": "kylian mbappe signe au real madrid", "mode": "auto"}
+    assert client.post("/search", json=body).json()["metrics"]["served_by"] == (
+        "vector"
+    )
+    search.assert_not_called()
+
+    # The lexical index only holds part of the archive (32 of 1234)
+    be.get_index().describe_index_stats.return_value = {"total_vector_count": 1234}
+    be.get_stats_cache().refresh()
+    body = {"query": "kylian", "mode": "auto"}
+    assert client.post("/search", json=body).json()["metrics"]["served_by"] == (
+        "vector"
+    )
+    search.assert_not_called()
+
+    # Stats not loaded yet
+    be.get_stats_cache().refreshed_at = None
+    body = {"query": "mbappe", "mode": "auto"}
+    assert client.post("/search", json=body).json()["metrics"]["served_by"] == (
+        "vector"
+    )
+    search.assert_not_called()
+
+
+def test_lexical_index_reloads_off_the_event_loop(lexical_index, mocker):
+    import threading
+
+    mocker.patch.object(be, "_lexical_index", lexical_index)
+    threads = []
+    reload = lexical_index._reload_if_changed
+
+    def spy_reload():
+        threads.append(threading.current_thread().name)
+        return reload()
+
+    mocker.patch.object(lexical_index, "_reload_if_changed", spy_reload)
+    client = get_client()
+
+    for mode in ("auto", "lexical"):
+        body = {"query": "kylian", "mode": mode}
+        assert client.post("/search", json=body).json()["metrics"]["served_by"] == (
+            "lexical"
+        )
+    assert threads and all(name.startswith("index") for name in threads)
+
+
+def test_lexical_and_vector_modes_are_forced_per_request(lexical_index, mocker):
+    client = get_client()
+
+    resp = client.post(
+        "/search",
+        json={"query": "emission", "mode": "lexical", "categories": ["tv"]},
+    )
+    data = resp.json()
+    assert data["metrics"]["served_by"] == "lexical"
+    assert len(data["results"]) == 5
+    assert {r["category"] for r in data["results"]} == {"tv"}
+    be.get_model().encode.assert_not_called()
+
+    resp = client.post("/search", json={"query": "kylian", "mode": "vector"})
+    assert resp.json()["metrics"]["served_by"] == "vector"
+    assert resp.json()["results"][0]["url"] == "http://example.com/a"
+
+
+def test_hybrid_mode_fuses_vector_and_lexical_candidates(lexical_index, mocker):
+    mocker.patch.object(be, "HYBRID_CANDIDATES", 10)
+    client = get_client()
+
+    resp = client.post(
+        "/search", json={"query": "Kylian Mbappé", "mode": "hybrid", "top_k": 3}
+    )
+
+    data = resp.json()
+    assert data["metrics"]["served_by"] == "hybrid"
+    urls = [r["url"] for r in data["results"]]
+    assert len(urls) == 3
+    assert set(urls) >= {"http://example.com/0", "http://example.com/a"}
+    # Fused scores: one list at rank 1 beats one list at rank 2
+    assert data["results"][0]["score"] == pytest.approx(1 / 61)
+    assert be.get_index().index.query.call_args.kwargs["top_k"] == 10
+
+
+def test_hybrid_mode_fuses_pinecone_scored_vectors(lexical_index, mocker):
+    # The Pinecone client returns `ScoredVector`s, which are not mappings
+    be.get_index().index.query.return_value = {
+        "matches": [
+            ScoredVector(
+                id="http://example.com/a",
+                score=0.9,
+                metadata={"title": "Title A", "summary": "S", "category": "tv"},
+            )
+        ]
+    }
+    client = get_client()
+
+    resp = client.post("/search", json={"query": "Kylian", "mode": "hybrid"})
+
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["url"] for r in results] == [
+        "http://example.com/a",
+        "http://example.com/0",
+    ]
+    assert results[0]["title"] == "Title A"
+
+
+def test_stream_and_batch_skip_encoding_for_lexical_answers(lexical_index, mocker):
+    mocker.patch.object(be, "SEARCH_MODE", "auto")
+    client = get_client()
+
+    resp = client.post("/search/stream", json={"query": "kylian"})
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert records[0]["data"]["url"] == "http://example.com/0"
+    assert records[-1]["data"]["served_by"] == "lexical"
+
+    resp = client.post(
+        "/search/batch",
+        json={"queries": [{"query": "mbappe"}, {"query": "tv host"}]},
+    )
+    data = resp.json()
+    assert [r["metrics"]["served_by"] for r in data["responses"]] == [
+        "lexical",
+        "vector",
+    ]
+    assert be.get_model().encode.call_args.args[0] == ["tv host"]
+    # Both answers were cached
+    resp = client.post("/search", json={"query": "mbappe"})
+    assert resp.headers["X-Cache"] == "HIT"
+
+
+def test_cursor_pagination_slices_cached_candidates(mocker):
+    mocker.patch.object(be, "PAGINATION_CANDIDATES", 50)
+    client = get_client()
+    body = {"query": "royal", "mode": "vector", "page_size": 1}
+
+    first = client.post("/search", json=body).json()
+    assert [r["url"] for r in first["results"]] == ["http://example.com/a"]
+    assert first["metrics"]["top_k"] == 1
+    index = be.get_index().index
+    assert index.query.call_args.kwargs["top_k"] == 50
+
+    resp = client.get("/search/page", params={"cursor": first["next_cursor"]})
+    assert resp.status_code == 200
+    second = resp.json()
+    assert [r["url"] for r in second["results"]] == ["http://example.com/b"]
+    assert second["next_cursor"] is None
+    assert second["metrics"]["served_by"] == "cursor"
+    assert second["metrics"]["encode_ms"] == 0
+    # Later pages neither encode nor query
+    assert be.get_model().encode.call_count == 1
+    assert index.query.call_count == 1
+    assert "gossip_cursor_results 2" in client.get("/metrics").text
+
+    gone = client.get("/search/page", params={"cursor": "unknown.1"})
+    assert gone.status_code == 410
+    single = client.post("/search", json={**body, "page_size": 5}).json()
+    assert len(single["results"]) == 2 and single["next_cursor"] is None
+
+
+def test_search_projects_fields_and_truncates_summaries():
+    client = get_client()
+    sized = be.SEARCH_RESPONSE_BYTES.count(route="/search")
+
+    resp = client.post(
+        "/search", json={"query": "royal", "mode": "vector", "fields": ["url", "score"]}
+    )
+    assert resp.headers["content-type"] == "application/json"
+    assert resp.json()["results"] == [
+        {"url": "http://example.com/a", "score": 0.9},
+        {"url": "http://example.com/b", "score": 0.8},
+    ]
+
+    # Projection is applied to cached responses and streamed records too
+    resp = client.post(
+        "/search", json={"query": "royal", "mode": "vector", "summary_chars": 7}
+    )
+    assert resp.headers["X-Cache"] == "HIT"
+    assert resp.json()["results"][0]["summary"] == "Summary…"
+    assert resp.json()["results"][0]["title"] == "Title A"
+    stream = client.post(
+        "/search/stream",
+        json={"query": "royal", "mode": "vector", "fields": ["title"]},
+    )
+    records = [json.loads(line) for line in stream.text.splitlines()]
+    assert records[0]["data"] == {"title": "Title A"}
+
+    assert be.SEARCH_RESPONSE_BYTES.count(route="/search") == sized + 2
+
+    # Each batch item is trimmed to its own fields
+    batch = client.post(
+        "/search/batch",
+        json={
+            "queries": [
+                {"query": "royal", "mode": "vector", "fields": ["url"]},
+                {"query": "royal", "mode": "vector", "summary_chars": 7},
+            ]
+        },
+    ).json()
+    assert batch["responses"][0]["results"][0] == {"url": "http://example.com/a"}
+    assert batch["responses"][1]["results"][0]["summary"] == "Summary…"
+    assert batch["metrics"]["count"] == 2
+    text = client.get("/metrics").text
+    assert 'gossip_search_response_bytes_count{route="/search/batch"}' in text
+    assert 'gossip_search_response_bytes_count{route="/search/stream"}' in text
+    assert 'gossip_search_stage_duration_seconds_count{stage="serialize"}' in text
@@ -0,0 +1,104 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.batching import MicroBatcher
+
+
+def test_items_within_window_share_one_batch():
+    calls = []
+
+    def double(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_batch_size=8, window_ms=200)
+    futures = [batcher.submit(i) for i in range(3)]
+    results = [f.result(timeout=5) for f in futures]
+    batcher.close()
+
+    assert calls == [[0, 1, 2]]
+    assert [r.value for r in results] == [0, 2, 4]
+    assert {r.batch_size for r in results} == {3}
+    assert all(r.queue_wait_ms >= 0 for r in results)
+
+
+def test_max_batch_size_splits_batches_and_executor_runs_them():
+    calls = []
+    release = threading.Event()
+
+    def echo(items):
+        release.wait(timeout=5)
+        calls.append(list(items))
+        return items
+
+    batcher = MicroBatcher(
+        echo, max_batch_size=2, window_ms=200, executor=ThreadPoolExecutor(2)
+    )
+    futures = [batcher.submit(i) for i in range(4)]
+    release.set()
+    results = [f.result(timeout=5) for f in futures]
+    batcher.close()
+
+    assert sorted(calls) == [[0, 1], [2, 3]]
+    assert [r.value for r in results] == [0, 1, 2, 3]
+
+
+def test_zero_window_drains_only_what_is_queued():
+    batcher = MicroBatcher(lambda items: items, window_ms=0)
+    assert batcher.submit("a").result(timeout=5).value == "a"
+    batcher.close()
+
+
+def test_errors_propagate_to_every_caller():
+    def boom(items):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(boom, window_ms=50)
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model failed"):
+            future.result(timeout=5)
+    batcher.close()
+
+
+def test_output_count_mismatch_is_an_error():
+    batcher = MicroBatcher(lambda items: [], window_ms=0)
+    with pytest.raises(ValueError, match="0 outputs for 1 inputs"):
+        batcher.submit("x").result(timeout=5)
+    batcher.close()
+
+
+def test_close_flushes_pending_batch_and_is_idempotent():
+    batcher = MicroBatcher(lambda items: items, window_ms=10_000)
+    future = batcher.submit("pending")
+    batcher.close()
+    batcher.close()
+
+    assert future.result(timeout=5).value == "pending"
+
+
+@pytest.mark.parametrize("with_executor", [False, True])
+def test_cancelled_items_are_skipped_without_breaking_the_batch(with_executor):
+    calls = []
+
+    def echo(items):
+        calls.append(list(items))
+        return items
+
+    executor = ThreadPoolExecutor(1) if with_executor else None
+    batcher = MicroBatcher(echo, window_ms=200, executor=executor)
+    cancelled = batcher.submit("gone")
+    kept = [batcher.submit("a"), batcher.submit("b")]
+    assert cancelled.cancel()
+
+    assert [f.result(timeout=5).value for f in kept] == ["a", "b"]
+    assert kept[0].result().batch_size == 2
+    # A batch whose callers all left is not run; the collector keeps going
+    batcher.submit("late").cancel()
+    batcher.close()
+    assert batcher.submit("next").result(timeout=5).value == "next"
+    batcher.close()
+
+    assert calls == [["a", "b"], ["next"]]
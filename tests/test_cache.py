@@ -0,0 +1,162 @@
+import sqlite3
+import time
+
+from src.cache import CursorStore, QueryEmbeddingCache, TTLCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query_casefolds_and_collapses_whitespace():
+    assert normalize_query("  Royal\tWEDDING  ") == "royal wedding"
+    assert normalize_query("ﬁancée") == normalize_query("FIANCÉE")
+
+
+def test_ttl_cache_lru_eviction_and_counters():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recent
+    cache.set("c", 3)  # evicts "b"
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=4, ttl=10, clock=clock)
+    cache.set("a", 1)
+    clock.now = 9
+    assert cache.get("a") == 1
+    clock.now = 11
+    assert cache.get("a", "gone") == "gone"
+    assert len(cache) == 0
+
+
+def test_ttl_cache_zero_size_and_clear():
+    disabled = TTLCache(maxsize=0)
+    disabled.set("a", 1)
+    assert disabled.get("a") is None
+
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_query_embedding_cache_memory_only():
+    cache = QueryEmbeddingCache("m", maxsize=8)
+    assert cache.get("Hello") is None
+    cache.put("Hello", [0.5, 0.25])
+    assert cache.get(" hello ") == [0.5, 0.25]
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_query_embedding_cache_disk_tier_survives_restart(tmp_path):
+    path = tmp_path / "sub" / "q.sqlite3"
+    first = QueryEmbeddingCache("m", disk_path=path)
+    first.put("royal wedding", [0.5, 0.25])
+    first.close()
+
+    second = QueryEmbeddingCache("m", disk_path=path)
+    assert second.get("Royal Wedding") == [0.5, 0.25]
+    # Promoted to memory: a second lookup does not need the disk tier
+    second._db.close()
+    second._db = None
+    assert second.get("royal wedding") == [0.5, 0.25]
+    assert second.hits == 2
+
+    other_model = QueryEmbeddingCache("other", disk_path=path)
+    assert other_model.get("royal wedding") is None
+    other_model.close()
+
+
+def test_query_embedding_cache_writes_disk_tier_in_the_background(tmp_path, mocker):
+    path = tmp_path / "q.sqlite3"
+    cache = QueryEmbeddingCache("m", disk_path=path)
+    assert cache.has_disk_tier
+    assert not QueryEmbeddingCache("m").has_disk_tier
+
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.flush()
+    count = cache._db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()
+    assert count == (2,)
+    assert cache.get_from_memory("A") == [1.0]
+    assert cache.get_from_memory("c") is None
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert cache.get_many(["b", "c"]) == [[2.0], None]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # A failed write only loses persistence
+    db = cache._db
+    cache._db = mocker.MagicMock(wraps=db)
+    cache._db.executemany.side_effect = sqlite3.OperationalError("disk full")
+    cache.put("d", [3.0])
+    cache.flush()
+    assert cache.get("d") == [3.0]
+    cache._db = db
+    cache.close()
+    cache.close()
+
+
+def test_query_embedding_cache_disk_tier_honours_ttl(tmp_path, mocker):
+    path = tmp_path / "q.sqlite3"
+    cache = QueryEmbeddingCache("m", ttl=60, disk_path=path)
+    cache.put("old", [1.0])
+    cache.memory.clear()
+
+    mocker.patch("src.cache.time.time", return_value=time.time() + 120)
+    assert cache.get("old") is None
+    cache.close()
+
+    # Expired rows are pruned when the disk tier is reopened
+    reopened = QueryEmbeddingCache("m", ttl=60, disk_path=path)
+    count = reopened._db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()
+    assert count == (0,)
+    reopened.close()
+
+
+def test_cursor_store_pages_through_items():
+    store = CursorStore(max_items=100, ttl=60)
+    page, cursor = store.create(list(range(5)), 2, context="ctx")
+    assert page == [0, 1]
+    entry_id = cursor.rpartition(".")[0]
+
+    pages = []
+    while cursor is not None:
+        items, cursor, context = store.page(cursor)
+        pages.append(items)
+    assert pages == [[2, 3], [4]]
+    assert context == "ctx"
+    assert store.create([1, 2], 2) == ([1, 2], None)
+    assert len(store) == 1 and store.items == 5
+    assert store.page("nope") is None
+    assert store.page(f"{entry_id}.x") is None
+
+
+def test_cursor_store_expires_and_bounds_memory():
+    clock = FakeClock()
+    store = CursorStore(max_items=6, ttl=10, clock=clock)
+    _, old = store.create(list(range(4)), 1)
+    clock.now = 5
+    _, new = store.create(list(range(4)), 1)
+
+    # Over the item budget: the oldest list is evicted
+    assert store.page(old) is None
+    assert store.page(new)[0] == [1]
+    clock.now = 16
+    assert store.page(new) is None
+    assert store.items == 0
+
+    _, _ = store.create(list(range(10)), 2)
+    assert store.items == 6
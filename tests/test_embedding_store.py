@@ -0,0 +1,76 @@
+import pytest
+
+from src.embedding_store import EmbeddingStore, content_key
+
+
+def test_content_key_depends_on_model_and_text():
+    assert content_key("m", "a b") == content_key("m", "a b")
+    assert content_key("m", "a b") != content_key("other", "a b")
+    assert content_key("m", "a b") != content_key("m", "a c")
+    assert len(content_key("m", "")) == 16
+
+
+def test_put_and_get_round_trip_across_reopen(tmp_path):
+    with EmbeddingStore(tmp_path, "m") as store:
+        assert store.get_many(["a"]) == [None]
+        store.put_many(["a", "b", "a"], [[1, 0], [0, 1], [9, 9]])
+        assert len(store) == 2
+        assert store.get_many(["b", "x", "a"]) == [[0.0, 1.0], None, [1.0, 0.0]]
+        # Known texts are not appended again
+        store.put_many(["a"], [[5, 5]])
+        store.put_many(["c"], [[2, 2]])
+        assert store.get_many(["a", "c"]) == [[1.0, 0.0], [2.0, 2.0]]
+
+    with EmbeddingStore(tmp_path, "m") as store:
+        assert store.dim == 2
+        assert store.get_many(["c", "b"]) == [[2.0, 2.0], [0.0, 1.0]]
+    assert (tmp_path / "vectors.f32").stat().st_size == 3 * 2 * 4
+    # Another model shares the file but not the vectors
+    with EmbeddingStore(tmp_path, "other") as store:
+        assert store.get_many(["a"]) == [None]
+
+
+def test_put_rejects_dimension_mismatch(tmp_path):
+    with EmbeddingStore(tmp_path, "m") as store:
+        store.put_many(["a"], [[1, 2, 3]])
+        with pytest.raises(ValueError):
+            store.put_many(["b"], [[1, 2]])
+
+
+def test_uncommitted_rows_are_truncated_on_next_write(tmp_path):
+    with EmbeddingStore(tmp_path, "m") as store:
+        store.put_many(["a"], [[1, 1]])
+    # A crash after appending rows but before committing their keys
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        f.write(b"\xff" * 12)
+
+    with EmbeddingStore(tmp_path, "m") as store:
+        store.put_many(["b"], [[2, 2]])
+        assert store.get_many(["a", "b"]) == [[1.0, 1.0], [2.0, 2.0]]
+    assert (tmp_path / "vectors.f32").stat().st_size == 2 * 2 * 4
+
+
+def test_documents_keep_latest_version_per_link(tmp_path):
+    with EmbeddingStore(tmp_path, "m") as store:
+        store.put_many(["t1", "t2", "t3"], [[1, 0], [0, 1], [1, 1]])
+        store.record_documents(
+            [("u2", "t2", {"title": "two"}), ("u1", "t1", {"title": "one"})]
+        )
+        store.record_documents([("u3", "t3", {"title": "three"})])
+        store.record_documents([("u1", "t3", {"title": "one, edited"})])
+        # Documents whose embedding was never stored are not reindexable
+        store.record_documents([("u4", "missing", {})])
+        assert store.document_count() == 4
+
+        batches = list(store.iter_documents(batch_size=2))
+
+    assert batches == [
+        [
+            ("u1", [1.0, 1.0], {"title": "one, edited"}),
+            ("u2", [0.0, 1.0], {"title": "two"}),
+        ],
+        [("u3", [1.0, 1.0], {"title": "three"})],
+    ]
+    with EmbeddingStore(tmp_path, "other") as store:
+        assert store.document_count() == 0
+        assert list(store.iter_documents()) == []
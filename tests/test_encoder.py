@@ -0,0 +1,118 @@
+import sys
+
+import numpy as np
+import pytest
+
+from src import encoder
+from src.encoder import cosine_agreement, encoder_id, load_encoder, single_query_ms
+
+
+class FakeModel:
+    """Encodes each text to a fixed vector, optionally perturbed."""
+
+    def __init__(self, noise=0.0):
+        self.noise = noise
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        vectors = np.array([[len(t), 1.0, 2.0] for t in texts], dtype=np.float32)
+        vectors[:, 2] += self.noise
+        return vectors
+
+
+@pytest.fixture
+def torch_mock(monkeypatch, mocker):
+    torch = mocker.MagicMock()
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    return torch
+
+
+def test_encoder_id_keeps_optimized_embeddings_apart():
+    assert encoder_id("m", "torch") == "m"
+    assert encoder_id("m", "onnx-int8") == "m:onnx-int8"
+    assert encoder_id("m") == "m"  # ENCODER_BACKEND defaults to torch
+
+
+def test_load_torch_encoder_applies_threads(torch_mock):
+    st = sys.modules["sentence_transformers"].SentenceTransformer
+
+    assert load_encoder("m", "torch") is st.return_value
+    st.assert_called_with("m")
+    torch_mock.set_num_threads.assert_not_called()
+
+    torch_mock.set_num_interop_threads.side_effect = RuntimeError("too late")
+    load_encoder("m", "torch", intra_op_threads=2, inter_op_threads=1)
+    torch_mock.set_num_threads.assert_called_once_with(2)
+    torch_mock.set_num_interop_threads.assert_called_once_with(1)
+
+    torch_mock.reset_mock()
+    load_encoder("m", "torch", intra_op_threads=0, inter_op_threads=2)
+    load_encoder("m", "torch", intra_op_threads=3, inter_op_threads=0)
+    torch_mock.set_num_threads.assert_called_once_with(3)
+    torch_mock.set_num_interop_threads.assert_called_once_with(2)
+
+
+def test_load_torch_int8_quantizes_linear_layers(torch_mock):
+    st = sys.modules["sentence_transformers"].SentenceTransformer
+    quantize = torch_mock.ao.quantization.quantize_dynamic
+
+    model = load_encoder("m", "torch-int8", intra_op_threads=0, inter_op_threads=0)
+    assert model is quantize.return_value
+    assert quantize.call_args.args == (st.return_value, {torch_mock.nn.Linear})
+    assert quantize.call_args.kwargs == {"dtype": torch_mock.qint8, "inplace": True}
+
+
+def test_load_onnx_encoders_pass_session_options(monkeypatch, mocker):
+    ort = mocker.MagicMock()
+    monkeypatch.setitem(sys.modules, "onnxruntime", ort)
+    st = sys.modules["sentence_transformers"].SentenceTransformer
+
+    load_encoder("m", "onnx", intra_op_threads=4, inter_op_threads=1)
+    options = ort.SessionOptions.return_value
+    assert (options.intra_op_num_threads, options.inter_op_num_threads) == (4, 1)
+    st.assert_called_with(
+        "m", backend="onnx", model_kwargs={"session_options": options}
+    )
+
+    load_encoder("m", "onnx-int8", intra_op_threads=0, inter_op_threads=0)
+    assert st.call_args.kwargs["model_kwargs"]["file_name"] == (
+        encoder.ENCODER_ONNX_INT8_FILE
+    )
+
+
+def test_load_encoder_rejects_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown encoder backend"):
+        load_encoder("m", "tpu")
+
+
+def test_cosine_agreement_and_latency():
+    texts = ["a", "bb", "ccc"]
+    exact = cosine_agreement(FakeModel(), FakeModel(), texts)
+    assert exact["mean"] == pytest.approx(1.0) and exact["min"] == pytest.approx(1.0)
+    noisy = cosine_agreement(FakeModel(noise=1.0), FakeModel(), texts)
+    assert noisy["min"] < noisy["mean"] < 1.0
+
+    model = FakeModel()
+    assert single_query_ms(model, texts) >= 0
+    assert model.calls == [["a"], ["a"], ["bb"], ["ccc"]]
+
+
+@pytest.mark.parametrize("noise, code", [(0.0, 0), (5.0, 1)])
+def test_main_checks_agreement_against_reference(tmp_path, mocker, capsys, noise, code):
+    models = {"onnx-int8": FakeModel(noise), "torch": FakeModel()}
+    load = mocker.patch.object(
+        encoder, "load_encoder", side_effect=lambda name, backend: models[backend]
+    )
+    texts = tmp_path / "texts.txt"
+    texts.write_text("first\n\nsecond\n", encoding="utf-8")
+
+    assert encoder.main(["--backend", "onnx-int8", "--texts", str(texts)]) == code
+    assert load.call_args_list[0].args == ("all-MiniLM-L6-v2", "onnx-int8")
+    assert models["torch"].calls[0] == ["first", "second"]
+    assert "onnx-int8 vs torch on 2 texts" in capsys.readouterr().out
+
+
+def test_main_defaults_to_sample_texts(mocker):
+    mocker.patch.object(encoder, "load_encoder", return_value=FakeModel())
+    assert encoder.main([]) == 0
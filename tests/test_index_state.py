@@ -0,0 +1,91 @@
+import threading
+
+from src.index_state import (
+    IndexStatsCache,
+    bump_index_generation,
+    read_index_generation,
+)
+
+
+def test_generation_starts_at_zero_and_bumps(tmp_path):
+    assert read_index_generation(tmp_path) == 0
+    assert bump_index_generation(tmp_path / "nested") == 1
+    assert bump_index_generation(tmp_path / "nested") == 2
+    assert read_index_generation(tmp_path / "nested") == 2
+
+
+def test_generation_ignores_garbage(tmp_path):
+    (tmp_path / "index_generation").write_text("not a number")
+    assert read_index_generation(tmp_path) == 0
+    (tmp_path / "index_generation").write_text("")
+    assert read_index_generation(tmp_path) == 0
+
+
+def test_refresh_keeps_last_value_on_failure():
+    responses = iter([{"total_vector_count": 7}, RuntimeError("down"), {}])
+
+    def fetch():
+        value = next(responses)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    cache = IndexStatsCache(fetch)
+    assert cache.total_vectors == 0
+    assert cache.refresh() == 7
+    assert cache.refresh() == 7
+    assert cache.refresh() == 0
+    assert cache.refreshed_at is not None
+
+
+def _counting_fetch():
+    calls = []
+    refreshed = threading.Semaphore(0)
+
+    def fetch():
+        calls.append(1)
+        refreshed.release()
+        return {"total_vector_count": len(calls)}
+
+    return calls, refreshed, fetch
+
+
+def test_background_thread_refreshes_on_interval():
+    calls, refreshed, fetch = _counting_fetch()
+    cache = IndexStatsCache(fetch, interval_s=0.01, poll_s=0.005).start()
+    for _ in range(3):
+        assert refreshed.acquire(timeout=5)
+    cache.stop()
+    cache.stop()
+
+    assert len(calls) >= 3
+    assert cache.total_vectors >= 3
+
+
+def test_invalidate_wakes_refresh_thread():
+    calls, refreshed, fetch = _counting_fetch()
+    cache = IndexStatsCache(fetch, interval_s=3600, poll_s=3600)
+    assert cache.start() is cache.start()
+    assert refreshed.acquire(timeout=5)
+
+    cache.invalidate()
+    assert refreshed.acquire(timeout=5)
+    cache.stop()
+    assert len(calls) == 2
+
+
+def test_generation_change_triggers_refresh(tmp_path):
+    calls, refreshed, fetch = _counting_fetch()
+    cache = IndexStatsCache(
+        fetch,
+        interval_s=3600,
+        poll_s=0.01,
+        generation_fn=lambda: read_index_generation(tmp_path),
+    ).start()
+    assert refreshed.acquire(timeout=5)
+    assert cache.generation == 0
+
+    bump_index_generation(tmp_path)
+    assert refreshed.acquire(timeout=5)
+    cache.stop()
+    assert cache.generation == 1
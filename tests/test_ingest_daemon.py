@@ -0,0 +1,202 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src import ingest_daemon as daemon_mod
+from src import load_articles as la
+from src.data_models import FeedFetchResult
+from src.ingest_daemon import FeedSchedule, IngestDaemon, serve_status
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def bounds(mocker):
+    mocker.patch.object(daemon_mod, "DAEMON_MIN_INTERVAL_S", 60.0)
+    mocker.patch.object(daemon_mod, "DAEMON_MAX_INTERVAL_S", 3600.0)
+    mocker.patch.object(daemon_mod, "DAEMON_INITIAL_INTERVAL_S", 600.0)
+    mocker.patch.object(daemon_mod, "DAEMON_TARGET_NEW", 2.0)
+    mocker.patch.object(daemon_mod, "DAEMON_RATE_ALPHA", 0.5)
+
+
+def _result(category, new=0, changed=0, error=None):
+    return FeedFetchResult(
+        category=category,
+        url=f"http://{category}",
+        new_articles=new,
+        changed_articles=changed,
+        error=error,
+    )
+
+
+def test_schedule_polls_busy_feeds_more_often_and_quiet_ones_less():
+    busy, quiet = FeedSchedule("busy", "u", 0.0), FeedSchedule("quiet", "u", 0.0)
+
+    # 12 articles over the initial 600 s: 2 per 100 s
+    busy.record(_result("busy", new=10, changed=2), 0.0, 1.0)
+    assert busy.interval_s == 100.0 and busy.due_at == 100.0
+    # Rate halves towards 0 per 100 s -> 1 per 100 s -> 200 s interval
+    busy.record(_result("busy"), 100.0, 101.0)
+    assert busy.interval_s == 200.0
+    assert (busy.total_new, busy.last_new, busy.runs) == (12, 0, 2)
+
+    quiet.record(_result("quiet"), 0.0, 1.0)
+    assert quiet.interval_s == 1200.0
+    quiet.record(_result("quiet"), 1200.0, 1201.0)
+    assert quiet.interval_s == 2400.0
+    quiet.record(_result("quiet"), 2400.0, 2401.0)
+    assert quiet.interval_s == 3600.0
+
+    # A flood is clamped to the minimum interval
+    flood = FeedSchedule("flood", "u", 0.0)
+    flood.record(_result("flood", new=1000), 0.0, 1.0)
+    assert flood.interval_s == 60.0
+
+
+def test_schedule_backs_off_failing_feeds_and_reports_status():
+    schedule = FeedSchedule("cat", "http://cat", 0.0)
+    assert schedule.status(now=0.0)["last_run"] is None
+    schedule.record(_result("cat", new=12), 30.0, 32.5)
+    schedule.record(_result("cat", error="timeout"), 150.0, 151.0)
+
+    assert schedule.interval_s == 200.0 and schedule.due_at == 350.0
+    assert schedule.rate_per_s == 0.02  # unchanged by the failure
+    status = schedule.status(now=400.0)
+    assert status["last_error"] == "timeout"
+    assert status["last_run"] == "1970-01-01T00:02:30+00:00"
+    assert status["last_success"] == "1970-01-01T00:00:30+00:00"
+    assert status["last_lag_s"] == 20.0  # due at 130, started at 150
+    assert status["overdue_s"] == 50.0
+    assert status["new_articles_per_hour"] == 72.0
+    assert (status["runs"], status["total_new_articles"]) == (2, 12)
+
+
+def test_run_due_ingests_only_due_feeds(tmp_path, mocker):
+    clock = Clock()
+    ingest = mocker.patch.object(
+        la, "ingest_feeds", return_value=([_result("a", new=6), _result("b")], 6)
+    )
+    expire = mocker.patch.object(la, "prepare_seen_urls")
+    daemon = IngestDaemon(
+        {"a": "http://a", "b": "http://b"}, "model", "index", tmp_path, clock=clock
+    )
+
+    assert daemon.run_due() == 6
+    assert ingest.call_args.args == (
+        {"a": "http://a", "b": "http://b"},
+        "model",
+        "index",
+        str(tmp_path / "seen_urls.sqlite3"),
+    )
+    assert ingest.call_args.kwargs["feed_state_file"] == str(
+        tmp_path / "feed_state.json"
+    )
+    assert (tmp_path / "index_generation").read_text() == "1"
+    assert (tmp_path / "ingest_metrics.prom").exists()
+    # a: 6 articles in 600 s -> 200 s; b: quiet -> 1200 s
+    assert daemon.next_due() == 1200.0
+
+    assert daemon.run_due() == 0  # nothing due yet
+    clock.now = 1200.0
+    ingest.return_value = ([_result("a", new=1)], 0)
+    daemon.run_due()
+    assert ingest.call_args.args[0] == {"a": "http://a"}
+    assert (tmp_path / "index_generation").read_text() == "1"
+    assert daemon.runs == 2 and daemon.upserted == 6
+    expire.assert_not_called()
+
+    # Seen URLs are expired once a day
+    clock.now += daemon_mod._EXPIRE_EVERY_S
+    daemon.run_due()
+    expire.assert_called_once_with(str(tmp_path / "seen_urls.sqlite3"), tmp_path)
+
+
+def test_run_forever_survives_failures_until_stopped(tmp_path, mocker):
+    stop = threading.Event()
+    daemon = IngestDaemon({"a": "http://a"}, None, None, tmp_path, clock=Clock())
+    calls = []
+
+    def run_due():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        if len(calls) == 3:
+            stop.set()
+        return 0
+
+    mocker.patch.object(daemon, "run_due", side_effect=run_due)
+    mocker.patch.object(stop, "wait")
+
+    daemon.run_forever(stop)
+    assert len(calls) == 3
+    waits = [c.args[0] for c in stop.wait.call_args_list]
+    # Retry after the minimum interval, then sleep until due (at least 1 s)
+    assert waits == [60.0, 1.0, 1.0]
+
+
+def test_status_server_serves_status_and_metrics(tmp_path, mocker):
+    mocker.patch.object(la, "ingest_feeds", return_value=([_result("a", new=3)], 3))
+    daemon = IngestDaemon({"a": "http://a"}, None, None, tmp_path, clock=Clock())
+    daemon.run_due()
+    server = serve_status(daemon, 0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/status") as response:
+            status = json.loads(response.read())
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            metrics = response.read().decode()
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            urllib.request.urlopen(f"{base}/missing")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert status["runs"] == 1 and status["upserted"] == 3
+    assert status["feeds"]["a"]["last_new_articles"] == 3
+    assert status["feeds"]["a"]["interval_s"] == 400.0
+    assert "gossip_ingest_last_run" in metrics
+    assert exc.value.code == 404
+
+
+@pytest.mark.parametrize("port", ["0", "8123"])
+def test_main_runs_until_stopped(tmp_path, monkeypatch, mocker, port):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    mocker.patch.object(la, "initialize_pinecone")
+    mocker.patch.object(la, "load_encoder")
+    handlers = mocker.patch("signal.signal")
+    serve = mocker.patch.object(daemon_mod, "serve_status")
+    run_forever = mocker.patch.object(IngestDaemon, "run_forever")
+
+    daemon_mod.main(["--port", port])
+
+    stop = run_forever.call_args.args[0]
+    assert not stop.is_set()
+    handlers.call_args.args[1]()
+    assert stop.is_set()
+    assert serve.called == (port != "0")
+    if serve.called:
+        serve.return_value.shutdown.assert_called_once()
+
+
+def test_main_outside_main_thread_keeps_signal_handlers(tmp_path, monkeypatch, mocker):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    mocker.patch.object(la, "initialize_pinecone")
+    mocker.patch.object(la, "load_encoder")
+    handlers = mocker.patch("signal.signal")
+    run_forever = mocker.patch.object(IngestDaemon, "run_forever")
+    stop = threading.Event()
+
+    thread = threading.Thread(target=daemon_mod.main, args=(["--port", "0"], stop))
+    thread.start()
+    thread.join()
+    assert run_forever.call_args.args[0] is stop
+    handlers.assert_not_called()
@@ -0,0 +1,110 @@
+import numpy as np
+
+from src import lexical_index
+from src.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+def _docs():
+    return [
+        ("a", {"title": "Kylian Mbappé au Real", "summary": "Le joueur signe"}),
+        ("b", {"title": "Mariage de la star", "summary": "Une cérémonie"}),
+        ("c", {"title": "Mbappe blessé", "summary": "Le joueur du Real"}),
+        ("d", {"title": "Soirée à Cannes", "summary": "La star en robe"}),
+    ]
+
+
+def _index(tmp_path, **kwargs):
+    index = LexicalIndex(tmp_path, "idx", **kwargs)
+    index.upsert(
+        (id_, {**meta, "category": "sport" if id_ in "ac" else "people"})
+        for id_, meta in _docs()
+    )
+    return index
+
+
+def test_tokenize_folds_case_accents_and_drops_stopwords():
+    assert tokenize("Le MARIAGE d'Élodie à Paris!") == ["mariage", "elodie", "paris"]
+    assert tokenize("de la") == []
+
+
+def test_empty_index_matches_nothing(tmp_path):
+    index = LexicalIndex(tmp_path / "missing")
+    assert len(index) == 0
+    assert index.search("mbappe", 5) == ([], False)
+    index.upsert([])
+    assert not (tmp_path / "missing").exists()
+
+
+def test_bm25_ranks_and_filters(tmp_path):
+    index = _index(tmp_path, max_df=1.0)
+    hits = index.search("Kylian Mbappé", 5)
+    assert [m["id"] for m in hits.matches] == ["a", "c"]
+    assert hits.matches[0]["metadata"]["title"] == "Kylian Mbappé au Real"
+    assert hits.matches[0]["score"] > hits.matches[1]["score"] > 0
+    assert index.search("mbappe", 1).matches[0]["id"] in {"a", "c"}
+
+    filtered = index.search("star", 5, {"category": {"$eq": "people"}})
+    assert sorted(m["id"] for m in filtered.matches) == ["b", "d"]
+    assert index.search("star", 5, {"category": {"$eq": "sport"}}).matches == []
+    assert index.search("de la", 5) == ([], False)
+
+
+def test_confidence_needs_few_rare_terms_found_together(tmp_path):
+    index = _index(tmp_path, max_terms=2, max_df=0.3)
+    assert index.search("kylian", 5).confident
+    assert index.search("mariage ceremonie", 5).confident
+    # Not all terms in one document, too common, unknown, too many terms
+    assert not index.search("kylian mariage", 5).confident
+    assert not index.search("star", 5).confident
+    assert not index.search("kylian zidane", 5).confident
+    assert not index.search("kylian mbappe real", 5).confident
+    # Nothing left after filtering
+    assert not index.search("kylian", 5, {"category": "people"}).confident
+
+
+def test_upsert_overwrites_and_other_instances_reload(tmp_path):
+    writer = _index(tmp_path, max_df=1.0)
+    reader = LexicalIndex(tmp_path, "idx", max_df=1.0)
+    assert len(reader) == 4
+
+    writer.upsert([("b", {"title": "Divorce de la star", "summary": "Fin"})])
+    writer.upsert([("e", {"title": "Nouveau", "summary": "Mariage surprise"})])
+
+    assert len(reader) == 5
+    hits = reader.search("mariage", 5).matches
+    assert [m["id"] for m in hits] == ["e"]
+    assert reader.search("divorce", 5).matches[0]["metadata"] == {
+        "summary": "Fin",
+        "title": "Divorce de la star",
+    }
+
+
+def test_upsert_only_tokenizes_new_records_and_matches_a_rebuild(tmp_path, mocker):
+    index = _index(tmp_path)
+    tokenized = mocker.spy(lexical_index, "tokenize")
+    index.upsert(
+        [
+            ("c", {"title": "Mbappe rétabli", "summary": "Retour du joueur"}),
+            ("f", {"title": "Robe de Cannes", "summary": "La star"}),
+        ]
+    )
+    assert tokenized.call_count == 2
+
+    snap, postings = index._reload_if_changed()
+    assert snap.ids == ["a", "b", "d", "c", "f"]
+    assert snap.columns["category"] == ["sport", "people", "people", None, None]
+    texts = [lexical_index.document_text(snap.metadata(row)) for row in range(5)]
+    rebuilt = lexical_index._Postings.build(texts)
+    for name, array in rebuilt.arrays().items():
+        np.testing.assert_array_equal(postings.arrays()[name], array)
+    assert {m["id"] for m in index.search("cannes", 5).matches} == {"d", "f"}
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    def ranking(*ids):
+        return [{"id": i, "score": 1.0, "metadata": {"title": i}} for i in ids]
+
+    fused = reciprocal_rank_fusion([ranking("a", "b", "c"), ranking("c", "d")], 3, k=1)
+    assert [m["id"] for m in fused] == ["c", "a", "b"]
+    assert fused[0]["score"] == 1 / 4 + 1 / 2
+    assert fused[0]["metadata"] == {"title": "c"}
@@ -2,11 +2,20 @@ from src.load_articles import (
     initialize_pinecone,
     fetch_articles,
     process_feeds_with_cache,
-    load_cached_urls,
-    save_cached_urls,
 )
 from src import load_articles as la
-from src.data_models import Article
+from src.data_models import Article, FeedFetchResult
+from src.url_store import SeenUrlStore
+
+
+def serve_feeds(mocker, articles=None, **by_category):
+    """Patch `fetch_feed` to return `articles` (or `by_category[category]`)."""
+
+    def fake_fetch(category, url, etag=None, modified=None, session=None):
+        served = by_category.get(category, articles or [])
+        return FeedFetchResult(category=category, url=url, articles=served)
+
+    return mocker.patch("src.load_articles.fetch_feed", side_effect=fake_fetch)
 
 
 def test_initialize_pinecone_creates_when_missing(mocker):
@@ -31,7 +40,8 @@ def test_initialize_pinecone_skips_when_exists(mocker):
     assert idx == mock_pc.Index.return_value
 
 
-def test_main_flow_invokes_initialize_and_process(mocker):
+def test_main_flow_invokes_initialize_and_process(tmp_path, monkeypatch, mocker):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
     called = {"init": False, "proc": False}
 
     def fake_init(*args, **kwargs):
@@ -44,7 +54,7 @@ def test_main_flow_invokes_initialize_and_process(mocker):
     mocker.patch.object(la, "initialize_pinecone", side_effect=fake_init)
     mocker.patch.object(
         la,
-        "SentenceTransformer",
+        "load_encoder",
         return_value=mocker.MagicMock(
             encode=mocker.MagicMock(
                 return_value=type("V", (), {"tolist": lambda self: [0.1]})()
@@ -57,6 +67,68 @@ def test_main_flow_invokes_initialize_and_process(mocker):
     assert called["init"] and called["proc"]
 
 
+def test_main_migrates_legacy_pickle_and_expires(tmp_path, monkeypatch, mocker):
+    import pickle
+
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    mocker.patch.object(la, "SEEN_URL_TTL_DAYS", 30)
+    mocker.patch.object(la, "initialize_pinecone")
+    mocker.patch.object(la, "load_encoder")
+    mocker.patch.object(la, "process_feeds_with_cache", return_value=0)
+    (tmp_path / "cached_urls.pkl").write_bytes(pickle.dumps({"a", "b"}))
+    expire = mocker.spy(SeenUrlStore, "expire")
+
+    la.main()
+
+    assert not (tmp_path / "cached_urls.pkl").exists()
+    with SeenUrlStore(tmp_path / "seen_urls.sqlite3") as store:
+        assert store.seen(["a", "b", "c"]) == {"a", "b"}
+    assert expire.call_args.args[1] == 30
+    assert la.process_feeds_with_cache.call_args.args[3] == str(
+        tmp_path / "seen_urls.sqlite3"
+    )
+
+
+def test_main_bumps_index_generation_after_upserts(tmp_path, monkeypatch, mocker):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    mocker.patch.object(la, "initialize_pinecone")
+    mocker.patch.object(la, "load_encoder")
+    mocker.patch.object(la, "process_feeds_with_cache", return_value=3)
+
+    la.main()
+    assert (tmp_path / "index_generation").read_text() == "1"
+    # Ingestion metrics are published for the backend's /metrics
+    assert "gossip_ingest_last_run" in (tmp_path / "ingest_metrics.prom").read_text()
+
+
+def test_process_feeds_counts_ingest_stages(tmp_path, mocker):
+    def stage(name):
+        return la.INGEST_ARTICLES.value(stage=name)
+
+    before = {name: stage(name) for name in ("fetched", "skipped", "upserted")}
+    with SeenUrlStore(tmp_path / "seen.sqlite3") as store:
+        store.add_many(["U1"])
+    serve_feeds(
+        mocker,
+        cat=[
+            Article(title="T1", summary="S1", link="U1", published="P1"),
+            Article(title="T2", summary="S2", link="U2", published="P2"),
+        ],
+    )
+    model = mocker.MagicMock()
+    model.encode.return_value.tolist.return_value = [[0.1, 0.2, 0.3]]
+
+    process_feeds_with_cache(
+        {"cat": "http://feed"}, model, mocker.MagicMock(), tmp_path / "seen.sqlite3"
+    )
+
+    assert stage("fetched") == before["fetched"] + 2
+    assert stage("skipped") == before["skipped"] + 1
+    assert stage("upserted") == before["upserted"] + 1
+    assert la.INGEST_FEED_FETCHES.value(category="cat", status="ok") >= 1
+    assert la.INGEST_FEED_DURATION.value(category="cat") == 0
+
+
 def test_fetch_articles_parses_feed_entries(mocker):
     mock_feed = mocker.MagicMock()
     mock_feed.entries = [
@@ -83,32 +155,35 @@ def test_process_feeds_with_cache_skips_cached_and_upserts_new(tmp_path, mocker)
 
     class _Vec:
         def tolist(self):
-            return [0.1, 0.2, 0.3]
+            return [[0.1, 0.2, 0.3]]
 
     model.encode.return_value = _Vec()
 
     mock_index = mocker.MagicMock()
 
     # One cached URL, one new
-    cached_file = tmp_path / "cache.pkl"
-
-    # Mock helpers and fetcher
-    mocker.patch("src.load_articles.load_cached_urls", return_value={"U1"})
-    save_mock = mocker.patch("src.load_articles.save_cached_urls")
-    mocker.patch(
-        "src.load_articles.fetch_articles",
-        return_value=[
+    cached_file = tmp_path / "seen.sqlite3"
+    with SeenUrlStore(cached_file) as store:
+        store.add_many(["U1"])
+
+    # Mock fetcher
+    serve_feeds(
+        mocker,
+        [
             Article(title="T1", summary="S1", link="U1", published="P1"),
             Article(title="T2", summary="S2", link="U2", published="P2"),
         ],
     )
 
-    process_feeds_with_cache(feeds, model, mock_index, str(cached_file))
+    upserted = process_feeds_with_cache(feeds, model, mock_index, str(cached_file))
 
     # Should upsert only the new one
+    assert upserted == 1
     assert mock_index.upsert.call_count == 1
+    assert mock_index.upsert.call_args.args[0][0][:2] == ("U2", [0.1, 0.2, 0.3])
     # Cache saved
-    assert save_mock.called
+    with SeenUrlStore(cached_file) as store:
+        assert store.seen(["U1", "U2", "U3"]) == {"U1", "U2"}
 
 
 def test_initialize_pinecone_handles_list_indexes_exception(mocker):
@@ -121,16 +196,6 @@ def test_initialize_pinecone_handles_list_indexes_exception(mocker):
     assert mock_pc.create_index.called
 
 
-def test_load_and_save_cached_urls(tmp_path):
-    p = tmp_path / "cache.pkl"
-    # Initially empty -> set()
-    assert load_cached_urls(str(p)) == set()
-    # Save and load back
-    urls = {"a", "b"}
-    save_cached_urls(urls, str(p))
-    assert load_cached_urls(str(p)) == urls
-
-
 def test_process_feeds_with_cache_index_none(mocker):
     # Should early return with no exception
     process_feeds_with_cache({}, mocker.MagicMock(), None, "cache.pkl")
@@ -146,28 +211,512 @@ def test_process_feeds_with_cache_missing_title_or_summary(tmp_path, mocker):
 
     model.encode.return_value = _Vec()
     mock_index = mocker.MagicMock()
-    cached_file = tmp_path / "cache.pkl"
-
-    mocker.patch("src.load_articles.load_cached_urls", return_value=set())
-    mocker.patch("src.load_articles.save_cached_urls")
+    cached_file = tmp_path / "seen.sqlite3"
 
     # Missing title
-    mocker.patch(
-        "src.load_articles.fetch_articles",
-        return_value=[
-            Article(title="", summary="S", link="U3", published="P"),
-        ],
-    )
+    serve_feeds(mocker, [Article(title="", summary="S", link="U3", published="P")])
     process_feeds_with_cache(feeds, model, mock_index, str(cached_file))
 
     # Missing summary
-    mocker.patch(
-        "src.load_articles.fetch_articles",
-        return_value=[
-            Article(title="T", summary="", link="U4", published="P"),
-        ],
-    )
+    serve_feeds(mocker, [Article(title="T", summary="", link="U4", published="P")])
     process_feeds_with_cache(feeds, model, mock_index, str(cached_file))
 
     # No upserts should have happened
     mock_index.upsert.assert_not_called()
+
+
+def _batch_model(mocker):
+    model = mocker.MagicMock()
+    model.encode.side_effect = lambda texts, **kwargs: mocker.MagicMock(
+        tolist=lambda: [[float(len(text))] for text in texts]
+    )
+    return model
+
+
+def _articles(n, prefix="U"):
+    return [
+        Article(title=f"T{i}", summary="S", link=f"{prefix}{i}", published="P")
+        for i in range(n)
+    ]
+
+
+def _links(n):
+    return [f"U{i}" for i in range(n)]
+
+
+def test_process_feeds_batches_encodes_and_chunks_upserts(tmp_path, mocker):
+    mocker.patch.object(la, "EMBED_BATCH_SIZE", 4)
+    mocker.patch.object(la, "UPSERT_CHUNK_SIZE", 3)
+    # The same link in two feeds is only embedded once
+    serve_feeds(mocker, a=_articles(7), b=_articles(1))
+    model = _batch_model(mocker)
+    index = mocker.MagicMock()
+
+    upserted = process_feeds_with_cache(
+        {"a": "http://a", "b": "http://b"}, model, index, str(tmp_path / "seen.sqlite3")
+    )
+
+    assert upserted == 7
+    assert [len(c.args[0]) for c in model.encode.call_args_list] == [4, 3]
+    assert sorted(len(c.args[0]) for c in index.upsert.call_args_list) == [1, 3, 3]
+    records = [r for c in index.upsert.call_args_list for r in c.args[0]]
+    assert {r[0] for r in records} == {f"U{i}" for i in range(7)}
+    assert all(r[2]["category"] == "a" for r in records)
+    with SeenUrlStore(tmp_path / "seen.sqlite3") as store:
+        assert len(store) == 7
+
+
+def test_process_feeds_only_caches_confirmed_chunks(tmp_path, mocker):
+    mocker.patch.object(la, "UPSERT_CHUNK_SIZE", 2)
+    mocker.patch.object(la, "UPSERT_RETRIES", 1)
+    sleep = mocker.patch("src.load_articles.time.sleep")
+    serve_feeds(mocker, _articles(4))
+
+    def upsert(records):
+        if records[0][0] == "U2":
+            raise RuntimeError("503")
+
+    index = mocker.MagicMock()
+    index.upsert.side_effect = upsert
+
+    upserted = process_feeds_with_cache(
+        {"a": "http://a"}, _batch_model(mocker), index, str(tmp_path / "seen.sqlite3")
+    )
+
+    assert upserted == 2
+    with SeenUrlStore(tmp_path / "seen.sqlite3") as store:
+        assert store.seen(_links(4)) == {"U0", "U1"}
+    # Failing chunk: first try plus one retry
+    assert index.upsert.call_count == 3
+    sleep.assert_called_once()
+
+
+def test_process_feeds_records_urls_while_the_run_continues(tmp_path, mocker):
+    import threading
+
+    for knob in ("EMBED_BATCH_SIZE", "EMBED_QUEUE_SIZE", "UPSERT_CHUNK_SIZE"):
+        mocker.patch.object(la, knob, 1)
+    recorded = {}
+    record = SeenUrlStore.record
+
+    def spy_record(self, items):
+        items = list(items)
+        record(self, items)
+        for link, _ in items:
+            recorded.setdefault(link, threading.Event()).set()
+
+    mocker.patch.object(SeenUrlStore, "record", spy_record)
+    waited = []
+
+    def wait_for(link):
+        event = recorded.setdefault(link, threading.Event())
+        waited.append(event.wait(5))
+
+    fetch = serve_feeds(mocker, a=_articles(4)).side_effect
+
+    def slow_fetch(category, *args, **kwargs):
+        if category == "b":
+            wait_for("U3")  # Feed b downloads until a's URLs are recorded
+        return fetch(category, *args, **kwargs)
+
+    la.fetch_feed.side_effect = slow_fetch
+    model = _batch_model(mocker)
+    encode = model.encode.side_effect
+
+    def slow_encode(texts, **kwargs):
+        if texts == ["T1 S"]:
+            wait_for("U0")  # The embed queue stays full meanwhile
+        return encode(texts, **kwargs)
+
+    model.encode.side_effect = slow_encode
+    index = mocker.MagicMock()
+
+    upserted = process_feeds_with_cache(
+        {"a": "http://a", "b": "http://b"}, model, index, str(tmp_path / "seen.sqlite3")
+    )
+
+    assert upserted == 4
+    assert waited == [True, True]
+
+
+def test_failed_run_keeps_the_urls_already_upserted(tmp_path, mocker):
+    import threading
+
+    import pytest
+
+    from src.lexical_index import LexicalIndex
+
+    mocker.patch.object(la, "EMBED_BATCH_SIZE", 2)
+    mocker.patch.object(la, "UPSERT_CHUNK_SIZE", 2)
+    serve_feeds(mocker, _articles(4))
+    model = _batch_model(mocker)
+    encode = model.encode.side_effect
+    upserted = threading.Event()
+
+    def encode_until_crash(texts, **kwargs):
+        if texts == ["T0 S", "T1 S"]:
+            return encode(texts, **kwargs)
+        upserted.wait(5)
+        raise RuntimeError("killed")
+
+    model.encode.side_effect = encode_until_crash
+    index = mocker.MagicMock()
+    index.upsert.side_effect = lambda records: upserted.set()
+    lexical = LexicalIndex(tmp_path / "lexical", "idx")
+
+    with pytest.raises(RuntimeError, match="killed"):
+        la.ingest_feeds(
+            {"a": "http://a"},
+            model,
+            index,
+            str(tmp_path / "seen.sqlite3"),
+            lexical_index=lexical,
+        )
+
+    with SeenUrlStore(tmp_path / "seen.sqlite3") as store:
+        assert store.seen(_links(4)) == {"U0", "U1"}
+    assert len(lexical) == 2
+
+
+def test_upsert_with_retry_recovers_after_transient_errors(mocker):
+    sleep = mocker.patch("src.load_articles.time.sleep")
+    index = mocker.MagicMock()
+    index.upsert.side_effect = [RuntimeError("a"), RuntimeError("b"), None]
+
+    la.upsert_with_retry(index, [("id", [0.1], {})], retries=3, backoff_s=0.1)
+
+    assert index.upsert.call_count == 3
+    assert [c.args[0] for c in sleep.call_args_list] == [0.1, 0.2]
+
+
+def test_embed_articles_and_chunked_helpers(mocker):
+    model = _batch_model(mocker)
+    vectors = la.embed_articles(model, _articles(3), batch_size=2)
+    assert vectors == [[4.0], [4.0], [4.0]]
+    assert model.encode.call_count == 2
+    assert list(la.chunked([1, 2, 3], 2)) == [[1, 2], [3]]
+    assert list(la.chunked([1, 2], 0)) == [[1], [2]]
+
+
+def _response(mocker, status=200, content=b"<rss/>", headers=None):
+    response = mocker.MagicMock(status_code=status, content=content)
+    response.headers = headers or {}
+    if status >= 400:
+        response.raise_for_status.side_effect = la.requests.HTTPError(f"{status}")
+    return response
+
+
+def test_fetch_feed_sends_validators_and_parses_changed_feed(mocker):
+    session = mocker.MagicMock()
+    session.get.return_value = _response(
+        mocker, content=b"12345", headers={"ETag": '"v2"', "Last-Modified": "Tue"}
+    )
+    feed = mocker.MagicMock(entries=[])
+    parse = mocker.patch("src.load_articles.feedparser.parse", return_value=feed)
+
+    result = la.fetch_feed("cat", "http://f", '"v1"', "Mon", session=session)
+
+    headers = session.get.call_args.kwargs["headers"]
+    assert headers == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon"}
+    assert parse.call_args.args[0] == b"12345"
+    assert (result.etag, result.modified) == ('"v2"', "Tue")
+    assert result.unchanged is False
+    assert result.bytes_downloaded == 5
+    assert result.elapsed_ms >= 0
+
+
+def test_fetch_feed_not_modified_skips_parsing(mocker):
+    session = mocker.MagicMock()
+    session.get.return_value = _response(mocker, status=304, content=b"")
+    parse = mocker.patch("src.load_articles.feedparser.parse")
+
+    result = la.fetch_feed("cat", "http://f", '"v1"', session=session)
+
+    assert session.get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+    assert result.unchanged is True
+    assert result.etag == '"v1"'
+    assert result.articles == []
+    parse.assert_not_called()
+
+
+def test_fetch_feed_captures_http_errors(mocker):
+    get = mocker.patch("src.load_articles.requests.get")
+    get.return_value = _response(mocker, status=500)
+
+    result = la.fetch_feed("cat", "http://f")
+
+    assert get.call_args.kwargs["headers"] == {}
+    assert result.error == "500"
+    assert result.articles == []
+
+
+def test_process_feeds_fetches_concurrently_in_feed_order(tmp_path, mocker):
+    import threading
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fake_fetch(category, url, etag, modified, session):
+        barrier.wait()
+        return FeedFetchResult(category=category, url=url, etag=etag)
+
+    mocker.patch("src.load_articles.fetch_feed", side_effect=fake_fetch)
+    state_file = tmp_path / "feed_state.json"
+    la.save_feed_state({"http://b": {"etag": "e", "modified": None}}, state_file)
+    report = mocker.patch("src.load_articles.report_fetch")
+
+    process_feeds_with_cache(
+        {"a": "http://a", "b": "http://b"},
+        _batch_model(mocker),
+        mocker.MagicMock(),
+        str(tmp_path / "seen.sqlite3"),
+        feed_state_file=str(state_file),
+    )
+
+    results = [c.args[0] for c in report.call_args_list]
+    assert [(r.category, r.etag) for r in results] == [("a", None), ("b", "e")]
+
+
+def test_feed_state_round_trip(tmp_path):
+    path = tmp_path / "nested" / "state.json"
+    assert la.load_feed_state(path) == {}
+    la.save_feed_state({"http://a": {"etag": "e", "modified": None}}, path)
+    assert la.load_feed_state(path) == {"http://a": {"etag": "e", "modified": None}}
+
+
+def test_process_feeds_persists_validators_for_completed_feeds(tmp_path, mocker):
+    mocker.patch.object(la, "UPSERT_CHUNK_SIZE", 1)
+    mocker.patch.object(la, "UPSERT_RETRIES", 0)
+    state_file = tmp_path / "feed_state.json"
+    la.save_feed_state({"http://old": {"etag": "keep", "modified": None}}, state_file)
+
+    results = {
+        "ok": FeedFetchResult(
+            category="ok", url="http://ok", articles=_articles(1, "OK"), etag="e1"
+        ),
+        "bad": FeedFetchResult(
+            category="bad", url="http://bad", articles=_articles(1, "BAD"), etag="e2"
+        ),
+        "same": FeedFetchResult(
+            category="same", url="http://same", unchanged=True, etag="e3"
+        ),
+        "down": FeedFetchResult(category="down", url="http://down", error="timeout"),
+    }
+    mocker.patch(
+        "src.load_articles.fetch_feed",
+        side_effect=lambda category, *args: results[category],
+    )
+
+    def upsert(records):
+        if records[0][0].startswith("BAD"):
+            raise RuntimeError("503")
+
+    index = mocker.MagicMock()
+    index.upsert.side_effect = upsert
+
+    upserted = process_feeds_with_cache(
+        {c: r.url for c, r in results.items()},
+        _batch_model(mocker),
+        index,
+        str(tmp_path / "seen.sqlite3"),
+        feed_state_file=str(state_file),
+    )
+
+    assert upserted == 1
+    assert la.load_feed_state(state_file) == {
+        "http://old": {"etag": "keep", "modified": None},
+        "http://ok": {"etag": "e1", "modified": None},
+        "http://same": {"etag": "e3", "modified": None},
+    }
+
+
+def test_process_feeds_reuses_embeddings_from_store(tmp_path, mocker):
+    from src.embedding_store import EmbeddingStore
+
+    def reused():
+        return la.INGEST_ARTICLES.value(stage="reused")
+
+    model = _batch_model(mocker)
+    index = mocker.MagicMock()
+    with EmbeddingStore(tmp_path / "emb", "m") as store:
+        serve_feeds(mocker, _articles(2))
+        process_feeds_with_cache(
+            {"a": "http://a"}, model, index, tmp_path / "s1.sqlite3", None, store
+        )
+        assert model.encode.call_count == 1
+        before = reused()
+
+        # Fresh seen-URL db: the same texts are read back, only T2 is encoded
+        serve_feeds(mocker, _articles(3))
+        upserted = process_feeds_with_cache(
+            {"a": "http://a"}, model, index, tmp_path / "s2.sqlite3", None, store
+        )
+
+        assert upserted == 3
+        assert model.encode.call_args.args[0] == ["T2 S"]
+        assert reused() == before + 2
+        assert [r[1] for r in index.upsert.call_args.args[0]] == [[4.0]] * 3
+        assert store.document_count() == 3
+        assert [r[0] for r in next(store.iter_documents())] == ["U0", "U1", "U2"]
+        # Everything stored: the model is not called at all
+        assert la.embed_articles(model, _articles(3), store=store) == [[4.0]] * 3
+        assert model.encode.call_count == 2
+
+
+def test_process_feeds_reingests_only_changed_articles(tmp_path, mocker, capsys):
+    from src.embedding_store import EmbeddingStore
+
+    def feed_count(status):
+        return la.INGEST_FEED_ARTICLES.value(category="a", status=status)
+
+    seen = tmp_path / "seen.sqlite3"
+    model = _batch_model(mocker)
+    index = mocker.MagicMock()
+    with EmbeddingStore(tmp_path / "emb", "m") as store:
+        serve_feeds(mocker, _articles(4))
+        process_feeds_with_cache({"a": "http://a"}, model, index, seen, None, store)
+        # U3 was recorded before fingerprints existed
+        with SeenUrlStore(seen) as urls:
+            urls.add_many(["U3"])
+        before = {s: feed_count(s) for s in ("new", "changed", "unchanged")}
+        model.encode.reset_mock()
+        index.upsert.reset_mock()
+
+        edited = _articles(5)
+        edited[1].title = "T1 (updated)"
+        edited[2].published = "P2"
+        edited[3].summary = "S, edited before the upgrade"
+        serve_feeds(mocker, edited)
+        upserted = process_feeds_with_cache(
+            {"a": "http://a"}, model, index, seen, None, store
+        )
+
+        assert upserted == 3
+        records = {r[0]: r for c in index.upsert.call_args_list for r in c.args[0]}
+        assert sorted(records) == ["U1", "U2", "U4"]
+        assert records["U2"][2]["published"] == "P2"
+        # Only the edited text and the new article are encoded
+        assert model.encode.call_args.args[0] == ["T1 (updated) S", "T4 S"]
+        assert feed_count("new") == before["new"] + 1
+        assert feed_count("changed") == before["changed"] + 2
+        assert feed_count("unchanged") == before["unchanged"] + 2
+        assert "a: 1 new, 2 changed, 2 unchanged" in capsys.readouterr().out
+
+        # U3 adopted its current fingerprint, so a later edit is picked up
+        edited[3].summary = "S, edited again"
+        serve_feeds(mocker, edited)
+        index.upsert.reset_mock()
+        process_feeds_with_cache({"a": "http://a"}, model, index, seen, None, store)
+        assert [r[0] for r in index.upsert.call_args.args[0]] == ["U3"]
+
+
+def test_process_feeds_adds_confirmed_articles_to_lexical_index(tmp_path, mocker):
+    from src.lexical_index import LexicalIndex
+
+    mocker.patch.object(la, "UPSERT_CHUNK_SIZE", 2)
+    mocker.patch.object(la, "UPSERT_RETRIES", 0)
+    articles = _articles(4)
+    articles[0].title = "Kylian Mbappé"
+    serve_feeds(mocker, articles)
+
+    def upsert(records):
+        if records[0][0] == "U2":
+            raise RuntimeError("503")
+
+    index = mocker.MagicMock()
+    index.upsert.side_effect = upsert
+    lexical = LexicalIndex(tmp_path / "lexical", max_df=1.0)
+
+    process_feeds_with_cache(
+        {"a": "http://a"},
+        _batch_model(mocker),
+        index,
+        tmp_path / "seen.sqlite3",
+        lexical_index=lexical,
+    )
+
+    assert len(lexical) == 2
+    match = lexical.search("mbappe", 5).matches[0]
+    assert match["id"] == "U0"
+    assert match["metadata"]["category"] == "a"
+
+
+def test_pipeline_parses_in_pool_and_reports_stages(tmp_path, mocker, capsys):
+    from concurrent.futures import ThreadPoolExecutor
+
+    mocker.patch.object(la, "PARSE_WORKERS", 2)
+    mocker.patch.object(la, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+    def download(category, url, etag, modified, session):
+        result = FeedFetchResult(category=category, url=url, unchanged=category == "b")
+        return result, None if result.unchanged else (b"<rss/>", {})
+
+    mocker.patch("src.load_articles.download_feed", side_effect=download)
+    parse = mocker.patch("src.load_articles.parse_payload", return_value=_articles(2))
+
+    upserted = process_feeds_with_cache(
+        {"a": "http://a", "b": "http://b"},
+        _batch_model(mocker),
+        mocker.MagicMock(),
+        str(tmp_path / "seen.sqlite3"),
+    )
+
+    assert upserted == 2
+    parse.assert_called_once_with(b"<rss/>", {})
+    out = capsys.readouterr().out
+    for name in ("fetch", "parse", "classify", "embed", "upsert"):
+        assert f"  {name} " in out
+    assert "queue embed" in out and "queue upsert" in out
+    assert la.INGEST_STAGE_UTILIZATION.value(stage="parse") >= 0
+
+
+def test_pipeline_merges_waiting_embed_batches(tmp_path, mocker):
+    import threading
+
+    mocker.patch.object(la, "EMBED_BATCH_SIZE", 4)
+    released = threading.Event()
+
+    class Queue(la.MonitoredQueue):
+        def put(self, item, *args, **kwargs):
+            super().put(item, *args, **kwargs)
+            if item is la.DONE:
+                released.set()
+
+    mocker.patch.object(la, "MonitoredQueue", Queue)
+    serve_feeds(mocker, a=_articles(1, "A"), b=_articles(1, "B"), c=_articles(1, "C"))
+    model = _batch_model(mocker)
+    encode = model.encode.side_effect
+
+    def slow_encode(texts, **kwargs):
+        # Hold the embed stage until every batch is queued
+        released.wait(5)
+        return encode(texts, **kwargs)
+
+    model.encode.side_effect = slow_encode
+
+    upserted = process_feeds_with_cache(
+        {"a": "http://a", "b": "http://b", "c": "http://c"},
+        model,
+        mocker.MagicMock(),
+        str(tmp_path / "seen.sqlite3"),
+    )
+
+    assert upserted == 3
+    assert len(model.encode.call_args_list) <= 2
+
+
+def test_pipeline_embed_failure_drains_and_raises(tmp_path, mocker):
+    import pytest
+
+    mocker.patch.object(la, "EMBED_BATCH_SIZE", 2)
+    serve_feeds(mocker, _articles(6))
+    model = mocker.MagicMock()
+    model.encode.side_effect = RuntimeError("out of memory")
+    index = mocker.MagicMock()
+
+    with pytest.raises(RuntimeError, match="out of memory"):
+        process_feeds_with_cache(
+            {"a": "http://a"}, model, index, str(tmp_path / "seen.sqlite3")
+        )
+
+    model.encode.assert_called_once()
+    index.upsert.assert_not_called()
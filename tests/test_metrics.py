@@ -0,0 +1,85 @@
+import pytest
+
+from src.metrics import Registry, read_textfile, write_textfile
+
+
+def test_counter_and_gauge_render_with_labels():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    in_flight = registry.gauge("in_flight", "In flight.")
+    requests.inc(route="/a")
+    requests.inc(2, route='/b"x')
+    in_flight.set(3)
+    in_flight.dec()
+    assert requests.value(route="/a") == 1
+    assert in_flight.value() == 2
+    assert registry.render() == (
+        "# HELP requests_total Requests.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{route="/a"} 1.0\n'
+        'requests_total{route="/b\\"x"} 2.0\n'
+        "# HELP in_flight In flight.\n"
+        "# TYPE in_flight gauge\n"
+        "in_flight 2.0\n"
+    )
+
+
+def test_counter_rejects_decrease_and_wrong_labels():
+    counter = Registry().counter("c_total", "C.", ("kind",))
+    with pytest.raises(ValueError):
+        counter.inc(-1, kind="x")
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+
+
+def test_registry_rejects_duplicate_names():
+    registry = Registry()
+    registry.gauge("g", "G.")
+    with pytest.raises(ValueError):
+        registry.counter("g", "Again.")
+
+
+def test_gauge_tracks_in_progress_blocks():
+    gauge = Registry().gauge("busy", "Busy.")
+    with pytest.raises(RuntimeError), gauge.track_inprogress():
+        assert gauge.value() == 1
+        raise RuntimeError("boom")
+    assert gauge.value() == 0
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Registry().histogram("latency_seconds", "L.", ("stage",), (0.1, 1))
+    assert histogram.count(stage="a") == 0
+    for value in (0.05, 0.1, 0.5, 5):
+        histogram.observe(value, stage="a")
+    assert histogram.count(stage="a") == 4
+    lines = histogram.render().splitlines()[2:]
+    assert lines == [
+        'latency_seconds_bucket{stage="a",le="0.1"} 2.0',
+        'latency_seconds_bucket{stage="a",le="1.0"} 3.0',
+        'latency_seconds_bucket{stage="a",le="+Inf"} 4.0',
+        'latency_seconds_sum{stage="a"} 5.65',
+        'latency_seconds_count{stage="a"} 4.0',
+    ]
+
+
+def test_callback_metric_reads_values_at_render_time():
+    registry = Registry()
+    state = {("hit",): 1}
+    registry.callback("hits_total", "Hits.", "counter", lambda: state, ("result",))
+    state[("miss",)] = 2
+    assert registry.render().splitlines()[1:] == [
+        "# TYPE hits_total counter",
+        'hits_total{result="hit"} 1.0',
+        'hits_total{result="miss"} 2.0',
+    ]
+
+
+def test_textfile_round_trip(tmp_path):
+    registry = Registry()
+    registry.counter("jobs_total", "Jobs.").inc()
+    path = tmp_path / "nested" / "job.prom"
+    assert read_textfile(path) == ""
+    write_textfile(registry, path)
+    assert read_textfile(path) == registry.render()
+    assert [p.name for p in path.parent.iterdir()] == ["job.prom"]
@@ -0,0 +1,60 @@
+import queue
+import threading
+
+import pytest
+
+from src.pipeline import MonitoredQueue, StageStats, format_report
+
+
+def test_stage_stats_summary():
+    stage = StageStats("embed", workers=2)
+    stage.record(10, 1.0)
+    stage.record(10, 1.0)
+
+    summary = stage.summary(4.0)
+    assert summary["items"] == 20
+    assert summary["per_s"] == 5.0
+    assert summary["per_worker_s"] == 10.0
+    assert summary["utilization"] == 0.25
+    assert StageStats("idle", workers=0).summary(0.0) == {
+        "items": 0,
+        "busy_s": 0.0,
+        "per_s": 0.0,
+        "per_worker_s": 0.0,
+        "utilization": 0.0,
+    }
+
+
+def test_monitored_queue_tracks_occupancy_and_blocking():
+    q = MonitoredQueue("upsert", 1)
+    assert q.summary()["mean"] == 0.0
+    q.put("a")
+    threading.Timer(0.05, q.get).start()
+    q.put("b")  # Blocks until the timer frees a slot
+
+    summary = q.summary()
+    assert summary["capacity"] == 1
+    assert summary["peak"] == 1
+    assert summary["mean"] == 1.0
+    assert summary["blocked_s"] > 0
+
+    # A put that times out on the full queue is counted as blocked too
+    blocked = summary["blocked_s"]
+    with pytest.raises(queue.Full):
+        q.put("c", timeout=0.01)
+    assert q.summary()["blocked_s"] >= blocked + 0.01
+    assert q.summary()["peak"] == 1 and q.puts == 2
+
+
+def test_format_report_lists_stages_and_queues():
+    stage = StageStats("fetch", workers=4)
+    stage.record(3, 0.5)
+    q = MonitoredQueue("embed", 8)
+    q.put(1)
+
+    report = format_report([stage], [q], 2.0).splitlines()
+    assert report[0] == "Pipeline finished in 2.00 s"
+    assert report[1].split()[:3] == ["fetch", "3", "items"]
+    assert "of 4 worker(s)" in report[1]
+    assert report[2].startswith("  queue embed")
+    assert "peak 1 of 8" in report[2]
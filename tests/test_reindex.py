@@ -0,0 +1,102 @@
+from src import load_articles as la
+from src import reindex as ri
+from src.embedding_store import EmbeddingStore
+from src.lexical_index import LexicalIndex
+from src.vector_store import LocalVectorStore, create_vector_store
+
+
+def _fill(directory, n):
+    texts = [f"text {i}" for i in range(n)]
+    with EmbeddingStore(directory, la.MODEL_NAME) as store:
+        store.put_many(texts, [[float(i), 1.0] for i in range(n)])
+        store.record_documents(
+            (f"U{i}", text, {"title": text, "category": "tv" if i % 2 else "people"})
+            for i, text in enumerate(texts)
+        )
+
+
+def test_reindex_bulk_loads_store_into_index(tmp_path, mocker):
+    _fill(tmp_path / "emb", 7)
+    index = LocalVectorStore(tmp_path / "vectors", "idx")
+    upsert = mocker.spy(index, "upsert")
+
+    with EmbeddingStore(tmp_path / "emb", la.MODEL_NAME) as store:
+        assert ri.reindex(store, index, chunk_size=2, workers=1) == (7, 0)
+
+    assert [len(c.args[0]) for c in upsert.call_args_list] == [2, 2, 2, 1]
+    assert index.describe_index_stats()["total_vector_count"] == 7
+    match = index.query([6.0, 1.0], top_k=1)["matches"][0]
+    assert match["id"] == "U6" and match["metadata"] == {
+        "title": "text 6",
+        "category": "people",
+    }
+
+
+def test_reindex_backfills_partitions_only_when_it_covers_the_shared_index(
+    tmp_path, capsys
+):
+    _fill(tmp_path / "emb", 4)
+    index = create_vector_store("local", tmp_path, "idx", None, True)
+    # An article indexed before the embedding store existed
+    index.upsert([("OLD", [1.0, 0.0], {"title": "old", "category": "tv"})])
+
+    with EmbeddingStore(tmp_path / "emb", la.MODEL_NAME) as store:
+        assert ri.reindex(store, index) == (4, 0)
+        assert index.backfilled() == frozenset()
+        assert "holds 5 vectors but only 4" in capsys.readouterr().out
+
+        index.delete(["OLD"])
+        assert ri.reindex(store, index) == (4, 0)
+    assert index.backfilled() == {"people", "tv"}
+    assert index.partition("tv").describe_index_stats()["total_vector_count"] == 2
+
+
+def test_reindex_counts_failed_chunks(tmp_path, mocker):
+    mocker.patch.object(la, "UPSERT_RETRIES", 0)
+    _fill(tmp_path, 5)
+
+    def upsert(records):
+        if records[0][0] == "U2":
+            raise RuntimeError("503")
+
+    index = mocker.MagicMock()
+    index.upsert.side_effect = upsert
+
+    with EmbeddingStore(tmp_path, la.MODEL_NAME) as store:
+        assert ri.reindex(store, index, chunk_size=2) == (3, 2)
+
+
+def test_main_reindexes_into_selected_backend(tmp_path, monkeypatch, mocker):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    _fill(tmp_path / "embeddings", 3)
+    init = mocker.patch.object(la, "initialize_pinecone")
+
+    assert ri.main(["--backend", "local", "--index-name", "idx"]) == 0
+
+    init.assert_not_called()
+    store = LocalVectorStore(tmp_path / "vectors", "idx")
+    assert store.describe_index_stats()["total_vector_count"] == 3
+    assert (tmp_path / "index_generation").read_text() == "1"
+    # The lexical index is rebuilt from the same metadata
+    lexical = LexicalIndex(tmp_path / "lexical", "idx", max_df=1.0)
+    assert len(lexical) == 3
+    assert lexical.search("text", 1).matches[0]["metadata"]["title"].startswith("text")
+
+
+def test_main_pinecone_uses_store_dimension_and_reports_failures(
+    tmp_path, monkeypatch, mocker
+):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    monkeypatch.setenv("PINECONE_KEY", "k")
+    mocker.patch.object(la, "UPSERT_RETRIES", 0)
+    init = mocker.patch.object(la, "initialize_pinecone")
+    init.return_value.upsert.side_effect = RuntimeError("down")
+
+    # Empty store: nothing to load, Pinecone index created at the default dim
+    assert ri.main(["--backend", "pinecone"]) == 0
+    assert init.call_args.args == ("k", None, la.INDEX_NAME, la.EMBEDDING_DIM)
+    assert not (tmp_path / "index_generation").exists()
+
+    _fill(tmp_path / "embeddings", 2)
+    assert ri.main(["--backend", "pinecone"]) == 1
+    assert init.call_args.args[3] == 2
@@ -0,0 +1,23 @@
+import importlib
+import json
+import sys
+
+from src import serialization
+
+
+def test_dumps_encodes_compact_utf8_json():
+    body = serialization.dumps({"title": "Mariée", "score": 0.5, "tags": [1]})
+    assert json.loads(body) == {"title": "Mariée", "score": 0.5, "tags": [1]}
+    assert "Mariée".encode() in body
+    assert b" " not in body
+
+
+def test_dumps_falls_back_to_the_standard_library(monkeypatch):
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    try:
+        fallback = importlib.reload(serialization)
+        assert fallback.orjson is None
+        assert fallback.dumps({"a": "é", "b": [1, 2]}) == '{"a":"é","b":[1,2]}'.encode()
+    finally:
+        monkeypatch.undo()
+        importlib.reload(serialization)
@@ -0,0 +1,80 @@
+import pickle
+import sqlite3
+
+from src.url_store import SeenUrlStore, fingerprint, url_hash
+
+
+def test_url_hash_is_stable_signed_64_bit():
+    assert url_hash("http://a") == url_hash("http://a")
+    assert url_hash("http://a") != url_hash("http://b")
+    assert -(2**63) <= url_hash("http://a") < 2**63
+
+
+def test_add_and_lookup(tmp_path):
+    with SeenUrlStore(tmp_path / "nested" / "seen.sqlite3") as store:
+        assert "http://a" not in store
+        store.add_many(["http://a", "http://b"])
+        store.add_many(["http://a"])
+        assert "http://a" in store
+        assert len(store) == 2
+
+
+def test_seen_batches_large_lookups(tmp_path):
+    urls = [f"http://x/{i}" for i in range(1200)]
+    with SeenUrlStore(tmp_path / "seen.sqlite3") as store:
+        store.add_many(urls[::2])
+        assert store.seen(urls) == set(urls[::2])
+        assert store.seen([]) == set()
+
+
+def test_records_survive_reopen(tmp_path):
+    path = tmp_path / "seen.sqlite3"
+    with SeenUrlStore(path) as store:
+        store.add_many(["http://a"])
+    with SeenUrlStore(path) as store:
+        assert "http://a" in store
+
+
+def test_expire_drops_old_entries(tmp_path):
+    with SeenUrlStore(tmp_path / "seen.sqlite3") as store:
+        store.add_many(["old"], now=0)
+        store.add_many(["new"], now=10 * 86400)
+        assert store.expire(5, now=10 * 86400) == 1
+        assert store.seen(["old", "new"]) == {"new"}
+
+
+def test_migrate_from_pickle_runs_once(tmp_path):
+    legacy = tmp_path / "cached_urls.pkl"
+    legacy.write_bytes(pickle.dumps({"http://a", "http://b"}))
+
+    with SeenUrlStore(tmp_path / "seen.sqlite3") as store:
+        assert store.migrate_from_pickle(legacy) == 2
+        assert store.migrate_from_pickle(legacy) == 0
+        assert store.seen(["http://a", "http://b"]) == {"http://a", "http://b"}
+
+    assert not legacy.exists()
+    assert (tmp_path / "cached_urls.pkl.migrated").exists()
+
+
+def test_fingerprints_round_trip_and_legacy_schema_upgrade(tmp_path):
+    path = tmp_path / "seen.sqlite3"
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE seen_urls ("
+        "url_hash INTEGER PRIMARY KEY, added_at REAL NOT NULL) WITHOUT ROWID"
+    )
+    db.execute("INSERT INTO seen_urls VALUES (?, 0)", (url_hash("old"),))
+    db.commit()
+    db.close()
+
+    assert fingerprint("t", "s") == fingerprint("t", "s")
+    assert fingerprint("t", "s") != fingerprint("ts", "")
+    with SeenUrlStore(path) as store:
+        store.record([("a", fingerprint("t")), ("b", None)])
+        assert store.fingerprints(["old", "a", "b", "c"]) == {
+            "old": None,
+            "a": fingerprint("t"),
+            "b": None,
+        }
+    with SeenUrlStore(path) as store:
+        assert store.seen(["old", "a", "c"]) == {"old", "a"}
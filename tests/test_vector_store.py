@@ -0,0 +1,545 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.vector_store import (
+    IVFVectorStore,
+    LocalVectorStore,
+    PartitionedVectorStore,
+    PineconeStore,
+    create_vector_store,
+    default_nlist,
+    merge_top_k,
+    quantize_rows,
+    top_k_rows,
+    train_centroids,
+)
+
+
+def _records():
+    return [
+        ("a", [1.0, 0.0], {"title": "A", "category": "people"}),
+        ("b", [0.0, 2.0], {"title": "B", "category": "tv"}),
+        ("c", [1.0, 1.0], {"title": "C", "category": "people"}),
+    ]
+
+
+def test_pinecone_store_delegates_to_index(mocker):
+    index = mocker.MagicMock()
+    store = PineconeStore(index)
+
+    store.upsert(iter([("a", [1.0], {})]))
+    store.query([1.0], top_k=3, filter={"category": {"$eq": "x"}})
+    store.describe_index_stats()
+    store.delete(("a",))
+
+    index.upsert.assert_called_once_with([("a", [1.0], {})])
+    index.query.assert_called_once_with(
+        vector=[1.0], top_k=3, include_metadata=True, filter={"category": {"$eq": "x"}}
+    )
+    index.describe_index_stats.assert_called_once_with()
+    index.delete.assert_called_once_with(ids=["a"])
+
+
+def test_local_store_empty(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    assert store.query([1.0, 0.0], top_k=5) == {"matches": []}
+    assert store.describe_index_stats() == {"total_vector_count": 0, "dimension": 0}
+    store.upsert([])
+    store.delete(["missing"])
+    store.compact()
+    assert not store.current_path.exists()
+
+
+def test_local_store_cosine_top_k(tmp_path):
+    store = LocalVectorStore(tmp_path, "idx")
+    store.upsert(_records())
+
+    result = store.query([1.0, 0.1], top_k=2)
+    assert [m["id"] for m in result["matches"]] == ["a", "c"]
+    assert result["matches"][0]["score"] == pytest.approx(0.995, abs=1e-3)
+    assert result["matches"][0]["metadata"] == {"title": "A", "category": "people"}
+    assert store.describe_index_stats() == {"total_vector_count": 3, "dimension": 2}
+
+    no_meta = store.query([0.0, 1.0], top_k=10, include_metadata=False)
+    assert [m["id"] for m in no_meta["matches"]] == ["b", "c", "a"]
+    assert "metadata" not in no_meta["matches"][0]
+    assert store.query([0.0, 0.0], top_k=0) == {"matches": []}
+
+
+def test_local_store_metadata_filters(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert(_records())
+
+    eq = store.query([0.0, 1.0], top_k=5, filter={"category": {"$eq": "people"}})
+    assert [m["id"] for m in eq["matches"]] == ["c", "a"]
+
+    in_ = store.query([0.0, 1.0], top_k=1, filter={"category": {"$in": ["tv", "x"]}})
+    assert [m["id"] for m in in_["matches"]] == ["b"]
+
+    bare = store.query([1.0, 0.0], top_k=5, filter={"title": "C"})
+    assert [m["id"] for m in bare["matches"]] == ["c"]
+
+    none = store.query([1.0, 0.0], top_k=5, filter={"missing_field": "x"})
+    assert none == {"matches": []}
+
+    with pytest.raises(ValueError, match=r"\$gt"):
+        store.query([1.0, 0.0], top_k=5, filter={"category": {"$gt": 1}})
+    mask = store._snapshot.filter_mask({"category": "people"})
+    assert mask.tolist() == [True, False, True]
+
+
+def test_local_store_upsert_overwrites_and_persists(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert(_records())
+    store.upsert(
+        [
+            ("a", [0.0, 1.0], {"title": "A2"}),
+            ("d", [1.0, 0.0], {"title": "D", "published": "2025"}),
+            ("d", [1.0, 0.0], {"title": "D2", "published": "2025"}),
+        ]
+    )
+
+    reopened = LocalVectorStore(tmp_path)
+    top = reopened.query([0.0, 1.0], top_k=2)["matches"]
+    assert {m["id"] for m in top} == {"a", "b"}
+    assert next(m for m in top if m["id"] == "a")["metadata"] == {"title": "A2"}
+    d = reopened.query([1.0, 0.0], top_k=1)["matches"][0]
+    assert d["metadata"] == {"title": "D2", "published": "2025"}
+    assert reopened.describe_index_stats()["total_vector_count"] == 4
+    # Stored rows are normalized float32
+    rows = np.asarray(reopened._snapshot.vectors)
+    assert rows.dtype == np.float32
+    assert np.allclose(np.linalg.norm(rows, axis=1), 1.0)
+
+
+def test_local_store_dimension_mismatch(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert(_records())
+    with pytest.raises(ValueError, match="dimension mismatch"):
+        store.upsert([("z", [1.0, 2.0, 3.0], {})])
+
+
+def test_local_store_delete(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert(_records())
+    store.delete(["b", "unknown"])
+
+    assert store.describe_index_stats()["total_vector_count"] == 2
+    ids = [m["id"] for m in store.query([0.0, 1.0], top_k=5)["matches"]]
+    assert ids == ["c", "a"]
+
+
+def test_local_store_upserts_append_and_compaction_drops_dead_rows(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert(_records())
+    vectors_file = store.root / "0" / "vectors.f32"
+    inode = vectors_file.stat().st_ino
+    store.upsert([("d", [1.0, 0.0], {})])
+    # Only the new row is written; existing rows are left in place
+    assert vectors_file.stat().st_ino == inode
+    assert vectors_file.stat().st_size == 4 * 2 * 4
+
+    store.upsert([("a", [0.0, 1.0], {"title": "A2"})])
+    store.delete(["b"])
+    assert store._log.generation == 0 and len(store._snapshot.ids) == 5
+    # Compaction waits until dead rows (old a, then b, c, d) outnumber live ones
+    store.delete(["c", "d"])
+    assert store._log.generation == 1
+    assert store._snapshot.ids == ["a"]
+    assert not (store.root / "0").exists()
+    # Overwrites compact too
+    store.upsert([("a", [0.0, 1.0], {"title": "A3"})])
+    store.upsert([("a", [0.0, 1.0], {"title": "A2"})])
+    assert store._log.generation == 2
+    match = store.query([0.0, 1.0], top_k=5)["matches"]
+    assert match == [
+        {"id": "a", "score": pytest.approx(1.0), "metadata": {"title": "A2"}}
+    ]
+
+
+def test_local_store_reader_never_pairs_new_rows_with_old_ids(tmp_path):
+    writer = LocalVectorStore(tmp_path)
+    writer.upsert(_records())
+    reader = LocalVectorStore(tmp_path)
+    stale = reader._snapshot
+    # Rows appended after the reader loaded are beyond its snapshot
+    writer.upsert([(f"n{i}", [1.0, float(i)], {}) for i in range(10)])
+    assert len(stale.ids) == stale.vectors.shape[0] == 3
+    assert len(reader.query([1.0, 0.0], top_k=20)["matches"]) == 13
+
+    # A crashed writer's unlogged rows and torn record are ignored, then dropped
+    directory = writer.root / "0"
+    with open(directory / "vectors.f32", "ab") as f:
+        f.write(b"\x00" * 8)
+    with open(directory / "log.jsonl", "ab") as f:
+        f.write(b'{"id": "torn"')
+    assert len(LocalVectorStore(tmp_path)._snapshot.ids) == 13
+    writer.upsert([("z", [0.0, 1.0], {})])
+    assert (directory / "vectors.f32").stat().st_size == 14 * 2 * 4
+    assert reader.describe_index_stats()["total_vector_count"] == 14
+
+
+def test_local_store_imports_legacy_npy_index(tmp_path):
+    import json
+
+    np.save(tmp_path / "idx.npy", np.array([[1.0, 0.0], [0.0, 1.0]], np.float32))
+    (tmp_path / "idx.meta.json").write_text(
+        json.dumps({"ids": ["a", "b"], "columns": {"title": ["A", None]}})
+    )
+    np.save(tmp_path / "empty.npy", np.zeros((0, 0), np.float32))
+    (tmp_path / "empty.meta.json").write_text(json.dumps({"ids": [], "columns": {}}))
+    assert LocalVectorStore.list_stores(tmp_path) == ["empty", "idx"]
+
+    store = LocalVectorStore(tmp_path, "idx")
+    assert not (tmp_path / "idx.npy").exists()
+    assert not (tmp_path / "idx.meta.json").exists()
+    assert store.query([1.0, 0.0], top_k=1)["matches"][0]["metadata"] == {"title": "A"}
+    assert LocalVectorStore(tmp_path, "idx").describe_index_stats() == {
+        "total_vector_count": 2,
+        "dimension": 2,
+    }
+    empty = LocalVectorStore(tmp_path, "empty")
+    assert empty.describe_index_stats()["total_vector_count"] == 0
+    assert LocalVectorStore.list_stores(tmp_path) == ["idx"]
+
+
+def test_local_store_reader_sees_writes_from_other_handle(tmp_path):
+    reader = LocalVectorStore(tmp_path)
+    writer = LocalVectorStore(tmp_path)
+    writer.upsert(_records()[:1])
+    assert reader.describe_index_stats()["total_vector_count"] == 1
+    writer.upsert(_records()[1:])
+    assert len(reader.query([1.0, 0.0], top_k=5)["matches"]) == 3
+
+
+def test_top_k_rows_orders_best_first():
+    scores = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)
+    assert top_k_rows(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_rows(scores, 10).tolist() == [1, 3, 2, 0]
+    assert top_k_rows(scores, 0).tolist() == []
+
+
+def test_create_vector_store(tmp_path, mocker):
+    connect = mocker.MagicMock()
+    pinecone_store = create_vector_store("pinecone", tmp_path, "idx", connect, False)
+    assert isinstance(pinecone_store, PineconeStore)
+    assert pinecone_store.index is connect.return_value
+
+    local = create_vector_store("local", tmp_path, "idx", connect, False)
+    assert isinstance(local, LocalVectorStore)
+    assert local.root == tmp_path / "vectors" / "idx.local"
+    ivf = create_vector_store("ivf", tmp_path, "idx", connect, False)
+    assert isinstance(ivf, IVFVectorStore)
+    assert ivf.root == tmp_path / "vectors" / "idx.ivf"
+    connect.assert_called_once()
+
+    with pytest.raises(ValueError, match="Unknown VECTOR_BACKEND"):
+        create_vector_store("faiss", tmp_path, "idx", connect)
+
+    # Partitioning is opt-in
+    assert isinstance(
+        create_vector_store("ivf", tmp_path, "idx", connect), IVFVectorStore
+    )
+    partitioned = create_vector_store("ivf", tmp_path, "idx", connect, True)
+    assert isinstance(partitioned, PartitionedVectorStore)
+    assert partitioned.backfill_path == tmp_path / "vectors" / "idx.backfilled.json"
+    assert isinstance(partitioned.shared, IVFVectorStore)
+    partitioned.upsert(_records())
+    assert sorted(IVFVectorStore.list_stores(tmp_path / "vectors")) == ["idx"]
+    assert sorted(
+        IVFVectorStore.list_stores(tmp_path / "vectors" / "idx.partitions")
+    ) == ["people", "tv"]
+
+
+def test_pinecone_store_namespace(mocker):
+    index = mocker.MagicMock()
+    index.describe_index_stats.return_value = {
+        "dimension": 2,
+        "total_vector_count": 9,
+        "namespaces": {"": {"vector_count": 6}, "tv": {"vector_count": 3}},
+    }
+    store = PineconeStore(index, namespace="tv")
+
+    store.upsert([("a", [1.0], {})])
+    store.query([1.0], top_k=3)
+    store.delete(["a"])
+
+    index.upsert.assert_called_once_with([("a", [1.0], {})], namespace="tv")
+    assert index.query.call_args.kwargs["namespace"] == "tv"
+    index.delete.assert_called_once_with(ids=["a"], namespace="tv")
+    assert store.describe_index_stats() == {"total_vector_count": 3, "dimension": 2}
+    assert PineconeStore(index, "").describe_index_stats()["total_vector_count"] == 6
+    assert PineconeStore(index, "x").describe_index_stats()["total_vector_count"] == 0
+    index.describe_index_stats.return_value = {"total_vector_count": 9}
+    assert store.describe_index_stats() == {"total_vector_count": 9}
+
+
+def test_merge_top_k_keeps_best_match_per_id():
+    def ranking(*pairs):
+        return [{"id": id_, "score": score} for id_, score in pairs]
+
+    merged = merge_top_k(
+        [ranking(("a", 0.9), ("b", 0.5)), ranking(("c", 0.8), ("a", 0.7))], 3
+    )
+    assert [(m["id"], m["score"]) for m in merged] == [
+        ("a", 0.9),
+        ("c", 0.8),
+        ("b", 0.5),
+    ]
+    assert merge_top_k([ranking(("a", 1.0)), []], 0) == []
+
+
+def test_partitioned_store_fans_out_filtered_queries(tmp_path, mocker):
+    store = create_vector_store("local", tmp_path, "idx", None, True)
+    store.upsert(
+        _records()
+        + [
+            ("d", [0.0, 1.0], {"title": "D", "category": "royal family"}),
+            ("e", [1.0, 0.2], {"title": "E"}),
+        ]
+    )
+    shared = mocker.spy(store.shared, "query")
+    partitions = tmp_path / "vectors" / "idx.partitions"
+    assert sorted(LocalVectorStore.list_stores(partitions)) == ["people", "tv"]
+
+    # Unfiltered and non-category filters: one query to the shared index
+    assert len(store.query([1.0, 0.0], top_k=10)["matches"]) == 5
+    assert store.query([1.0, 0.0], 5, filter={"title": "E"})["matches"][0]["id"] == "e"
+    assert shared.call_count == 2
+
+    # Partitions may miss older articles until a backfill is recorded
+    assert store.backfilled() == frozenset()
+    store.query([1.0, 0.0], 5, filter={"category": "people"})
+    assert shared.call_count == 3
+    store.mark_backfilled(["people"])
+    store.mark_backfilled(["tv"])
+    assert json.loads(store.backfill_path.read_text()) == ["people", "tv"]
+    assert store.backfilled() == {"people", "tv"}
+
+    people = store.query([1.0, 0.0], 5, filter={"category": {"$eq": "people"}})
+    assert [m["id"] for m in people["matches"]] == ["a", "c"]
+    both = store.query(
+        [1.0, 0.0], 2, filter={"category": {"$in": ["tv", "people", "tv"]}}
+    )
+    assert [m["id"] for m in both["matches"]] == ["a", "c"]
+    assert store.query([0.0, 1.0], 5, filter={"category": "tv"})["matches"][0] == {
+        "id": "b",
+        "score": pytest.approx(1.0),
+        "metadata": {"title": "B", "category": "tv"},
+    }
+    assert shared.call_count == 3
+
+    # Unknown partitions, invalid names and mixed operators use the shared index
+    for filter in (
+        {"category": {"$in": ["people", "sport"]}},
+        {"category": {"$eq": "royal family"}},
+        {"category": {"$eq": "tv", "$in": ["tv"]}},
+    ):
+        store.query([1.0, 0.0], 5, filter=filter)
+    assert shared.call_count == 6
+    assert not (partitions / "sport.local").exists()
+    assert store.describe_index_stats()["total_vector_count"] == 5
+
+    store.delete(["a", "b"])
+    assert store.describe_index_stats()["total_vector_count"] == 3
+    assert store.partition("people").describe_index_stats()["total_vector_count"] == 1
+    assert store.partition("tv").describe_index_stats()["total_vector_count"] == 0
+
+
+def test_partitioned_pinecone_store_uses_namespaces(tmp_path, mocker):
+    index = mocker.MagicMock()
+    index.query.side_effect = lambda **kwargs: {
+        "matches": [{"id": kwargs["namespace"], "score": len(kwargs["namespace"])}]
+    }
+    index.describe_index_stats.return_value = {
+        "namespaces": {"": {"vector_count": 2}, "tv": {"vector_count": 1}}
+    }
+    store = create_vector_store("pinecone", tmp_path, "idx", lambda: index, True)
+    store.mark_backfilled(["tv", "people"])
+
+    store.upsert([("a", [1.0], {"category": "tv"}), ("b", [1.0], {})])
+    matches = store.query([1.0], 5, filter={"category": {"$in": ["tv", "people"]}})
+
+    assert [m["id"] for m in matches["matches"]] == ["people", "tv"]
+    assert [c.kwargs["namespace"] for c in index.upsert.call_args_list] == ["", "tv"]
+    # Deletes reach every namespace, even ones this process never opened
+    index.describe_index_stats.return_value["namespaces"]["sport"] = {}
+    store.delete(["a"])
+    assert sorted(c.kwargs["namespace"] for c in index.delete.call_args_list) == [
+        "",
+        "people",
+        "sport",
+        "tv",
+    ]
+
+    # Without a data directory there is nowhere to record a backfill
+    store = create_vector_store("pinecone", None, "idx", lambda: index, True)
+    assert store.backfilled() == frozenset()
+    store.query([1.0], 5, filter={"category": "tv"})
+    assert index.query.call_args.kwargs["namespace"] == ""
+    with pytest.raises(ValueError, match="no backfill_path"):
+        store.mark_backfilled(["tv"])
+
+
+def test_local_store_concurrent_upserts_do_not_lose_writes(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    store = LocalVectorStore(tmp_path)
+    chunks = [[(f"{c}-{i}", [1.0, float(i)], {}) for i in range(5)] for c in range(8)]
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(store.upsert, chunks))
+
+    assert store.describe_index_stats()["total_vector_count"] == 40
+
+
+def _clustered(n, dim=8, clusters=4, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, n)
+    return centers, centers[labels] + 0.1 * rng.normal(size=(n, dim)), labels
+
+
+def test_quantize_rows_round_trips_within_one_step():
+    vectors = np.array([[0.5, -1.0, 0.25], [0.0, 0.0, 0.0]], dtype=np.float32)
+    codes, scales = quantize_rows(vectors)
+    assert codes.dtype == np.int8
+    assert codes[0].tolist() == [64, -127, 32]
+    assert scales[1] == 1.0
+    np.testing.assert_allclose(codes * scales[:, None], vectors, atol=scales[0])
+
+
+def test_train_centroids_reseeds_empty_lists_and_default_nlist():
+    sample = np.tile(np.array([[1.0, 0.0]], dtype=np.float32), (4, 1))
+    centroids = train_centroids(sample, nlist=2, iterations=2)
+    assert centroids.shape == (2, 2)
+    np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1.0)
+    assert default_nlist(10) == 1
+    assert default_nlist(10_000) == 256
+
+
+def test_ivf_store_empty(tmp_path):
+    store = IVFVectorStore(tmp_path)
+    assert store.query([1.0, 0.0], top_k=5) == {"matches": []}
+    assert store.describe_index_stats() == {"total_vector_count": 0, "dimension": 0}
+    store.upsert([])
+    store.delete(["missing"])
+    store.rebuild()
+    assert not store.current_path.exists()
+
+
+def test_ivf_store_untrained_scans_all_rows(tmp_path):
+    store = IVFVectorStore(tmp_path, "idx", train_min_rows=100)
+    store.upsert(_records())
+
+    result = store.query([1.0, 0.1], top_k=2)
+    assert [m["id"] for m in result["matches"]] == ["a", "c"]
+    assert result["matches"][0]["score"] == pytest.approx(0.995, abs=1e-3)
+    assert result["matches"][0]["metadata"] == {"title": "A", "category": "people"}
+    assert store.describe_index_stats() == {"total_vector_count": 3, "dimension": 2}
+    assert store._snapshot.centroids is None
+
+    filtered = store.query([0.0, 1.0], top_k=5, filter={"category": "people"})
+    assert [m["id"] for m in filtered["matches"]] == ["c", "a"]
+    no_meta = store.query([0.0, 1.0], top_k=1, include_metadata=False)
+    assert no_meta["matches"] == [{"id": "b", "score": pytest.approx(1.0)}]
+    assert store.query([0.0, 0.0], top_k=0) == {"matches": []}
+    assert len(store.query([0.0, 0.0], top_k=3)["matches"]) == 3
+    with pytest.raises(ValueError, match="dimension mismatch"):
+        store.upsert([("d", [1.0, 2.0, 3.0], {})])
+
+
+def test_ivf_store_overwrite_delete_and_reader_reload(tmp_path):
+    writer = IVFVectorStore(tmp_path, train_min_rows=100)
+    reader = IVFVectorStore(tmp_path)
+    writer.upsert(_records())
+    writer.upsert([("a", [0.0, 1.0], {"title": "A2"})])
+    writer.delete(["b", "missing"])
+
+    assert reader.describe_index_stats()["total_vector_count"] == 2
+    top = reader.query([0.0, 1.0], top_k=5)["matches"]
+    assert [m["id"] for m in top] == ["a", "c"]
+    assert top[0]["metadata"] == {"title": "A2"}
+    # Readers only parse what was appended since their last load
+    offset = reader._log.offset
+    writer.upsert([("b", [0.0, 1.0], {})])
+    assert reader.describe_index_stats()["total_vector_count"] == 3
+    assert reader._log.offset > offset
+
+
+def test_ivf_store_trains_retrains_and_probes(tmp_path):
+    centers, vectors, _ = _clustered(400)
+    store = IVFVectorStore(
+        tmp_path, nlist=4, nprobe=1, train_min_rows=100, retrain_growth=2
+    )
+    records = [(f"v{i}", v.tolist(), {"n": i}) for i, v in enumerate(vectors)]
+    store.upsert(records[:120])
+
+    assert store._log.generation == 1
+    assert store._info["trained_rows"] == 120
+    assert store._snapshot.centroids.shape == (4, 8)
+    assert not (store.root / "0").exists()
+
+    store.upsert(records[120:])
+    assert store._log.generation == 2
+    assert store._info["trained_rows"] == 400
+    # New rows are assigned to lists as they are appended
+    store.upsert([("new", centers[0].tolist(), {})])
+    assert store._snapshot.lists[-1] >= 0
+
+    exact = LocalVectorStore(tmp_path / "exact")
+    exact.upsert(records)
+    for center in centers:
+        expected = [m["id"] for m in exact.query(center.tolist(), top_k=5)["matches"]]
+        got = store.query(center.tolist(), top_k=6, nprobe=4)["matches"]
+        assert set(expected) <= {m["id"] for m in got}
+    assert len(store.query(centers[0].tolist(), top_k=5)["matches"]) == 5
+
+
+def test_ivf_store_rebuild_compacts_dead_rows(tmp_path):
+    store = IVFVectorStore(tmp_path, train_min_rows=1000)
+    store.upsert(_records())
+    store.upsert([("a", [1.0, 0.0], {"title": "A2"})])
+    store.delete(["b"])
+    assert len(store._snapshot.ids) == 4
+
+    store.rebuild(nlist=2)
+
+    assert store._snapshot.ids == ["c", "a"]
+    assert store.query([1.0, 0.0], top_k=1)["matches"][0]["metadata"] == {"title": "A2"}
+
+
+def test_ivf_store_recovers_from_torn_writes(tmp_path):
+    store = IVFVectorStore(tmp_path, train_min_rows=1000)
+    store.upsert(_records()[:1])
+    directory = store.root / "0"
+    # A crashed writer left rows without log records and half a record
+    with open(directory / "codes.i8", "ab") as f:
+        f.write(b"\x01\x02")
+    with open(directory / "log.jsonl", "ab") as f:
+        f.write(b'{"id": "torn"')
+
+    reader = IVFVectorStore(tmp_path)
+    assert reader._snapshot.ids == ["a"]
+    store.upsert(_records()[1:])
+    assert reader.describe_index_stats()["total_vector_count"] == 3
+    assert (directory / "codes.i8").stat().st_size == 3 * 2
+
+
+def test_ivf_store_keeps_snapshot_when_generation_vanishes(tmp_path):
+    store = IVFVectorStore(tmp_path, train_min_rows=1000)
+    store.upsert(_records())
+    # CURRENT points at a generation whose files are (being) removed
+    stale = store.root / "7"
+    stale.mkdir()
+    (stale / "log.jsonl").touch()
+    store.current_path.write_text("7")
+    assert store.describe_index_stats()["total_vector_count"] == 3
+
+    # An interrupted rebuild's leftover directory is replaced
+    store.current_path.write_text("0")
+    store.rebuild()
+    assert store._log.generation == 1
+    store._write_generation(1, {"dim": 2, "trained_rows": 0})
+    assert (store.root / "1" / "log.jsonl").stat().st_size == 0